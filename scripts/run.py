@@ -55,7 +55,11 @@ def main():
     t = threading.Thread(target=assistant.run, daemon=True)
     t.start()
 
-    hud.root.mainloop()
+    try:
+        hud.root.mainloop()
+    finally:
+        # fenêtre fermée : les threads daemon s'arrêtent avec le process, pas les mémoires
+        assistant.close()
 
 
 
@@ -0,0 +1,426 @@
+# src/max_assistant_v2/agents/intent_classifier.py
+from __future__ import annotations
+
+import re
+import time
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+NONE_INTENT = "none"
+
+# Formules de politesse / d'adresse tolérées avant la demande (texte normalisé)
+_REQUEST_PREFIX = (
+    r"^(?:(?:frank|franck|hey|ok|dis|dis moi|alors|s il te plait|stp|est ce que tu peux|tu peux|peux tu"
+    r"|pourrais tu|tu pourrais|je veux|je voudrais|j aimerais|merci de)\s+)*"
+)
+
+# (forme de demande, tool, args fixes, confiance) — ancrées en début de phrase :
+# un mot-clé isolé ("pourquoi la météo...", "un snapshot git") part au planner
+KEYWORD_RULES = [
+    (r"(?:ouvre |affiche |montre |lance )?(?:la )?surveillance exterieure\b", "camera_open_stream", {"camera": "exterieure"}, 0.99),
+    (r"(?:ouvre |affiche |montre |lance )?(?:la )?surveillance interieure\b", "camera_open_stream", {"camera": "interieure"}, 0.99),
+
+    (r"(?:fais|prends|faire|prendre)(?: moi)? (?:une |un )?(?:capture (?:d )?(?:l )?ecran|screenshot)\b", "screenshot", {}, 0.95),
+    (r"(?:capture|screenshot)(?: d)?(?: de)?(?: l| mon)? ecran\b", "screenshot", {}, 0.95),
+    (r"screenshot$", "screenshot", {}, 0.95),
+
+    (r"meteo\b", "weather", {}, 0.92),
+    (r"(?:quelle|donne(?: moi)?|c est quoi|affiche)(?: est)? (?:la )?meteo\b", "weather", {}, 0.92),
+    (r"quel temps (?:fait il|fera t il|va t il faire|il fait)\b", "weather", {}, 0.90),
+    (r"il fait combien\b", "weather", {}, 0.90),
+    (r"quelle (?:est la )?temperature\b", "weather", {}, 0.90),
+
+    (r"(?:affiche|montre|ouvre)(?: moi)? (?:la |ta |le )?(?:memoire|dashboard memoire|tableau de bord memoire)\b", "memory_dashboard", {}, 0.95),
+    (r"dashboard memoire\b", "memory_dashboard", {}, 0.95),
+
+    (r"(?:prends|fais|prendre|faire)(?: moi)? (?:une |un )?(?:photo|snapshot|capture|image)(?: avec| de)?(?: la)? camera\b", "camera_snapshot", {}, 0.93),
+    (r"prends une photo\b", "camera_snapshot", {}, 0.93),
+    (r"(?:snapshot|capture|photo|image)(?: de)?(?: la)? camera\b", "camera_snapshot", {}, 0.93),
+
+    (r"(?:cherche|recherche|fais une recherche)(?: sur)? (?:le web|internet|web)\b", "web_search", {}, 0.95),
+    (r"google\b", "web_search", {}, 0.93),
+
+    (r"(?:genere|cree|fais|dessine)(?: moi)? (?:une image|un dessin)\b", "image_generate", {}, 0.93),
+    (r"dessine(?: moi)?(?= (?:un|une|des|le|la|les|mon|ma)\b)", "image_generate", {}, 0.90),
+]
+
+# Questions d'explication : jamais résolues sans le planner, même si l'embedding ressemble à un outil
+_INFO_RE = re.compile(
+    r"^(?:pourquoi|comment|c est quoi|qu est ce|explique|quelle difference|est ce que|je deteste|j aime)\b"
+)
+
+# Verbes d'ouverture : open_app seulement si le verbe ouvre la demande et que l'app
+# qui suit est connue (apps.json) — "comment ouvrir chrome" part au planner
+OPEN_VERBS = ("ouvre", "ouvrir", "lance", "lancer", "demarre", "demarrer")
+
+# Exemples étiquetés : centroïdes du modèle embedding + jeu d'évaluation
+EXAMPLES = {
+    "weather": [
+        "météo à Lyon", "quel temps fait-il à Paris", "il fait combien dehors",
+        "donne-moi la météo de demain", "quelle température à Marseille",
+    ],
+    "screenshot": [
+        "capture écran", "prends une capture d'écran", "fais un screenshot",
+        "capture mon écran", "enregistre ce qu'il y a à l'écran",
+    ],
+    "camera_open_stream": [
+        "surveillance extérieure", "surveillance intérieure", "montre la caméra",
+        "ouvre le flux de la caméra", "affiche la caméra du jardin",
+    ],
+    "camera_snapshot": [
+        "prends une photo avec la caméra", "snapshot caméra", "capture caméra",
+        "image de la caméra extérieure",
+    ],
+    "memory_dashboard": [
+        "affiche la mémoire", "montre ta mémoire", "dashboard mémoire",
+        "ouvre le tableau de bord mémoire",
+    ],
+    "web_search": [
+        "cherche sur le web les nouveautés python", "recherche web prix rtx 5090",
+        "google la recette des crêpes", "cherche sur internet l'horaire du match",
+    ],
+    "image_generate": [
+        "génère une image d'un chat astronaute", "dessine un dragon",
+        "crée une image de coucher de soleil", "fais une image d'une ville futuriste",
+    ],
+    NONE_INTENT: [
+        "comment ça va", "qui es-tu", "comment je m'appelle", "explique-moi les décorateurs python",
+        "quel âge as-tu", "raconte-moi une blague", "merci beaucoup", "je suis fatigué aujourd'hui",
+        "qu'est-ce que tu penses de mon projet", "pourquoi le ciel est bleu",
+        "explique comment fonctionne une caméra", "les prévisions météo sont-elles fiables",
+        "à quoi sert un screenshot", "c'est quoi une recherche web",
+    ],
+}
+
+# Jeu d'évaluation séparé (jamais utilisé pour les règles ni les centroïdes),
+# avec des négatifs contenant des mots-clés d'outil
+HELDOUT = [
+    ("météo à Bordeaux", "weather"),
+    ("quelle est la météo demain à Nantes", "weather"),
+    ("quel temps fait-il à Brest", "weather"),
+    ("frank, il fait combien dehors ?", "weather"),
+    ("fais une capture d'écran", "screenshot"),
+    ("prends un screenshot", "screenshot"),
+    ("prends une photo", "camera_snapshot"),
+    ("prends une photo avec la caméra intérieure", "camera_snapshot"),
+    ("ouvre la surveillance extérieure", "camera_open_stream"),
+    ("montre-moi ta mémoire", "memory_dashboard"),
+    ("cherche sur internet le score du match", "web_search"),
+    ("dessine-moi un mouton", "image_generate"),
+    ("génère une image d'une forêt enneigée", "image_generate"),
+    ("ouvre spotify", "open_app"),
+    ("frank, tu peux lancer chrome ?", "open_app"),
+
+    ("explique comment on dessine un graphe en python", NONE_INTENT),
+    ("c'est quoi un snapshot git ?", NONE_INTENT),
+    ("pourquoi la météo se trompe souvent ?", NONE_INTENT),
+    ("je déteste parler de la météo, raconte une blague", NONE_INTENT),
+    ("comment faire un screenshot sous linux", NONE_INTENT),
+    ("est-ce que la caméra enregistre la nuit ?", NONE_INTENT),
+    ("mon fils dessine très bien", NONE_INTENT),
+    ("la recherche web de hier était nulle", NONE_INTENT),
+    ("ouvre la porte", NONE_INTENT),
+    ("comment ouvrir chrome en mode privé", NONE_INTENT),
+    ("pourquoi spotify se lance tout seul au démarrage", NONE_INTENT),
+    ("est-ce que chrome se lance plus vite que firefox ?", NONE_INTENT),
+    ("j'arrive pas à ouvrir spotify", NONE_INTENT),
+    ("raconte-moi une histoire", NONE_INTENT),
+]
+
+# (phrase, ville attendue) pour l'extraction d'argument de weather
+CITY_CASES = [
+    ("météo de la semaine à Lyon", "Lyon"),
+    ("météo à lyon", "Lyon"),
+    ("météo à Lyon demain", "Lyon"),
+    ("météo pour le week-end à Nice", "Nice"),
+    ("quel temps fait-il à New York", "New York"),
+    ("météo de Saint-Étienne", "Saint-Étienne"),
+    ("météo de demain", "Paris"),
+    ("il fait combien dehors", "Paris"),
+]
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_WORD_RE = re.compile(r"[A-Za-zÀ-ÿ][A-Za-zÀ-ÿ'-]*")
+_CITY_PREPS = {"à", "a", "de", "du", "sur", "pour", "vers"}
+_CITY_STOP = {
+    "demain", "aujourd'hui", "aujourdhui", "hier", "ce", "cet", "cette", "ces", "la", "le", "les", "l'",
+    "un", "une", "des", "maintenant", "combien", "semaine", "week-end", "weekend", "matin", "soir",
+    "midi", "nuit", "prochain", "prochaine", "dehors", "il", "fait", "quel", "temps", "météo", "meteo",
+}
+
+
+def normalize(text: str) -> list[str]:
+    """Minuscules, sans accents, tokens alphanumériques (apostrophes = séparateurs)."""
+    text = unicodedata.normalize("NFD", (text or "").lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _TOKEN_RE.findall(text)
+
+
+def extract_city(text: str) -> Optional[str]:
+    """
+    Ville après la dernière préposition ("météo de la semaine à Lyon" → "Lyon"),
+    capture arrêtée à la préposition ou au mot vide suivant. None si aucune.
+    """
+    words = _WORD_RE.findall(text or "")
+    city = None
+    for i, w in enumerate(words):
+        if w.lower() not in _CITY_PREPS:
+            continue
+        cand = []
+        for nxt in words[i + 1:]:
+            low = nxt.lower()
+            if low in _CITY_PREPS or low in _CITY_STOP:
+                break
+            cand.append(nxt)
+        if cand:
+            city = " ".join(cand)
+    if not city:
+        return None
+    return city[:1].upper() + city[1:]
+
+
+@dataclass
+class IntentMatch:
+    tool: str
+    args: Dict[str, Any]
+    confidence: float
+    source: str  # "keyword" | "embedding"
+
+    def as_plan(self) -> dict:
+        """Même format que PlannerAgent.plan()."""
+        return {"type": "tool", "tool": self.tool, "args": dict(self.args), "final": ""}
+
+
+@dataclass
+class _IntentStats:
+    hits: int = 0
+    total_ms: float = 0.0
+    sources: Dict[str, int] = field(default_factory=dict)
+
+
+class IntentClassifier:
+    """
+    Fast-path devant PlannerAgent : résout les intentions outil évidentes sans LLM.
+    1) formes de demande ancrées en début de phrase (règles de PLANNER_SYSTEM)
+    2) optionnel : plus proche centroïde d'embeddings sur EXAMPLES
+    Retourne None dès que c'est ambigu ou qu'un argument obligatoire manque :
+    le planner LLM prend alors le relais.
+    """
+
+    def __init__(
+        self,
+        apps: dict | None = None,
+        embeddings=None,
+        min_confidence: float = 0.85,
+        embed_threshold: float = 0.80,
+        embed_margin: float = 0.05,
+    ):
+        self.apps = {k.lower(): k for k in (apps or {})}
+        self.embeddings = embeddings
+        self.min_confidence = float(min_confidence)
+        self.embed_threshold = float(embed_threshold)
+        self.embed_margin = float(embed_margin)
+
+        self.rules = [
+            (re.compile(_REQUEST_PREFIX + pattern), tool, args, conf)
+            for pattern, tool, args, conf in KEYWORD_RULES
+        ]
+        self.open_rule = re.compile(_REQUEST_PREFIX + r"(?:" + "|".join(OPEN_VERBS) + r")\b")
+
+        self._labels: list[str] = []
+        self._centroids: Optional[np.ndarray] = None
+
+        self.stats: Dict[str, _IntentStats] = {}
+        self.fallthrough = 0
+        self.fallthrough_ms = 0.0
+
+    # ---------- extraction d'arguments ----------
+
+    def _city(self, text: str) -> str:
+        return extract_city(text) or "Paris"
+
+    def _remainder(self, text: str, tokens: list[str], end: int) -> str:
+        """Texte original après le motif (retrouvé par position de token)."""
+        if end >= len(tokens):
+            return ""
+        # position du (end)ième token dans le texte original
+        idx = 0
+        pos = 0
+        for m in re.finditer(r"[^\W_]+", text):
+            if idx == end:
+                pos = m.start()
+                break
+            idx += 1
+        rest = text[pos:].strip(" :,.?!")
+        return re.sub(r"^(?:d'|(?:de|sur|pour|à propos de|la|le|les)\s+)", "", rest, flags=re.IGNORECASE).strip()
+
+    def _args(self, tool: str, fixed: dict, text: str, tokens: list[str], end: int) -> Optional[dict]:
+        args = dict(fixed)
+        if tool == "weather":
+            args["city"] = self._city(text)
+        elif tool in ("camera_snapshot", "camera_open_stream") and "camera" not in args:
+            args["camera"] = "interieure" if "interieure" in tokens else "exterieure"
+        elif tool == "web_search":
+            query = self._remainder(text, tokens, end)
+            if not query:
+                return None
+            args["query"] = query
+        elif tool == "image_generate":
+            prompt = self._remainder(text, tokens, end)
+            if not prompt:
+                return None
+            args["prompt"] = prompt
+        return args
+
+    def _open_app(self, norm: str) -> Optional[IntentMatch]:
+        m = self.open_rule.match(norm)
+        if not m:
+            return None
+        # "ouvre spotify", "lance le navigateur chrome" : app connue dans les 3 tokens suivants
+        for cand in norm[m.end():].split()[:3]:
+            if cand in self.apps:
+                return IntentMatch("open_app", {"app_name": self.apps[cand]}, 0.95, "keyword")
+        return None
+
+    # ---------- classification ----------
+
+    def _keyword(self, text: str, tokens: list[str]) -> Optional[IntentMatch]:
+        """Forme de demande reconnue en début de phrase (après politesses éventuelles)."""
+        norm = " ".join(tokens)
+        best = None
+        for rx, tool, fixed, conf in self.rules:
+            m = rx.match(norm)
+            if m and (best is None or conf > best[0]):
+                best = (conf, tool, fixed, len(norm[:m.end()].split()))
+
+        if best is None:
+            return self._open_app(norm)
+
+        conf, tool, fixed, end = best
+        args = self._args(tool, fixed, text, tokens, end)
+        if args is None:
+            return None
+        return IntentMatch(tool, args, conf, "keyword")
+
+    def _ensure_centroids(self):
+        if self._centroids is not None or self.embeddings is None:
+            return
+        labels, rows = [], []
+        for label, examples in EXAMPLES.items():
+            vecs = np.asarray(self.embeddings.encode(examples), dtype="float32")
+            c = vecs.mean(axis=0)
+            rows.append(c / max(np.linalg.norm(c), 1e-12))
+            labels.append(label)
+        self._labels = labels
+        self._centroids = np.stack(rows)
+
+    def _embedding(self, text: str, tokens: list[str]) -> Optional[IntentMatch]:
+        if self.embeddings is None or _INFO_RE.match(" ".join(tokens)):
+            return None
+        self._ensure_centroids()
+
+        q = np.asarray(self.embeddings.encode([text]), dtype="float32")[0]
+        sims = self._centroids @ q
+        order = np.argsort(-sims)
+        best, second = int(order[0]), int(order[1])
+        label, score = self._labels[best], float(sims[best])
+
+        if label == NONE_INTENT or score < self.embed_threshold:
+            return None
+        if score - float(sims[second]) < self.embed_margin:
+            return None
+
+        args = self._args(label, {}, text, tokens, len(tokens))
+        if args is None:
+            return None
+        return IntentMatch(label, args, score, "embedding")
+
+    def classify(self, text: str) -> Optional[IntentMatch]:
+        t0 = time.perf_counter()
+        tokens = normalize(text)
+
+        match = None
+        if tokens:
+            match = self._keyword(text, tokens)
+            if match is None:
+                match = self._embedding(text, tokens)
+            if match is not None and match.confidence < self.min_confidence:
+                match = None
+
+        ms = (time.perf_counter() - t0) * 1000.0
+        if match is None:
+            self.fallthrough += 1
+            self.fallthrough_ms += ms
+        else:
+            st = self.stats.setdefault(match.tool, _IntentStats())
+            st.hits += 1
+            st.total_ms += ms
+            st.sources[match.source] = st.sources.get(match.source, 0) + 1
+        return match
+
+    def metrics(self) -> dict:
+        """Compteurs en ligne : résolutions par intention, latence moyenne, passages au planner."""
+        out = {
+            tool: {
+                "hits": st.hits,
+                "mean_ms": st.total_ms / st.hits if st.hits else 0.0,
+                "sources": dict(st.sources),
+            }
+            for tool, st in self.stats.items()
+        }
+        out[NONE_INTENT] = {
+            "fallthrough": self.fallthrough,
+            "mean_ms": self.fallthrough_ms / self.fallthrough if self.fallthrough else 0.0,
+        }
+        return out
+
+    def evaluate(self, labelled: list[tuple[str, str]]) -> dict:
+        """
+        Précision / rappel / latence par intention sur (texte, tool attendu).
+        tool attendu = "none" pour ce qui doit partir au planner.
+        """
+        per: dict[str, dict] = {}
+
+        def row(tool):
+            return per.setdefault(tool, {"tp": 0, "fp": 0, "fn": 0, "ms": 0.0, "n": 0})
+
+        for text, expected in labelled:
+            t0 = time.perf_counter()
+            m = self.classify(text)
+            ms = (time.perf_counter() - t0) * 1000.0
+            got = m.tool if m else NONE_INTENT
+
+            r = row(got)
+            r["ms"] += ms
+            r["n"] += 1
+            if got == expected:
+                r["tp"] += 1
+            else:
+                r["fp"] += 1
+                row(expected)["fn"] += 1
+
+        report = {}
+        for tool, r in per.items():
+            predicted = r["tp"] + r["fp"]
+            actual = r["tp"] + r["fn"]
+            report[tool] = {
+                "precision": r["tp"] / predicted if predicted else 0.0,
+                "recall": r["tp"] / actual if actual else 0.0,
+                "mean_ms": r["ms"] / r["n"] if r["n"] else 0.0,
+                "support": actual,
+            }
+        return report
+
+
+if __name__ == "__main__":
+    clf = IntentClassifier(apps={"spotify": {}, "chrome": {}})
+
+    for tool, row in sorted(clf.evaluate(HELDOUT).items()):
+        print(tool, {k: round(v, 3) if isinstance(v, float) else v for k, v in row.items()})
+
+    for text, expected in CITY_CASES:
+        got = clf._city(text)
+        print("OK " if got == expected else "KO ", repr(text), "->", got)
@@ -106,6 +106,45 @@ retourne :
 """
 
 
+# Mode fused : un seul appel retourne extraction perso + plan + réponse courte éventuelle.
+# "final" n'est utilisé par le Router que hors streaming et sans réglage émotion /
+# préférences ; sinon la réponse passe par Router._chat.
+FUSED_ADDENDUM = """
+
+MODE FUSIONNÉ (prioritaire sur le schéma ci-dessus) :
+
+Tu fais en UN SEUL JSON trois choses :
+1. extraction de mémoire personnelle durable dans la demande
+2. décision (type / tool / args) selon les règles ci-dessus
+3. si type="answer" et que la réponse est simple et directe : cette réponse dans "final"
+
+Schéma strict :
+
+{
+  "personal": {
+    "type": "name" | "location" | "relation" | "project" | "preference" | "emotion" | "none",
+    "key": "string",
+    "value": "string"
+  },
+  "type": "tool" | "answer",
+  "tool": "...",
+  "args": {},
+  "final": "réponse courte (1 à 2 phrases) si type=answer et question simple ; sinon vide"
+}
+
+Règles extraction :
+- personal.type="none" avec key="" et value="" si aucune info personnelle durable.
+- Émotion exprimée (stressé, fatigué, motivé, frustré, heureux...) : personal.type="emotion", value=l'émotion.
+- Relation : key = le lien ("femme", "mari", "enfant"...), value = le prénom.
+
+Règles réponse :
+- Tu es FRANK, assistant local type JARVIS. Réponse en français, utile et concise.
+- Utilise le CONTEXTE et les RAPPELS si pertinents.
+- Explication, conseil détaillé, liste ou texte long : "final" vide (la réponse sera rédigée à part).
+"""
+
+FUSED_SYSTEM = PLANNER_SYSTEM + FUSED_ADDENDUM
+
 
 def _extract_json(text: str) -> dict:
     """
@@ -128,7 +167,7 @@ class PlannerAgent:
     def __init__(self, llm):
         self.llm = llm
 
-    def plan(self, user_text: str, context: str = "", retrieved: list[str] | None = None) -> dict:
+    def _prompt(self, user_text: str, context: str, retrieved: list[str] | None) -> str:
         retrieved = retrieved or []
         rag = "\n".join([f"- {x}" for x in retrieved])
 
@@ -144,9 +183,65 @@ DEMANDE UTILISATEUR:
 
 Décide l'action selon le schéma JSON.
 """
-        raw = self.llm.raw_chat(
+        return prompt
+
+    # request()/parse() séparés : Router peut exécuter l'appel en sync ou en async
+
+    def request(self, user_text: str, context: str = "", retrieved: list[str] | None = None, profile: str = "") -> dict:
+        """Arguments de llm.raw_chat() pour plan()."""
+        return dict(
             system=PLANNER_SYSTEM,
-            user=prompt,
+            user=self._prompt(user_text, context, retrieved),
             temperature=0.0,
+            profile=profile,
         )
+
+    def parse(self, raw: str) -> dict:
         return _extract_json(raw)
+
+    def plan(self, user_text: str, context: str = "", retrieved: list[str] | None = None, profile: str = "") -> dict:
+        return self.parse(self.llm.raw_chat(**self.request(user_text, context, retrieved, profile)))
+
+    def fused_request(
+        self,
+        user_text: str,
+        context: str = "",
+        retrieved: list[str] | None = None,
+        max_tokens: int = 300,
+        profile: str = "",
+    ) -> dict:
+        """Arguments de llm.raw_chat() pour plan_fused()."""
+        return dict(
+            system=FUSED_SYSTEM,
+            user=self._prompt(user_text, context, retrieved),
+            temperature=0.2,
+            max_tokens=max_tokens,
+            profile=profile,
+        )
+
+    def parse_fused(self, raw: str) -> dict:
+        plan = _extract_json(raw)
+
+        personal = plan.get("personal")
+        if not isinstance(personal, dict):
+            personal = {"type": "none", "key": "", "value": ""}
+        plan["personal"] = personal
+
+        return plan
+
+    def plan_fused(
+        self,
+        user_text: str,
+        context: str = "",
+        retrieved: list[str] | None = None,
+        max_tokens: int = 300,
+        profile: str = "",
+    ) -> dict:
+        """
+        Un seul appel LLM au lieu de trois (extraction perso, plan, réponse courte) ;
+        "final" vide = réponse à générer ensuite par Router._chat.
+        Retourne le plan habituel + une clé "personal" (format extract_personal_info).
+        """
+        return self.parse_fused(
+            self.llm.raw_chat(**self.fused_request(user_text, context, retrieved, max_tokens, profile))
+        )
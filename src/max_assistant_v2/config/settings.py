@@ -7,24 +7,102 @@ class Settings:
     LM_BASE_URL: str = "http://localhost:1234/v1"
     MODEL_ID: str = "typhoon2-qwen2.5-7b-instruct"
 
+    # LM Studio - transport HTTP (partagé voix / web / rappels)
+    LM_CONNECT_TIMEOUT_SEC: float = 5.0
+    LM_READ_TIMEOUT_SEC: float = 60.0      # silence max entre deux octets reçus
+    LM_DEADLINE_SEC: float = 120.0         # durée totale max d'un appel (attente + retries)
+    LM_MAX_CONCURRENCY: int = 2            # requêtes simultanées vers le serveur (sync + async)
+    LM_BACKGROUND_CONCURRENCY: int = 1     # dont tâches de fond (résumé, MemoryWriter)
+    LM_ACQUIRE_TIMEOUT_SEC: float = 30.0   # attente max d'un créneau libre
+    LM_MAX_RETRIES: int = 2
+    LM_POOL_MAX_CONNECTIONS: int = 8
+    LM_POOL_MAX_KEEPALIVE: int = 4
+
+    # Planner - extraction perso + plan (+ réponse courte hors streaming) dans un même appel JSON
+    FUSED_PLANNER: bool = True
+
+    # Intentions outil - fast-path avant le planner (règles ancrées, + centroïdes d'embeddings si activé)
+    INTENT_CLASSIFIER: bool = True
+    INTENT_USE_EMBEDDINGS: bool = True
+    INTENT_MIN_CONFIDENCE: float = 0.85
+
     # Audio
-    SAMPLE_RATE: int = 16000
+    SAMPLE_RATE: int = 16000          # capturé tel quel si le micro l'accepte, sinon rééchantillonné en flux
     WAKE_WORD: str = "FRANK"
-    SILENCE_MS: int = 900
-    FRAME_MS: int = 30
+    SILENCE_MS: int = 700             # silence (VAD) qui clôt une commande
+    FRAME_MS: int = 30                # trame VAD (10, 20 ou 30 ms pour webrtcvad)
+
+    # Réveil : "whisper" (tiny sur CPU, décodage glouton court) | "onnx" (keyword spotter log-mel)
+    WAKE_ENGINE: str = "whisper"
+    WAKE_MODEL: str = "tiny"          # taille Whisper, ou chemin du .onnx
+    WAKE_THRESHOLD: float = 0.5
+    WAKE_INTERVAL_SEC: float = 0.5    # intervalle min entre deux tests de réveil
+
+    # STT en flux : partiels pendant la commande (préchargent le RAG) + passe de fin sur la queue
+    STT_STREAMING: bool = True
+    STT_PARTIAL_STEP_SEC: float = 0.6
+    STT_PREFETCH_MIN_SIMILARITY: float = 0.8  # partiel ~ texte final : RAG préchargé réutilisé
 
     # TTS Piper
     PIPER_EXE: str = r"D:\AI\PIPER\PIPER.EXE"
     PIPER_MODEL: str = r"D:\AI\PIPER\model\fr_FR-tom-medium.onnx"
 
+    # TTS - réponse LLM streamée : la synthèse démarre dès la première phrase complète
+    TTS_STREAMING: bool = True
+
     # Mémoire
     DATA_DIR: str = r"D:\AI\max_assistant_v2\data"
     LONG_TERM_PATH: str = r"D:\AI\max_assistant_v2\data\long_term.jsonl"
     VECTOR_DIR: str = r"D:\AI\max_assistant_v2\data\vector_store"
 
+    # Mémoire - fenêtre verbatim + résumé glissant des tours plus anciens
+    SHORT_TERM_TURNS: int = 6
+    SUMMARY_ENABLED: bool = True
+    SUMMARY_PATH: str = r"D:\AI\max_assistant_v2\data\conversation_summary.json"
+    SUMMARY_MAX_TOKENS: int = 250
+
+    # Embeddings : "torch" (SentenceTransformer) | "onnx" | "onnx-int8" (ONNX Runtime CPU, sans torch)
+    EMBED_BACKEND: str = "torch"
+    EMBED_ONNX_PATH: str = ""  # vide = téléchargement depuis le repo HF du modèle
+
+    # Cache des embeddings (requêtes répétées) ; chemin vide = pas de niveau disque
+    EMBED_CACHE_SIZE: int = 4096
+    EMBED_CACHE_PATH: str = r"D:\AI\max_assistant_v2\data\embed_cache.sqlite"
+    EMBED_CACHE_DISK_MAX_ITEMS: int = 100_000  # ~1,5 Ko par vecteur 384-d
+
+    # Memory writer en tâche de fond (file bornée, attente max avant abandon)
+    MEMORY_WRITER_QUEUE_SIZE: int = 32
+    MEMORY_WRITER_SUBMIT_TIMEOUT_SEC: float = 0.5
+
     # RAG - mémoire personnelle
     RAG_TOP_K: int = 6
     RAG_MIN_SCORE: float = 0.25  # à ajuster selon ton modèle d'embeddings
+    RAG_SEARCH_MODE: str = "hybrid"  # "vector" | "lexical" | "hybrid" (BM25 + cosine, fusion RRF)
+
+    # Contexte du tour sous budget (profil > projet actif > RAG > tours récents)
+    CONTEXT_TOKEN_BUDGET: int = 1500
+    CONTEXT_MAX_TURN_TOKENS: int = 200     # réponse longue tronquée dans l'historique
+    TOKENIZER_ID: str = "Qwen/Qwen2.5-7B-Instruct"  # "" → estimation chars/4
+
+    # Cache sémantique des réponses (questions répétées / quasi identiques)
+    RESPONSE_CACHE: bool = True
+    RESPONSE_CACHE_THRESHOLD: float = 0.95
+    RESPONSE_CACHE_SIZE: int = 512
+
+    # Vector store - persistance write-behind (index.faiss réécrit en tâche de fond)
+    VECTOR_WRITE_BEHIND: bool = True
+    VECTOR_FLUSH_INTERVAL_SEC: float = 30.0
+    VECTOR_FLUSH_MAX_PENDING: int = 64
+
+    # Vector store - tier ANN : flat tant que petit, puis "hnsw" | "ivf" ("none" = toujours flat)
+    VECTOR_ANN_KIND: str = "hnsw"
+    VECTOR_ANN_THRESHOLD: int = 20000
+    VECTOR_HNSW_M: int = 32
+    VECTOR_HNSW_EF_SEARCH: int = 64
+    VECTOR_IVF_NPROBE: int = 16
+
+    # Vector store - fusion des quasi-doublons à l'insertion (0 = désactivé)
+    VECTOR_DEDUP_THRESHOLD: float = 0.92
 
 
 settings = Settings()
@@ -29,6 +29,11 @@ class Assistant:
         print("🤖 FRANK Assistant v2 prêt.")
         self.orchestrator.run_forever()
 
+    def close(self):
+        """Arrêt : rappels stoppés, mémoires vidées et persistées."""
+        self.reminder_service.stop()
+        self.orchestrator.close()
+
     def process_text(self, text: str) -> dict:
         try:
             response = self.orchestrator.process_text(text)
@@ -39,6 +44,23 @@ class Assistant:
                 "state": "calme"
             }
 
+        except Exception as e:
+            return {
+                "status": "error",
+                "response": str(e),
+                "state": "error"
+            }
+
+    async def aprocess_text(self, text: str) -> dict:
+        try:
+            response = await self.orchestrator.aprocess_text(text)
+
+            return {
+                "status": "ok",
+                "response": response,
+                "state": "calme"
+            }
+
         except Exception as e:
             return {
                 "status": "error",
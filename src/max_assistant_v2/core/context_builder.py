@@ -0,0 +1,166 @@
+# src/max_assistant_v2/core/context_builder.py
+import re
+
+from max_assistant_v2.utils.logger import get_logger
+
+log = get_logger(__name__)
+
+_WS_RE = re.compile(r"\s+")
+
+
+def _norm(text: str) -> str:
+    return _WS_RE.sub(" ", (text or "").strip().lower())
+
+
+class TokenCounter:
+    """
+    Compte les tokens avec le tokenizer du modèle (lib tokenizers, sans torch).
+    Repli : ~4 caractères par token si le tokenizer est indisponible.
+    """
+
+    CHARS_PER_TOKEN = 4.0
+
+    def __init__(self, tokenizer_id: str | None = None):
+        self.tokenizer = None
+        if tokenizer_id:
+            try:
+                from tokenizers import Tokenizer
+
+                self.tokenizer = Tokenizer.from_pretrained(tokenizer_id)
+            except Exception as e:
+                log.warning(f"Tokenizer {tokenizer_id} indisponible ({e}), estimation chars/4.")
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self.tokenizer is not None:
+            return len(self.tokenizer.encode(text, add_special_tokens=False).ids)
+        return int(len(text) / self.CHARS_PER_TOKEN) + 1
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        if max_tokens <= 0:
+            return ""
+        if self.count(text) <= max_tokens:
+            return text
+        if self.tokenizer is not None:
+            enc = self.tokenizer.encode(text, add_special_tokens=False)
+            end = enc.offsets[max_tokens - 1][1] if max_tokens <= len(enc.offsets) else len(text)
+            return text[:end].rstrip() + "…"
+        return text[: int(max_tokens * self.CHARS_PER_TOKEN)].rstrip() + "…"
+
+
+class ContextBuilder:
+    """
+    Contexte du tour sous budget de tokens fixe, rempli par priorité :
+      1. profil (partie stable réservée : elle part dans le prompt système)
+      2. projet actif
+      3. souvenirs RAG (dans l'ordre du classement)
+      4. résumé des échanges plus anciens
+      5. tours récents (du plus récent au plus ancien)
+    Dédoublonne entre sources (court terme / long terme contiennent les mêmes tours,
+    un souvenir RAG peut recopier un tour ou une ligne de profil).
+    """
+
+    def __init__(self, counter: TokenCounter, budget_tokens: int = 1500, max_turn_tokens: int = 200):
+        self.counter = counter
+        self.budget_tokens = int(budget_tokens)
+        self.max_turn_tokens = int(max_turn_tokens)
+        self.last_usage: dict = {}
+
+    def build(
+        self,
+        profile_stable: str = "",
+        profile_turn: str = "",
+        project: dict | None = None,
+        retrieved: list[str] | None = None,
+        turns: list[tuple[str, str]] | None = None,
+        summary: str = "",
+    ) -> tuple[str, list[str]]:
+        """Retourne (context, retrieved) à passer au Router."""
+        count = self.counter.count
+        left = self.budget_tokens
+        usage = {"profile": 0, "project": 0, "rag": 0, "summary": 0, "turns": 0}
+
+        # 1) profil
+        usage["profile"] = count(profile_stable)
+        left -= usage["profile"]
+
+        profile_turn = self.counter.truncate(profile_turn, max(0, left)) if profile_turn else ""
+        usage["profile"] += count(profile_turn)
+        left -= count(profile_turn)
+
+        seen = {_norm(line) for line in (profile_stable + "\n" + profile_turn).splitlines() if line.strip()}
+
+        # 2) projet actif
+        project_block = ""
+        if project:
+            project_block = f"Projet actif : {project.get('title', '')}"
+            if project.get("theme"):
+                project_block += f" (thème : {project['theme']})"
+            if project.get("description"):
+                project_block += f"\n{project['description']}"
+            project_block = self.counter.truncate(project_block, max(0, left))
+            usage["project"] = count(project_block)
+            left -= usage["project"]
+
+        # tours dédoublonnés (ordre chronologique conservé)
+        unique_turns = []
+        turn_keys = set()
+        for u, a in turns or []:
+            key = (_norm(u), _norm(a))
+            if key in turn_keys:
+                continue
+            turn_keys.add(key)
+            unique_turns.append((u, a))
+        turn_texts = {_norm(u) for u, _ in unique_turns} | {_norm(a) for _, a in unique_turns}
+
+        # 3) RAG : entiers ou rien, dans l'ordre du classement
+        kept = []
+        for item in retrieved or []:
+            body = _norm(item.split("] ", 1)[-1])
+            if body in seen or body in turn_texts:
+                continue
+            seen.add(body)
+            cost = count(item) + 2
+            if cost > left:
+                continue
+            kept.append(item)
+            usage["rag"] += cost
+            left -= cost
+
+        # 4) résumé glissant
+        summary_block = ""
+        if summary:
+            summary_block = self.counter.truncate(f"--- Résumé des échanges précédents ---\n{summary}", max(0, left))
+            usage["summary"] = count(summary_block)
+            left -= usage["summary"]
+
+        # 5) tours récents, du plus récent au plus ancien
+        lines = []
+        for u, a in reversed(unique_turns):
+            a = self.counter.truncate(a, self.max_turn_tokens)
+            block = f"User: {u}\nAssistant: {a}"
+            cost = count(block) + 1
+            if cost > left:
+                break
+            lines.append(block)
+            usage["turns"] += cost
+            left -= cost
+        lines.reverse()
+
+        parts = []
+        if summary_block:
+            parts.append(summary_block)
+        if lines:
+            parts.append("--- Conversation récente ---\n" + "\n".join(lines) + "\n--- Fin ---")
+        if project_block:
+            parts.append(project_block)
+        if profile_turn:
+            parts.append(profile_turn)
+
+        usage["total"] = self.budget_tokens - left
+        usage["turns_kept"] = len(lines)
+        usage["turns_available"] = len(unique_turns)
+        self.last_usage = usage
+
+        return "\n\n".join(parts), kept
@@ -1,17 +1,34 @@
 # src/max_assistant_v2/core/orchestrator.py
+import asyncio
+import atexit
+import difflib
+import functools
+import hashlib
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 from max_assistant_v2.config.settings import settings
 from max_assistant_v2.stt.whisper_engine import WhisperSTT
+from max_assistant_v2.stt.wake_word import build_wake_detector
 from max_assistant_v2.tts.piper_engine import PiperTTS
-from max_assistant_v2.llm.lmstudio_client import LMStudioClient
+from max_assistant_v2.llm.lmstudio_client import AsyncLMStudioClient, LMStudioClient
+from max_assistant_v2.llm.transport import AsyncLLMTransport, ConcurrencyLimiter, LLMTransport, LLMUnavailable
 from max_assistant_v2.core.router import Router
+from max_assistant_v2.core.response_cache import ResponseCache, context_dependent
+from max_assistant_v2.core.context_builder import ContextBuilder, TokenCounter
+from max_assistant_v2.agents.intent_classifier import IntentClassifier, normalize
 from max_assistant_v2.memory.short_term import ShortTermMemory
 from max_assistant_v2.memory.long_term import LongTermMemory
 from max_assistant_v2.memory.vector_store import VectorStore
 from max_assistant_v2.memory.embeddings import Embeddings
+from max_assistant_v2.memory.embedding_cache import EmbeddingCache
 from max_assistant_v2.utils.logger import get_logger
 from max_assistant_v2.ui.hud import SpeakingHUD
 from datetime import datetime, timezone
 from max_assistant_v2.memory.memory_writer import MemoryWriter
+from max_assistant_v2.memory.memory_worker import MemoryWriterWorker
+from max_assistant_v2.memory.summarizer import ConversationSummarizer
 from max_assistant_v2.tools.tool_registry import ToolRegistry
 from max_assistant_v2.tools.system_tools import SystemTools
 from max_assistant_v2.ui.console_hud import ConsoleStateHUD
@@ -21,27 +38,137 @@ log = get_logger(__name__)
 
 class Orchestrator:
     def __init__(self, hud: SpeakingHUD | None = None):
-        self.stt = WhisperSTT()
+        self.stt = WhisperSTT(wake=build_wake_detector(
+            kind=settings.WAKE_ENGINE,
+            wake_word=settings.WAKE_WORD,
+            model=settings.WAKE_MODEL,
+            threshold=settings.WAKE_THRESHOLD,
+            interval_sec=settings.WAKE_INTERVAL_SEC,
+        ), silence_ms=settings.SILENCE_MS, frame_ms=settings.FRAME_MS, sample_rate=settings.SAMPLE_RATE,
+            streaming=settings.STT_STREAMING, partial_step_sec=settings.STT_PARTIAL_STEP_SEC)
         self.tts = PiperTTS(piper_exe=settings.PIPER_EXE, piper_model=settings.PIPER_MODEL)
-        self.llm = LMStudioClient(base_url=settings.LM_BASE_URL, model_id=settings.MODEL_ID)
+        transport_opts = dict(
+            connect_timeout_sec=settings.LM_CONNECT_TIMEOUT_SEC,
+            read_timeout_sec=settings.LM_READ_TIMEOUT_SEC,
+            deadline_sec=settings.LM_DEADLINE_SEC,
+            # un seul jeu de créneaux pour la boucle vocale et le serveur web
+            limiter=ConcurrencyLimiter(settings.LM_MAX_CONCURRENCY, settings.LM_BACKGROUND_CONCURRENCY),
+            acquire_timeout_sec=settings.LM_ACQUIRE_TIMEOUT_SEC,
+            max_retries=settings.LM_MAX_RETRIES,
+            pool_max_connections=settings.LM_POOL_MAX_CONNECTIONS,
+            pool_max_keepalive=settings.LM_POOL_MAX_KEEPALIVE,
+        )
+        self.llm = LMStudioClient(
+            base_url=settings.LM_BASE_URL,
+            model_id=settings.MODEL_ID,
+            transport=LLMTransport(base_url=settings.LM_BASE_URL, **transport_opts)
+        )
+        # client async pour le serveur web (aprocess_text)
+        self.allm = AsyncLMStudioClient(
+            base_url=settings.LM_BASE_URL,
+            model_id=settings.MODEL_ID,
+            transport=AsyncLLMTransport(base_url=settings.LM_BASE_URL, **transport_opts),
+            prompts=self.llm.prompts,
+        )
 
         self.memory_writer = MemoryWriter(self.llm)
 
-        self.short_mem = ShortTermMemory(max_turns=12)
         self.long_mem = LongTermMemory(path=settings.LONG_TERM_PATH)
+
+        # Résumé glissant : les tours qui sortent de la fenêtre y sont repliés en tâche de fond
+        self.summarizer = None
+        if settings.SUMMARY_ENABLED:
+            self.summarizer = ConversationSummarizer(
+                self.llm,
+                path=settings.SUMMARY_PATH,
+                max_tokens=settings.SUMMARY_MAX_TOKENS,
+            )
+            self.short_mem = ShortTermMemory(max_turns=settings.SHORT_TERM_TURNS, on_evict=self.summarizer.submit)
+            # continuité après redémarrage : les derniers tours ne sont pas encore dans le résumé
+            self.short_mem.preload(self.long_mem.last(n=settings.SHORT_TERM_TURNS))
+        else:
+            self.short_mem = ShortTermMemory(max_turns=12)
         self.profile = ProfileMemory()
 
-        self.embed = Embeddings()
-        self.vstore = VectorStore(dir_path=settings.VECTOR_DIR, embeddings=self.embed)
+        self.embed = Embeddings(
+            backend=settings.EMBED_BACKEND,
+            onnx_path=settings.EMBED_ONNX_PATH or None,
+            cache=EmbeddingCache(
+                max_items=settings.EMBED_CACHE_SIZE,
+                disk_path=settings.EMBED_CACHE_PATH or None,
+                disk_max_items=settings.EMBED_CACHE_DISK_MAX_ITEMS,
+            )
+        )
+        self.vstore = VectorStore(
+            dir_path=settings.VECTOR_DIR,
+            embeddings=self.embed,
+            write_behind=settings.VECTOR_WRITE_BEHIND,
+            flush_interval_sec=settings.VECTOR_FLUSH_INTERVAL_SEC,
+            flush_max_pending=settings.VECTOR_FLUSH_MAX_PENDING,
+            ann_kind=settings.VECTOR_ANN_KIND,
+            ann_threshold=settings.VECTOR_ANN_THRESHOLD,
+            hnsw_m=settings.VECTOR_HNSW_M,
+            hnsw_ef_search=settings.VECTOR_HNSW_EF_SEARCH,
+            ivf_nprobe=settings.VECTOR_IVF_NPROBE,
+            dedup_threshold=settings.VECTOR_DEDUP_THRESHOLD,
+        )
+
+        # Écriture mémoire (LLM + index) hors du chemin de réponse
+        self.memory_worker = MemoryWriterWorker(
+            self.memory_writer,
+            self.vstore,
+            max_queue=settings.MEMORY_WRITER_QUEUE_SIZE,
+            submit_timeout_sec=settings.MEMORY_WRITER_SUBMIT_TIMEOUT_SEC,
+        )
 
         self.tool_registry = ToolRegistry()
         self.system_tools = SystemTools(self.tool_registry)
         self.console_hud = ConsoleStateHUD()
 
-        self.router = Router(llm=self.llm, profile=self.profile)
+        intent_classifier = None
+        if settings.INTENT_CLASSIFIER:
+            intent_classifier = IntentClassifier(
+                apps=self.tool_registry.apps,
+                embeddings=self.embed if settings.INTENT_USE_EMBEDDINGS else None,
+                min_confidence=settings.INTENT_MIN_CONFIDENCE,
+            )
+
+        self.router = Router(
+            llm=self.llm,
+            profile=self.profile,
+            fused=settings.FUSED_PLANNER,
+            intent_classifier=intent_classifier,
+            allm=self.allm,
+        )
+
+        self.context_builder = ContextBuilder(
+            TokenCounter(settings.TOKENIZER_ID or None),
+            budget_tokens=settings.CONTEXT_TOKEN_BUDGET,
+            max_turn_tokens=settings.CONTEXT_MAX_TURN_TOKENS,
+        )
+
+        # Cache des réponses, vidé de ce qui dépend d'un profil périmé
+        self.response_cache = None
+        if settings.RESPONSE_CACHE:
+            self.response_cache = ResponseCache(
+                threshold=settings.RESPONSE_CACHE_THRESHOLD,
+                max_items=settings.RESPONSE_CACHE_SIZE,
+            )
+            self.profile.add_listener(lambda fp: self.response_cache.invalidate(fingerprint=fp))
+
+        # RAG lancé sur les transcriptions partielles (pendant que l'utilisateur parle) ;
+        # rattaché à une commande vocale précise : un tour web ne le consomme jamais
+        self._prefetch_lock = threading.Lock()
+        self._prefetch = None  # (n° de commande vocale, tokens normalisés, Future)
+        self._voice_turn = 0
+        self._prefetch_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rag-prefetch")
 
         self.hud = hud 
 
+        # sortie normale du process (fenêtre HUD fermée, Ctrl+C) : mémoires vidées et persistées
+        self._closed = False
+        atexit.register(self.close)
+
     def record_user_emotion(self):
 
         emotion, intensity = self.router.profile.get_emotion()
@@ -78,22 +205,50 @@ class Orchestrator:
         print(f"\n🗣️ User État détecté : {emotion.upper()}")
         print(f"   Intensité : {bar} {intensity:.2f}\n")
     
-    def process_text(self, text: str) -> str:
-
-        #print(f"🌐 INPUT EXTERNE: {text}")
-
-        # Etat réflexion
-        self.console_hud.set_state("reflexion", 0.6)
-
+    def _is_trivial(self, text: str) -> bool:
         low = text.strip().lower()
-        if len(low) < 6 or low in {"ok", "oui", "non", "merci", "d'accord", "ça marche"}:
-            retrieved_items = []
-        else:
-            retrieved_items = self.vstore.search(
-                text,
-                k=settings.RAG_TOP_K,
-                min_score=settings.RAG_MIN_SCORE
-            )
+        return len(low) < 6 or low in {"ok", "oui", "non", "merci", "d'accord", "ça marche"}
+
+    def _cache_fingerprint(self) -> str:
+        """Profil + émotion + projet actif : une réponse ne sert que dans le même état."""
+        emotion, _ = self.profile.get_emotion()
+        project = self.router.projects.get_current_project()
+        project_fp = hashlib.sha1(json.dumps(project, sort_keys=True, default=str).encode()).hexdigest()[:8] if project else ""
+        return f"{self.profile.fingerprint()}:{emotion or ''}:{project_fp}"
+
+    def _cache_key(self, text: str):
+        """(vecteur de la question, empreinte) ou None si pas de cache."""
+        if self.response_cache is None or self._is_trivial(text):
+            return None
+        # suite de conversation ("pourquoi ?", "et demain ?") : la réponse dépend du tour précédent
+        if context_dependent(text):
+            return None
+        # même encodage que la recherche RAG → servi par l'EmbeddingCache ensuite
+        vec = self.embed.encode([text])[0]
+        return vec, self._cache_fingerprint()
+
+    def _cache_lookup(self, key, text: str) -> str | None:
+        if key is None:
+            return None
+        return self.response_cache.lookup(text, key[0], key[1])
+
+    def _cache_store(self, key, text: str, meta: dict, response: str):
+        if key is None:
+            return
+        # empreinte après le tour : l'émotion a pu être mise à jour par le Router
+        self.response_cache.store(text, key[0], self._cache_fingerprint(), meta.get("route", ""), response)
+
+    def _retrieve(self, text: str) -> list[str]:
+        """Souvenirs RAG formatés et dédoublonnés."""
+        if self._is_trivial(text):
+            return []
+
+        retrieved_items = self.vstore.search(
+            text,
+            k=settings.RAG_TOP_K,
+            min_score=settings.RAG_MIN_SCORE,
+            mode=settings.RAG_SEARCH_MODE,
+        )
 
         def fmt_mem(it: dict) -> str:
             md = it.get("metadata", {}) or {}
@@ -110,55 +265,180 @@ class Orchestrator:
             if s not in seen:
                 seen.add(s)
                 retrieved.append(s)
+        return retrieved
+
+    def prefetch(self, partial: str, turn: int):
+        """
+        Transcription partielle de la commande vocale n° turn : recherche RAG lancée
+        en avance (une à la fois, la plus récente de cette commande).
+        """
+        if self._is_trivial(partial):
+            return
+        key = normalize(partial)
+        with self._prefetch_lock:
+            current = self._prefetch
+            if current is not None and current[0] == turn and (current[1] == key or not current[2].done()):
+                return
+            self._prefetch = (turn, key, self._prefetch_pool.submit(self._retrieve, partial))
+
+    def _retrieved_for(self, text: str, turn: int | None = None) -> list[str]:
+        """
+        Résultat préchargé pour la commande vocale n° turn si son dernier partiel est assez
+        proche du texte final, sinon recherche normale. turn=None (web) : pas de préchargement.
+        """
+        if turn is None:
+            return self._retrieve(text)
+        with self._prefetch_lock:
+            prefetched = self._prefetch
+            if prefetched is not None and prefetched[0] <= turn:
+                self._prefetch = None
+        if prefetched is None or prefetched[0] != turn:
+            return self._retrieve(text)
+
+        # similarité mot à mot (sans casse, accents ni ponctuation) : mot corrigé ou fin manquante acceptés
+        similarity = difflib.SequenceMatcher(None, prefetched[1], normalize(text)).ratio()
+        if similarity >= settings.STT_PREFETCH_MIN_SIMILARITY:
+            try:
+                retrieved = prefetched[2].result()
+                log.debug("RAG préchargé pendant la commande")
+                return retrieved
+            except Exception as e:
+                log.warning(f"Préchargement RAG: {e}")
+        return self._retrieve(text)
+
+    def _prepare(self, text: str, turn: int | None = None) -> tuple[str, list[str]]:
+        """RAG + contexte court terme : (context, retrieved). turn : n° de commande vocale."""
 
-        context = self.short_mem.render() + self.long_mem.render_last(n=12)
+        #print(f"🌐 INPUT EXTERNE: {text}")
 
-        response = self.router.handle(
-            user_text=text,
-            context=context,
-            retrieved=retrieved
+        # Etat réflexion
+        self.console_hud.set_state("reflexion", 0.6)
+
+        retrieved = self._retrieved_for(text, turn)
+
+        if self.summarizer is not None:
+            # plus ancien que la fenêtre : déjà dans le résumé
+            turns = self.short_mem.turns()
+            summary = self.summarizer.summary
+        else:
+            # long terme puis court terme : les doublons sont fusionnés par le builder
+            turns = self.long_mem.last(n=12) + self.short_mem.turns()
+            summary = ""
+
+        context, retrieved = self.context_builder.build(
+            profile_stable=self.profile.build_context(part="stable"),
+            profile_turn=self.profile.build_context(hint_text=text, part="turn"),
+            project=self.router.projects.get_current_project(),
+            retrieved=retrieved,
+            turns=turns,
+            summary=summary,
         )
+        log.debug(f"Budget contexte : {self.context_builder.last_usage}")
+        return context, retrieved
+
+    def _unavailable(self, e: Exception) -> str:
+        # serveur saturé / bloqué : réponse courte plutôt qu'une attente sans fin
+        log.error(str(e))
+        self.console_hud.set_state("calme", 0.3)
+        return "Le modèle local ne répond pas pour le moment. Réessaie dans un instant."
+
+    def _finish(self, text: str, response: str) -> str:
+        """Mémoires, memory writer (tâche de fond), émotion."""
 
         # IMPORTANT : garder la mémoire complète
         self.short_mem.add(user=text, assistant=response)
         self.long_mem.append(user=text, assistant=response)
 
-        ts = datetime.now(timezone.utc).isoformat()
-
-        decision = self.memory_writer.decide(
+        # Memory writer en tâche de fond : la réponse n'attend pas le LLM de tri
+        self.memory_worker.submit(
             user_text=text,
             assistant_text=response,
-            user_profile=None
+            ts=datetime.now(timezone.utc).isoformat(),
         )
 
-        if decision.should_write:
-            self.vstore.add(
-                decision.memory_text,
-                metadata={
-                    "role": "memory",
-                    "ts": ts,
-                    "confidence": decision.confidence,
-                    "tags": decision.tags,
-                    "kind": "fact"
-                }
-            )
-
         # Emotion
         self.record_user_emotion()
 
+        log.debug(f"Réutilisation préfixe prompt : {self.llm.prompts.stats()}")
+        if self.response_cache is not None:
+            log.debug(f"Cache réponses : {self.response_cache.stats()}")
+
         self.console_hud.set_state("calme", 0.3)
         user_emotion, user_intensity = self.router.profile.get_emotion()
         print("🗣️ USER EMOTION:", user_emotion, user_intensity)
         return response
 
+    def process_text(self, text: str, on_sentence=None, turn: int | None = None) -> str:
+        key = self._cache_key(text)
+        cached = self._cache_lookup(key, text)
+        if cached is not None:
+            return self._finish(text, cached)
+
+        context, retrieved = self._prepare(text, turn)
+
+        meta = {}
+        try:
+            response = self.router.handle(
+                user_text=text,
+                context=context,
+                retrieved=retrieved,
+                on_sentence=on_sentence,
+                meta=meta
+            )
+        except LLMUnavailable as e:
+            fallback = self._unavailable(e)
+            if on_sentence is not None:
+                # échec en cours de flux : des phrases ont pu être dites, le message suit dans
+                # le même flux TTS (sinon run_forever le croirait déjà prononcé)
+                on_sentence(fallback)
+            return fallback
+
+        self._cache_store(key, text, meta, response)
+        return self._finish(text, response)
+
+    async def aprocess_text(self, text: str) -> str:
+        """
+        Version async (serveur web) : les appels LLM ne tiennent pas de thread,
+        le travail CPU / disque (RAG, mémoires) part dans le pool de threads.
+        """
+        key = await asyncio.to_thread(self._cache_key, text)
+        cached = self._cache_lookup(key, text)
+        if cached is not None:
+            return await asyncio.to_thread(self._finish, text, cached)
+
+        context, retrieved = await asyncio.to_thread(self._prepare, text)
+
+        meta = {}
+        try:
+            response = await self.router.ahandle(
+                user_text=text,
+                context=context,
+                retrieved=retrieved,
+                meta=meta
+            )
+        except LLMUnavailable as e:
+            return self._unavailable(e)
+
+        self._cache_store(key, text, meta, response)
+        return await asyncio.to_thread(self._finish, text, response)
+
 
     def run_forever(self):
+        try:
+            self._listen_loop()
+        finally:
+            self.close()
+
+    def _listen_loop(self):
         while True:
 
             self.console_hud.set_state("ecoute", 0.4)
-            
+
+            self._voice_turn += 1
+            turn = self._voice_turn
             text = self.stt.listen_one_utterance(
-                wake_word=settings.WAKE_WORD
+                wake_word=settings.WAKE_WORD,
+                on_partial=functools.partial(self.prefetch, turn=turn)
             )
             if not text:
                 continue
@@ -170,103 +450,68 @@ class Orchestrator:
 
             print(f"🗣️ User: {text}")
 
-            # -------------------------
-            # FRANK entre en réflexion
-            # -------------------------
-            self.console_hud.set_state("reflexion", 0.6)
-          
-        
-            # RAG (mémoire perso) : pas utile sur des messages trop courts
-            low = text.strip().lower()
-            if len(low) < 6 or low in {"ok", "oui", "non", "merci", "d'accord", "ça marche"}:
-                retrieved_items = []
-            else:
-                retrieved_items = self.vstore.search(
-                    text,
-                    k=settings.RAG_TOP_K,
-                    min_score=settings.RAG_MIN_SCORE
-                )
-
-            def fmt_mem(it: dict) -> str:
-                md = it.get("metadata", {}) or {}
-                role = md.get("role", md.get("type", "mem"))
-                ts = md.get("ts", "")
-                score = it.get("score", 0.0)
-                txt = it.get("text", "")
-                return f"[{role} | {ts} | score={score:.2f}] {txt}".strip()
-
-            # dédoublonnage simple
-            seen = set()
-            retrieved = []
-            for it in retrieved_items:
-                s = fmt_mem(it)
-                if s not in seen:
-                    seen.add(s)
-                    retrieved.append(s)
-
-
-            context = self.short_mem.render() + self.long_mem.render_last(n=12)
-
-            response = self.process_text(text)
-
-            # Enregistrer émotion USER détectée
-            self.record_user_emotion()
-
-            # -------------------------
-            # Réponse prête → FRANK calme
-            # -------------------------
-            self.console_hud.set_state("calme", 0.3)
-
-            self.short_mem.add(user=text, assistant=response)
-            self.long_mem.append(user=text, assistant=response)
-
-            # ====================================
-            # MEMORY WRITER (LLM GATING PROPRE)
-            # ====================================
-
-            ts = datetime.now(timezone.utc).isoformat()
-
-            decision = self.memory_writer.decide(
-                user_text=text,
-                assistant_text=response,
-                user_profile=None  # tu peux brancher ton profile plus tard
-            )
-
-            if decision.should_write:
-                self.vstore.add(
-                    decision.memory_text,
-                    metadata={
-                        "role": "memory",
-                        "ts": ts,
-                        "confidence": decision.confidence,
-                        "tags": decision.tags,
-                        "kind": "fact"
-                    }
-                )
+            # RAG, mémoire, émotion et memory writer (en tâche de fond) : process_text
+            if not settings.TTS_STREAMING:
+                response = self.process_text(text, turn=turn)
+                self._say(response)
+                continue
 
-            # ====================================
-            # FIN MEMORY WRITER
-            # ====================================
+            # Streaming : la première phrase part au TTS pendant que le LLM génère la suite.
+            # Le flux audio n'est ouvert qu'à la première phrase (l'émotion est alors à jour).
+            speech = None
+
+            def on_sentence(sentence: str):
+                nonlocal speech
+                if speech is None:
+                    if self.hud:
+                        self.hud.show()
+                    user_emotion, user_intensity = self.router.profile.get_emotion()
+                    speech = self.tts.open_stream(
+                        hud=self.hud,
+                        user_emotion=user_emotion,
+                        user_intensity=user_intensity
+                    )
+                speech.feed(sentence)
+
+            response = self.process_text(text, on_sentence=on_sentence, turn=turn)
+
+            if speech is None:
+                # réponse directe (outil, commande...) : rien n'a été streamé
+                self._say(response)
+                continue
 
-            
+            speech.close()
 
             if self.hud:
-                self.hud.show()
-
-            # --- Etat utilisateur stocké ---
-            user_emotion, user_intensity = self.router.profile.get_emotion()
-
-            print("🗣️ USER EMOTION:", user_emotion, user_intensity)
-            
-            self.tts.say(
-                response,
-                hud=self.hud,
-                user_emotion=user_emotion,
-                user_intensity=user_intensity
-            )
+                self.hud.hide()
 
+    def _say(self, response: str):
+        if self.hud:
+            self.hud.show()
 
-            if self.hud:
-                self.hud.hide()
+        # --- Etat utilisateur stocké ---
+        user_emotion, user_intensity = self.router.profile.get_emotion()
+
+        self.tts.say(
+            response,
+            hud=self.hud,
+            user_emotion=user_emotion,
+            user_intensity=user_intensity
+        )
+
+        if self.hud:
+            self.hud.hide()
+
+    def close(self):
+        """Vide la file du memory writer puis persiste le vector store (une seule fois)."""
+        if self._closed:
+            return
+        self._closed = True
+        self.memory_worker.close()
+        if self.summarizer is not None:
+            self.summarizer.close()
+        self._prefetch_pool.shutdown(wait=False)
+        self.vstore.close()
+        self.llm.transport.close()
 
 
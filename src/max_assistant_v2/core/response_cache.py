@@ -0,0 +1,173 @@
+# src/max_assistant_v2/core/response_cache.py
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from max_assistant_v2.agents.intent_classifier import extract_city, normalize
+from max_assistant_v2.utils.logger import get_logger
+
+log = get_logger(__name__)
+
+# Durée de vie par route (Router meta["route"]). Route absente = jamais mise en cache :
+# réponses directes (déjà instantanées) et outils à effet de bord (apps, caméra, agenda...).
+DEFAULT_TTLS = {
+    "answer": 1800.0,
+    "tool:weather": 600.0,
+    "tool:web_search": 3600.0,
+}
+
+# Routes outil : la question doit être identique (texte normalisé), pas seulement proche
+EXACT_KEY_ROUTES = {"tool:weather", "tool:web_search"}
+
+# Repères temporels (tokens normalisés) : "météo demain" ≠ "météo ce soir"
+_TIME_WORDS = {
+    "aujourd", "demain", "hier", "apres", "lundi", "mardi", "mercredi", "jeudi", "vendredi", "samedi",
+    "dimanche", "matin", "midi", "soir", "nuit", "semaine", "week", "mois", "annee", "prochain",
+    "prochaine", "dernier", "derniere",
+}
+
+# Tours qui n'ont de sens qu'avec l'échange précédent ("pourquoi ?", "et demain ?")
+_FOLLOWUP_START = {"et", "pourquoi", "alors", "donc", "mais", "ensuite", "puis", "sinon", "aussi", "plus", "encore"}
+_ANAPHORA = {"ca", "cela", "ceci", "celui", "celle", "ceux", "celles", "pareil", "meme", "precedent", "precedente"}
+
+
+def _key(text: str) -> str:
+    """Texte normalisé (minuscules, sans accents ni ponctuation)."""
+    return " ".join(normalize(text))
+
+
+def _entities(text: str) -> frozenset:
+    """Nombres, ville et repères temporels, sur texte normalisé : "météo à lyon" ≠ "météo à lille"."""
+    tokens = normalize(text)
+    ents = {t for t in tokens if t.isdigit() or t in _TIME_WORDS}
+    city = extract_city(text)
+    if city:
+        ents.add("ville:" + _key(city))
+    return frozenset(ents)
+
+
+def context_dependent(text: str) -> bool:
+    """True si la question dépend du tour précédent : jamais servie ni stockée par le cache."""
+    tokens = normalize(text)
+    if not tokens:
+        return True
+    if tokens[0] in _FOLLOWUP_START and len(tokens) <= 4:
+        return True
+    return any(t in _ANAPHORA for t in tokens)
+
+
+class ResponseCache:
+    """
+    Cache sémantique des réponses :
+    - clé = embedding de la question + empreinte (profil, émotion, projet actif)
+    - hit si cosinus >= threshold ET mêmes entités (nombres, ville, dates) ;
+      texte normalisé identique exigé pour les routes outil (EXACT_KEY_ROUTES)
+    - TTL par route ; invalidation quand l'empreinte du profil change
+    - compteurs hits / misses / stores pour le taux de hit
+    """
+
+    def __init__(self, threshold: float = 0.95, max_items: int = 512, ttls: dict | None = None):
+        self.threshold = float(threshold)
+        self.max_items = max(1, int(max_items))
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, dict]" = OrderedDict()
+        self._next_id = 0
+        self._matrix = None  # (ids, vecteurs empilés), reconstruit à la demande
+
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.invalidated = 0
+
+    def _vectors(self):
+        if self._matrix is None:
+            ids = list(self._entries.keys())
+            vecs = np.stack([self._entries[i]["vec"] for i in ids]) if ids else None
+            self._matrix = (ids, vecs)
+        return self._matrix
+
+    def _expire(self, now: float):
+        dead = [i for i, e in self._entries.items() if e["expires"] <= now]
+        for i in dead:
+            del self._entries[i]
+        if dead:
+            self._matrix = None
+
+    def lookup(self, text: str, vec, fingerprint: str) -> str | None:
+        vec = np.asarray(vec, dtype="float32")
+        key = _key(text)
+        entities = _entities(text)
+
+        with self._lock:
+            self._expire(time.time())
+            ids, vecs = self._vectors()
+
+            if vecs is not None:
+                sims = vecs @ vec
+                for idx in np.argsort(-sims):
+                    if sims[idx] < self.threshold:
+                        break
+                    e = self._entries[ids[idx]]
+                    if e["fingerprint"] != fingerprint:
+                        continue
+                    if e["entities"] != entities:
+                        continue
+                    if e["route"] in EXACT_KEY_ROUTES and e["key"] != key:
+                        continue
+                    self._entries.move_to_end(ids[idx])
+                    self.hits += 1
+                    log.info(f"Cache réponse : hit ({e['route']}, sim={sims[idx]:.3f})")
+                    return e["response"]
+
+            self.misses += 1
+            return None
+
+    def store(self, text: str, vec, fingerprint: str, route: str, response: str) -> bool:
+        ttl = self.ttls.get(route or "")
+        if not ttl or not (response or "").strip():
+            return False
+
+        with self._lock:
+            self._entries[self._next_id] = {
+                "key": _key(text),
+                "entities": _entities(text),
+                "vec": np.asarray(vec, dtype="float32"),
+                "fingerprint": fingerprint,
+                "route": route,
+                "response": response,
+                "expires": time.time() + ttl,
+            }
+            self._next_id += 1
+            while len(self._entries) > self.max_items:
+                self._entries.popitem(last=False)
+            self._matrix = None
+            self.stores += 1
+        return True
+
+    def invalidate(self, fingerprint: str | None = None):
+        """Supprime tout, ou seulement ce qui ne correspond plus à l'empreinte donnée."""
+        with self._lock:
+            before = len(self._entries)
+            if fingerprint is None:
+                self._entries.clear()
+            else:
+                for i in [i for i, e in self._entries.items() if not e["fingerprint"].startswith(fingerprint)]:
+                    del self._entries[i]
+            self.invalidated += before - len(self._entries)
+            self._matrix = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "items": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "stores": self.stores,
+                "invalidated": self.invalidated,
+            }
@@ -1,6 +1,9 @@
+import asyncio
 import json
 import re
 import random
+import time
+from dataclasses import dataclass
 
 from max_assistant_v2.agents.planner_agent import PlannerAgent
 from max_assistant_v2.tools.tool_registry import ToolRegistry
@@ -16,13 +19,28 @@ from max_assistant_v2.tools.image_tools import ImageTools
 from max_assistant_v2.config.identity import FRANK_IDENTITY
 from max_assistant_v2.tools.webcam_tools import WebcamTools
 from max_assistant_v2.tools.system_reset_tools import SystemResetTools
+from max_assistant_v2.llm.streaming import iter_sentences
+from max_assistant_v2.llm.transport import LLMUnavailable
 
 log = get_logger(__name__)
 
 
+@dataclass
+class Step:
+    """Appel bloquant demandé par Router._steps : "chat", "raw_chat" ou "tool"."""
+    kind: str
+    kwargs: dict
+
+
 class Router:
-    def __init__(self, llm, profile):
+    def __init__(self, llm, profile, fused: bool = False, intent_classifier=None, allm=None):
         self.llm = llm
+        # AsyncLMStudioClient optionnel pour ahandle()
+        self.allm = allm
+        # fused=True : extraction perso + plan (+ réponse courte) en un seul appel LLM
+        self.fused = fused
+        # IntentClassifier optionnel, consulté avant le planner
+        self.intent_classifier = intent_classifier
         self.planner = PlannerAgent(llm)
         self.profile = profile
         self.behavior = BehaviorAnalyzer(self.profile)
@@ -51,6 +69,27 @@ class Router:
         )
         self._pending_full_reset = False
 
+    def _chat(self, *args, on_sentence=None, **kwargs) -> str:
+        """
+        llm.chat() ; si on_sentence est fourni, la réponse est streamée
+        et chaque phrase complète lui est passée dès qu'elle arrive.
+        Retourne toujours le texte complet.
+        """
+        if on_sentence is None:
+            return self.llm.chat(*args, **kwargs)
+
+        parts = []
+
+        def tokens():
+            for tok in self.llm.chat(*args, stream=True, **kwargs):
+                parts.append(tok)
+                yield tok
+
+        for sentence in iter_sentences(tokens()):
+            on_sentence(sentence)
+
+        return "".join(parts).strip()
+
     def detect_implicit_emotion(self, text: str):
         text = (text or "").lower()
 
@@ -103,8 +142,8 @@ class Router:
         return t.startswith(starters)
 
 
-    def extract_personal_info(self, user_text: str):
-        prompt = f"""
+    def _personal_prompt(self, user_text: str) -> str:
+        return f"""
 Tu es un module d'extraction de mémoire personnelle.
 
 Analyse la phrase suivante.
@@ -141,8 +180,10 @@ Phrase :
 \"\"\"{user_text}\"\"\"
 """
 
-        result = self.llm.chat(prompt)
+    def extract_personal_info(self, user_text: str):
+        return self._parse_personal(self.llm.chat(self._personal_prompt(user_text)))
 
+    def _parse_personal(self, result: str) -> dict:
         # parsing robuste (le modèle peut ajouter du texte)
         try:
             m = re.search(r"\{.*\}", result, re.DOTALL)
@@ -153,8 +194,122 @@ Phrase :
 
         return {"type": "none", "key": "", "value": ""}
 
-    def handle(self, user_text: str, context: str, retrieved: list[str], state_cb=None) -> str:
-        
+    def _apply_personal(self, personal: dict, txt: str) -> str | None:
+        """Applique une extraction personnelle au profil ; retourne la réponse à dire, sinon None."""
+        t = (personal.get("type") or "none").lower()
+        key = (personal.get("key") or "").strip()
+        value = (personal.get("value") or "").strip()
+
+        if t != "none" and value:
+            if t == "name":
+                self.profile.set_name(value)
+                return f"D'accord {value.capitalize()}, je m'en souviendrai."
+
+            if t == "location":
+                self.profile.set_location(value)
+                return f"Très bien, tu habites à {value.capitalize()}."
+
+            if t == "relation":
+                # key attendu: "femme", "mari", "enfant", etc.
+                rel = key.lower() if key else "proche"
+                self.profile.set_relation(rel, value)
+                return f"Je retiens que ton/ta {rel} s'appelle {value.capitalize()}."
+
+            if t == "preference":
+
+                val_low = value.lower()
+                key_low = key.lower()
+
+                # 🔥 NORMALISATION INTELLIGENTE
+                if "court" in val_low:
+                    self.profile.set_preference("style", "court", importance=0.9)
+
+                elif "long" in val_low or "detail" in val_low:
+                    self.profile.set_preference("style", "detaille", importance=0.9)
+
+                elif key_low in ["réponse", "réponses", "style", "format"]:
+                    self.profile.set_preference("style", val_low, importance=0.8)
+
+                else:
+                    self.profile.set_preference(key_low or "general", value, importance=0.7)
+
+                return "Préférence enregistrée."
+
+
+            if t == "emotion":
+                self.profile.set_emotion(value)
+
+                self.profile.update_emotion_pattern(txt, value)
+
+                return "Je comprends comment tu te sens."
+
+        return None
+
+    # ------------------------------------------------------------------
+    # Exécution : la logique de routage (_steps) est un générateur qui
+    # produit les appels bloquants (LLM, outils) au lieu de les faire.
+    # handle() les exécute en synchrone, ahandle() en asynchrone :
+    # une seule logique pour la boucle vocale et le serveur web.
+    # ------------------------------------------------------------------
+
+    def handle(
+        self, user_text: str, context: str, retrieved: list[str], state_cb=None, on_sentence=None, meta=None
+    ) -> str:
+        """meta (dict optionnel) reçoit "route" : "direct", "answer" ou "tool:<nom>"."""
+        steps = self._steps(user_text, context, retrieved, state_cb=state_cb, on_sentence=on_sentence, meta=meta)
+        try:
+            call = next(steps)
+            while True:
+                try:
+                    result = self._run_step(call)
+                except Exception as e:
+                    call = steps.throw(e)
+                else:
+                    call = steps.send(result)
+        except StopIteration as stop:
+            return stop.value
+
+    async def ahandle(self, user_text: str, context: str, retrieved: list[str], state_cb=None, meta=None) -> str:
+        steps = self._steps(user_text, context, retrieved, state_cb=state_cb, meta=meta)
+        try:
+            call = next(steps)
+            while True:
+                try:
+                    result = await self._arun_step(call)
+                except Exception as e:
+                    call = steps.throw(e)
+                else:
+                    call = steps.send(result)
+        except StopIteration as stop:
+            return stop.value
+
+    def _run_step(self, call: Step):
+        if call.kind == "chat":
+            return self._chat(**call.kwargs)
+        if call.kind == "raw_chat":
+            return self.llm.raw_chat(**call.kwargs)
+        if call.kind == "tool":
+            return self.tool_registry.execute(call.kwargs["name"], **call.kwargs["args"])
+        raise ValueError(f"Étape inconnue: {call.kind}")
+
+    async def _arun_step(self, call: Step):
+        if self.allm is None or call.kind == "tool":
+            # pas de client async (ou outil bloquant) : exécution dans un thread
+            return await asyncio.to_thread(self._run_step, call)
+
+        kwargs = dict(call.kwargs)
+        kwargs.pop("on_sentence", None)
+        if call.kind == "chat":
+            return await self.allm.chat(**kwargs)
+        if call.kind == "raw_chat":
+            return await self.allm.raw_chat(**kwargs)
+        raise ValueError(f"Étape inconnue: {call.kind}")
+
+    def _steps(self, user_text: str, context: str, retrieved: list[str], state_cb=None, on_sentence=None, meta=None):
+        meta = meta if meta is not None else {}
+        # réponse déterministe tant qu'aucun outil / appel LLM de réponse n'est atteint
+        meta["route"] = "direct"
+
         # ==============================
         # IDENTITÉ OFFICIELLE FRANK
         # ==============================
@@ -386,63 +541,20 @@ Phrase :
 
         # -------------------------
         # 2) Extraction mémoire via LLM (auto)
+        #    en mode fused : faite par l'appel planner (étape 4)
         # -------------------------
-        personal = self.extract_personal_info(txt)
-        t = (personal.get("type") or "none").lower()
-        key = (personal.get("key") or "").strip()
-        value = (personal.get("value") or "").strip()
-
-        if t != "none" and value:
-            if t == "name":
-                self.profile.set_name(value)
-                return f"D'accord {value.capitalize()}, je m'en souviendrai."
-
-            if t == "location":
-                self.profile.set_location(value)
-                return f"Très bien, tu habites à {value.capitalize()}."
-
-            if t == "relation":
-                # key attendu: "femme", "mari", "enfant", etc.
-                rel = key.lower() if key else "proche"
-                self.profile.set_relation(rel, value)
-                return f"Je retiens que ton/ta {rel} s'appelle {value.capitalize()}."
-
-            if t == "preference":
-
-                val_low = value.lower()
-                key_low = key.lower()
-
-                # 🔥 NORMALISATION INTELLIGENTE
-                if "court" in val_low:
-                    self.profile.set_preference("style", "court", importance=0.9)
-
-                elif "long" in val_low or "detail" in val_low:
-                    self.profile.set_preference("style", "detaille", importance=0.9)
-
-                elif key_low in ["réponse", "réponses", "style", "format"]:
-                    self.profile.set_preference("style", val_low, importance=0.8)
-
-                else:
-                    self.profile.set_preference(key_low or "general", value, importance=0.7)
-
-                return "Préférence enregistrée."
-
-
-            if t == "emotion":
-                self.profile.set_emotion(value)
-
-                self.profile.update_emotion_pattern(txt, value)
-
-                return "Je comprends comment tu te sens."
-
-
+        if not self.fused:
+            raw = yield Step("chat", {"user_text": self._personal_prompt(txt)})
+            reply = self._apply_personal(self._parse_personal(raw), txt)
+            if reply is not None:
+                return reply
 
         # -------------------------
         # 3) Injection intelligente contexte (utilise importance + timestamp)
         # -------------------------
-        profile_context = self.profile.build_context(hint_text=txt)
-        if profile_context:
-            context = profile_context + "\n\n" + (context or "")
+        # Partie stable → prompt système (préfixe réutilisable par le cache KV du serveur)
+        # Partie liée au message : déjà dans context (ContextBuilder, côté Orchestrator)
+        profile_context = self.profile.build_context(part="stable")
 
 
         ut = (user_text or "").strip()
@@ -526,13 +638,43 @@ Phrase :
         # -------------------------
         # 4) Planner / Tools / Answer
         # -------------------------
-        try:
-            plan = self.planner.plan(user_text=txt, context=context, retrieved=retrieved)
-            print("🧠 PLAN:", plan)
-        except Exception as e:
-            
-            log.error(f"Planner JSON error: {e}")
-            return self.llm.chat(user_text=txt, context=context, retrieved=retrieved)
+        # Fast-path déterministe : intentions outil évidentes sans appel LLM
+        intent = self.intent_classifier.classify(txt) if self.intent_classifier else None
+
+        if intent is not None:
+            plan = intent.as_plan()
+            print(f"⚡ INTENT ({intent.source}, {intent.confidence:.2f}):", plan)
+        else:
+            t0 = time.perf_counter()
+            try:
+                if self.fused:
+                    raw = yield Step("raw_chat", self.planner.fused_request(
+                        user_text=txt, context=context, retrieved=retrieved, profile=profile_context
+                    ))
+                    plan = self.planner.parse_fused(raw)
+                else:
+                    raw = yield Step("raw_chat", self.planner.request(
+                        user_text=txt, context=context, retrieved=retrieved, profile=profile_context
+                    ))
+                    plan = self.planner.parse(raw)
+                print("🧠 PLAN:", plan)
+                log.info(f"Planner {'fused' if self.fused else 'simple'} : {(time.perf_counter() - t0) * 1000:.0f} ms")
+            except LLMUnavailable:
+                # inutile de retenter un second appel sur un serveur indisponible
+                raise
+            except Exception as e:
+
+                log.error(f"Planner JSON error: {e}")
+                meta["route"] = "answer"
+                return (yield Step("chat", dict(
+                    user_text=txt, context=context, retrieved=retrieved,
+                    profile=profile_context, on_sentence=on_sentence
+                )))
+
+        if self.fused:
+            reply = self._apply_personal(plan.get("personal") or {}, txt)
+            if reply is not None:
+                return reply
 
         ptype = (plan.get("type") or "answer").lower()
         tool = (plan.get("tool") or "none").lower()
@@ -545,13 +687,14 @@ Phrase :
 
         # Tools
         if ptype == "tool":
+            meta["route"] = f"tool:{tool}"
 
             # 🔹 Cas spécial agenda
             if tool == "agenda":
                 args["raw_text"] = user_text
 
             # 🔹 Exécution du tool (IMPORTANT : toujours avant toute logique)
-            result = self.tool_registry.execute(tool, **args)
+            result = yield Step("tool", {"name": tool, "args": args})
 
             # =====================================
             # 🔥 CAS SPECIAL CAMERA (Premium)
@@ -629,8 +772,8 @@ Phrase :
             # Web search → synthèse LLM
             # =====================================
             if tool == "web_search":
-                return self.llm.chat(
-                    f"""
+                return (yield Step("chat", dict(
+                    user_text=f"""
         Tu es FRANK, assistant technique.
 
         Voici des informations récupérées via une recherche web :
@@ -647,14 +790,15 @@ Phrase :
                     retrieved=[],
                     temperature=0.4,
                     max_tokens=600,
-                    top_p=0.8
-                )
+                    top_p=0.8,
+                    on_sentence=on_sentence
+                )))
 
             # =====================================
             # Par défaut → synthèse simple
             # =====================================
-            return self.llm.chat(
-                f"""
+            return (yield Step("chat", dict(
+                user_text=f"""
         Tu es FRANK, assistant technique.
 
         Voici des informations récupérées via un outil :
@@ -667,10 +811,12 @@ Phrase :
                 retrieved=[],
                 temperature=0.4,
                 max_tokens=600,
-                top_p=0.8
-            )
+                top_p=0.8,
+                on_sentence=on_sentence
+            )))
 
         # Answer
+        meta["route"] = "answer"
 
         temperature = 0.5
         top_p = 0.8
@@ -743,26 +889,40 @@ Phrase :
    
         if state_cb:
             state_cb("calme", 0.3)
-        
+
+        # réponse déjà rédigée par l'appel fusionné : utilisée seulement si rien ne la
+        # ferait différer de _chat (pas de streaming TTS, pas de réglage émotion / style)
+        tuned = (
+            emotion_value in ("fatigué", "stressé", "frustré", "motivé")
+            or bool(beh and beh.intensity >= 0.65)
+            or pref_style in ["détaillé", "detaille", "long"]
+        )
+        if self.fused and (on_sentence is not None or tuned):
+            final = ""
+
         if ptype == "answer":
             if final:
                 return final
-            return self.llm.chat(
+            return (yield Step("chat", dict(
                 user_text=txt,
                 context=context,
                 retrieved=retrieved,
+                profile=profile_context,
                 temperature=temperature,
                 max_tokens=max_tokens,
-                top_p=top_p
-            )
+                top_p=top_p,
+                on_sentence=on_sentence
+            )))
             
 
-        return self.llm.chat(
+        return (yield Step("chat", dict(
             user_text=txt,
             context=context,
             retrieved=retrieved,
+            profile=profile_context,
             temperature=temperature,
             max_tokens=max_tokens,
-            top_p=top_p
-        )
+            top_p=top_p,
+            on_sentence=on_sentence
+        )))
 
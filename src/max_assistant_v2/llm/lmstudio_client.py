@@ -1,13 +1,43 @@
-from openai import OpenAI
+from typing import Iterator
+
+import openai
+
+from max_assistant_v2.llm.prompt_builder import PromptBuilder
+from max_assistant_v2.llm.transport import AsyncLLMTransport, LLMTransport
+from max_assistant_v2.utils.logger import get_logger
+
+log = get_logger(__name__)
 
 SYSTEM_DEFAULT = """Tu es FRANK, assistant local type JARVIS.
 Réponds en français, utile, concis.
 """
 
+
+def _chat_prompt(user_text: str, context: str, retrieved: list[str] | None) -> str:
+    retrieved = retrieved or []
+    rag = "\n".join([f"- {x}" for x in retrieved])
+
+    # du moins volatil au plus volatil : historique, RAG, demande
+    prompt = f"""CONTEXTE:
+{context}
+
+MÉMOIRE RETROUVÉE (peut contenir des infos partielles, à recouper si besoin):
+{rag}
+
+USER:
+{user_text}
+"""
+    return prompt
+
+
 class LMStudioClient:
-    def __init__(self, base_url: str, model_id: str):
-        self.client = OpenAI(base_url=base_url, api_key="lm-studio")
+    def __init__(self, base_url: str, model_id: str, transport: LLMTransport | None = None):
+        # transport partagé : pool HTTP, timeouts, concurrence bornée, retries
+        self.transport = transport or LLMTransport(base_url=base_url)
+        self.client = self.transport.client
         self.model_id = model_id
+        self.prompts = PromptBuilder()
+        self._structured = True  # passe à False si le serveur refuse json_schema
 
     def raw_chat(
         self,
@@ -16,20 +46,62 @@ class LMStudioClient:
         temperature: float = 0.2,
         max_tokens: int = 400,
         top_p: float = 0.8,
-    ) -> str:
-        resp = self.client.chat.completions.create(
+        stream: bool = False,
+        profile: str = "",
+        deadline_sec: float | None = None,
+        response_format: dict | None = None,
+        background: bool = False,
+    ) -> str | Iterator[str]:
+        """
+        system  : prompt statique (identique d'un appel à l'autre → préfixe en cache)
+        profile : bloc profil, placé juste après le prompt statique
+        user    : contenu du tour
+        stream=False : retourne la complétion entière.
+        stream=True  : retourne un itérateur des fragments de texte au fil de la génération.
+        deadline_sec : échéance totale de l'appel (défaut : celle du transport)
+        response_format : sortie contrainte côté serveur (ex. json_schema)
+        background : tâche de fond (résumé, MemoryWriter), budget de créneaux réduit
+        Lève LLMUnavailable si le serveur est saturé, injoignable ou trop lent.
+        """
+        messages = self.prompts.messages(system, user, profile=profile)
+        kwargs = dict(
             model=self.model_id,
-            messages=[
-                {"role": "system", "content": system},
-                {"role": "user", "content": user},
-            ],
+            messages=messages,
             temperature=temperature,
             max_tokens=max_tokens,
             top_p=top_p,
         )
+        if response_format is not None:
+            kwargs["response_format"] = response_format
+
+        if stream:
+            return self._stream(kwargs, system, deadline_sec, background)
+
+        resp = self.transport.create(deadline_sec=deadline_sec, background=background, **kwargs)
+        self.prompts.record(system, messages, getattr(resp, "usage", None))
 
         return (resp.choices[0].message.content or "").strip()
 
+    def _stream(self, kwargs: dict, system: str, deadline_sec: float | None, background: bool) -> Iterator[str]:
+        chunks = self.transport.stream(
+            deadline_sec=deadline_sec,
+            background=background,
+            stream_options={"include_usage": True},
+            **kwargs
+        )
+        usage = None
+        try:
+            for chunk in chunks:
+                if getattr(chunk, "usage", None) is not None:
+                    usage = chunk.usage
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+        finally:
+            chunks.close()
+            self.prompts.record(system, kwargs["messages"], usage)
 
     def chat(
         self,
@@ -39,20 +111,10 @@ class LMStudioClient:
         temperature: float = 0.4,
         max_tokens: int = 400,
         top_p: float = 0.8,
-    ) -> str:
-        retrieved = retrieved or []
-        rag = "\n".join([f"- {x}" for x in retrieved])
-
-        prompt = f"""
-    CONTEXTE:
-    {context}
-
-    MÉMOIRE RETROUVÉE (peut contenir des infos partielles, à recouper si besoin):
-    {rag}
-
-    USER:
-    {user_text}
-    """
+        stream: bool = False,
+        profile: str = "",
+    ) -> str | Iterator[str]:
+        prompt = _chat_prompt(user_text, context, retrieved)
 
         return self.raw_chat(
             system=SYSTEM_DEFAULT,
@@ -60,24 +122,105 @@ class LMStudioClient:
             temperature=temperature,
             max_tokens=max_tokens,
             top_p=top_p,
+            stream=stream,
+            profile=profile,
         )
 
-    def chat_json(self, system_prompt: str, user_prompt: str, temperature: float = 0.0, max_tokens: int = 200) -> str:
+    def chat_json(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float = 0.0,
+        max_tokens: int = 200,
+        schema: dict | None = None,
+        name: str = "response",
+        background: bool = False,
+    ) -> str:
         """
-        Version spéciale pour le MemoryWriter.
-        Injecte le system_prompt dans le contexte.
+        Sortie structurée (MemoryWriter, etc.) : vrai prompt système, décodage
+        contraint par le schéma JSON côté serveur, température et budget respectés.
+        Si le serveur refuse response_format, on retombe sur un appel non contraint.
         """
+        response_format = None
+        if schema is not None and self._structured:
+            response_format = {
+                "type": "json_schema",
+                "json_schema": {"name": name, "strict": True, "schema": schema},
+            }
+
+        kwargs = dict(
+            system=system_prompt, user=user_prompt, temperature=temperature, max_tokens=max_tokens, top_p=1.0,
+            background=background,
+        )
+        try:
+            return self.raw_chat(response_format=response_format, **kwargs)
+        except openai.BadRequestError as e:
+            if response_format is None:
+                raise
+            log.warning(f"response_format json_schema refusé par le serveur ({e}), sortie non contrainte.")
+            self._structured = False
+            return self.raw_chat(**kwargs)
 
-        combined_context = system_prompt
 
-        # On appelle chat normalement
-        response = self.chat(
-            user_text=user_prompt,
-            context=combined_context,
-            retrieved=None
-        )
+class AsyncLMStudioClient:
+    """
+    Variante async (serveur web) : mêmes prompts que LMStudioClient,
+    sans bloquer de thread pendant la génération.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        model_id: str,
+        transport: AsyncLLMTransport | None = None,
+        prompts: PromptBuilder | None = None,
+    ):
+        self.transport = transport or AsyncLLMTransport(base_url=base_url)
+        self.model_id = model_id
+        # partager le PromptBuilder du client sync → métriques de préfixe communes
+        self.prompts = prompts or PromptBuilder()
 
-        return response
+    async def raw_chat(
+        self,
+        system: str,
+        user: str,
+        temperature: float = 0.2,
+        max_tokens: int = 400,
+        top_p: float = 0.8,
+        profile: str = "",
+        deadline_sec: float | None = None,
+    ) -> str:
+        messages = self.prompts.messages(system, user, profile=profile)
+        resp = await self.transport.create(
+            deadline_sec=deadline_sec,
+            model=self.model_id,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            top_p=top_p,
+        )
+        self.prompts.record(system, messages, getattr(resp, "usage", None))
 
+        return (resp.choices[0].message.content or "").strip()
 
+    async def chat(
+        self,
+        user_text: str,
+        context: str = "",
+        retrieved: list[str] | None = None,
+        temperature: float = 0.4,
+        max_tokens: int = 400,
+        top_p: float = 0.8,
+        profile: str = "",
+    ) -> str:
+        return await self.raw_chat(
+            system=SYSTEM_DEFAULT,
+            user=_chat_prompt(user_text, context, retrieved),
+            temperature=temperature,
+            max_tokens=max_tokens,
+            top_p=top_p,
+            profile=profile,
+        )
 
+    async def aclose(self):
+        await self.transport.aclose()
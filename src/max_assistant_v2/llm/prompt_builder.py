@@ -0,0 +1,69 @@
+# src/max_assistant_v2/llm/prompt_builder.py
+import hashlib
+import os
+import threading
+
+
+class PromptBuilder:
+    """
+    Assemble les messages du plus stable au plus volatil, pour que le serveur
+    local réutilise son cache KV d'un tour à l'autre :
+      system = prompt statique  +  profil (change rarement)
+      user   = contenu du tour (historique, RAG, demande)
+    Le cache ne sert que jusqu'au premier token différent : rien de variable
+    ne doit précéder le prompt statique.
+    Mesure aussi la réutilisation du préfixe (tokens en cache si le serveur
+    les rapporte, estimation par préfixe commun sinon).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last: dict[str, str] = {}  # canal (hash du prompt statique) -> dernier prompt
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.reported_calls = 0
+        self.prompt_chars = 0
+        self.shared_prefix_chars = 0
+
+    def messages(self, system: str, user: str, profile: str = "") -> list[dict]:
+        system = system.strip()
+        if profile:
+            system = f"{system}\n\n{profile.strip()}"
+        return [
+            {"role": "system", "content": system},
+            {"role": "user", "content": user},
+        ]
+
+    def record(self, static_system: str, messages: list[dict], usage=None):
+        """À appeler après chaque complétion (usage = resp.usage si dispo)."""
+        channel = hashlib.sha1(static_system.encode("utf-8")).hexdigest()[:12]
+        full = "\n".join(m["content"] for m in messages)
+
+        with self._lock:
+            prev = self._last.get(channel, "")
+            self._last[channel] = full
+
+            self.calls += 1
+            self.prompt_chars += len(full)
+            self.shared_prefix_chars += len(os.path.commonprefix([prev, full])) if prev else 0
+
+            if usage is not None:
+                self.prompt_tokens += int(getattr(usage, "prompt_tokens", 0) or 0)
+                details = getattr(usage, "prompt_tokens_details", None)
+                cached = getattr(details, "cached_tokens", None) if details is not None else None
+                if cached is not None:
+                    self.cached_tokens += int(cached)
+                    self.reported_calls += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "prompt_tokens": self.prompt_tokens,
+                "cached_tokens": self.cached_tokens,
+                # ratio mesuré par le serveur (seulement les appels où il le rapporte)
+                "cached_ratio": self.cached_tokens / self.prompt_tokens if self.reported_calls and self.prompt_tokens else None,
+                # estimation côté client : part du prompt identique au précédent du même canal
+                "est_prefix_reuse": self.shared_prefix_chars / self.prompt_chars if self.prompt_chars else 0.0,
+            }
@@ -0,0 +1,36 @@
+# src/max_assistant_v2/llm/streaming.py
+import re
+from typing import Iterable, Iterator
+
+# Fin de phrase : ponctuation forte suivie d'un blanc, ou retour à la ligne.
+# "3.5" ou "v2.0" ne coupent pas (pas de blanc après le point).
+_BOUNDARY_RE = re.compile(r"([.!?…]+[»\")\]]?\s+|\n+)")
+
+
+def iter_sentences(tokens: Iterable[str], min_chars: int = 20) -> Iterator[str]:
+    """
+    Regroupe un flux de tokens en phrases dès qu'elles sont complètes.
+    Les fragments trop courts ("Ok.") sont collés à la phrase suivante
+    pour éviter un appel TTS par mot.
+    """
+    buf = ""
+    for tok in tokens:
+        if not tok:
+            continue
+        buf += tok
+
+        while True:
+            cut = None
+            for m in _BOUNDARY_RE.finditer(buf):
+                if len(buf[:m.end()].strip()) >= min_chars:
+                    cut = m.end()
+                    break
+            if cut is None:
+                break
+            sentence, buf = buf[:cut].strip(), buf[cut:]
+            if sentence:
+                yield sentence
+
+    rest = buf.strip()
+    if rest:
+        yield rest
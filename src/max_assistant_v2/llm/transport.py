@@ -0,0 +1,287 @@
+# src/max_assistant_v2/llm/transport.py
+import asyncio
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+import httpx
+import openai
+from openai import AsyncOpenAI, OpenAI
+
+from max_assistant_v2.utils.logger import get_logger
+
+log = get_logger(__name__)
+
+# Erreurs transitoires : on réessaie (connexion refusée/coupée, timeout, 429, 5xx)
+RETRYABLE = (
+    openai.APIConnectionError,  # inclut APITimeoutError
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+
+class LLMUnavailable(RuntimeError):
+    """Serveur saturé, injoignable ou trop lent pour l'échéance de l'appel."""
+
+
+class ConcurrencyLimiter:
+    """
+    Créneaux LM Studio partagés par les transports sync et async : au plus
+    max_concurrency requêtes en vol, tous appelants confondus.
+    Les appels de fond (résumé, MemoryWriter) passent en plus par un budget réduit
+    (au plus max_concurrency - 1 si possible) : un créneau reste libre pour le tour en cours.
+    """
+
+    def __init__(self, max_concurrency: int = 2, background_concurrency: int = 1):
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.background_concurrency = max(1, min(int(background_concurrency), self.max_concurrency - 1))
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._background = threading.BoundedSemaphore(self.background_concurrency)
+
+    def acquire(self, timeout: float, background: bool = False) -> bool:
+        deadline = time.monotonic() + timeout
+        if background and not self._background.acquire(timeout=timeout):
+            return False
+        if self._slots.acquire(timeout=max(0.0, deadline - time.monotonic())):
+            return True
+        if background:
+            self._background.release()
+        return False
+
+    def release(self, background: bool = False):
+        self._slots.release()
+        if background:
+            self._background.release()
+
+    async def aacquire(self, timeout: float, background: bool = False) -> bool:
+        """
+        acquire() sans bloquer la boucle ni occuper de thread : essais non bloquants
+        espacés (backoff court, plafonné) jusqu'à l'échéance.
+        """
+        deadline = time.monotonic() + timeout
+        delay = 0.005
+        while True:
+            if self.acquire(0.0, background):
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            await asyncio.sleep(min(delay, remaining))
+            delay = min(delay * 2, 0.05)
+
+
+class _BaseTransport:
+    """Configuration et politique communes (timeouts, échéance, backoff, compteurs)."""
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str = "lm-studio",
+        connect_timeout_sec: float = 5.0,
+        read_timeout_sec: float = 60.0,
+        deadline_sec: float = 120.0,
+        max_concurrency: int = 2,
+        acquire_timeout_sec: float = 30.0,
+        max_retries: int = 2,
+        backoff_base_sec: float = 0.5,
+        backoff_max_sec: float = 4.0,
+        pool_max_connections: int = 8,
+        pool_max_keepalive: int = 4,
+        keepalive_expiry_sec: float = 30.0,
+        background_concurrency: int = 1,
+        limiter: ConcurrencyLimiter | None = None,
+    ):
+        self.connect_timeout_sec = float(connect_timeout_sec)
+        self.read_timeout_sec = float(read_timeout_sec)
+        self.deadline_sec = float(deadline_sec)
+        self.acquire_timeout_sec = float(acquire_timeout_sec)
+        self.max_retries = max(0, int(max_retries))
+        self.backoff_base_sec = float(backoff_base_sec)
+        self.backoff_max_sec = float(backoff_max_sec)
+
+        # limiteur commun aux transports sync et async (sinon 2 × max_concurrency en vol)
+        self.limiter = limiter or ConcurrencyLimiter(max_concurrency, background_concurrency)
+        self._limits = httpx.Limits(
+            max_connections=pool_max_connections,
+            max_keepalive_connections=pool_max_keepalive,
+            keepalive_expiry=keepalive_expiry_sec,
+        )
+
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+        self.rejected = 0
+
+    def _wait(self, deadline: float) -> float:
+        return max(0.0, min(self.acquire_timeout_sec, deadline - time.monotonic()))
+
+    def _saturated(self, wait: float) -> LLMUnavailable:
+        self._bump("rejected")
+        return LLMUnavailable(f"LM Studio saturé (aucun créneau libre après {wait:.1f}s)")
+
+    def _timeout(self, read_sec: float) -> httpx.Timeout:
+        return httpx.Timeout(
+            connect=min(self.connect_timeout_sec, read_sec),
+            read=read_sec,
+            write=min(10.0, read_sec),
+            pool=min(self.connect_timeout_sec, read_sec),
+        )
+
+    def _bump(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _backoff(self, attempt: int) -> float:
+        # full jitter
+        return random.uniform(0.0, min(self.backoff_max_sec, self.backoff_base_sec * (2 ** attempt)))
+
+    def _attempts(self, deadline: float) -> Iterator[tuple[int, float]]:
+        """(numéro de tentative, timeout de lecture restant) tant que l'échéance le permet."""
+        for attempt in range(self.max_retries + 1):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0.05:
+                return
+            yield attempt, min(self.read_timeout_sec, remaining)
+
+    def _retry_delay(self, e: Exception, attempt: int, deadline: float) -> float:
+        """Délai avant la prochaine tentative, ou LLMUnavailable si plus le temps / plus d'essais."""
+        delay = self._backoff(attempt)
+        if attempt >= self.max_retries or time.monotonic() + delay >= deadline:
+            self._bump("failures")
+            raise LLMUnavailable(f"LM Studio indisponible: {e}") from e
+        self._bump("retries")
+        log.warning(f"LM Studio: {type(e).__name__}, nouvel essai dans {delay:.2f}s")
+        return delay
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "retries": self.retries,
+                "failures": self.failures,
+                "rejected": self.rejected,
+            }
+
+
+class LLMTransport(_BaseTransport):
+    """
+    Couche HTTP partagée vers LM Studio (boucle vocale, threads FastAPI, rappels agenda) :
+    - pool keep-alive httpx borné
+    - timeouts connexion / lecture explicites + échéance totale par appel
+    - concurrence bornée vers le serveur (un 7B local ne sert qu'une ou deux requêtes à la fois)
+    - retry avec backoff exponentiel + jitter sur erreurs transitoires
+    Aucun appelant ne peut bloquer les autres indéfiniment : l'attente d'un créneau
+    et chaque tentative sont bornées par l'échéance.
+    """
+
+    def __init__(self, base_url: str, api_key: str = "lm-studio", **kwargs):
+        super().__init__(base_url, api_key, **kwargs)
+
+        self.http = httpx.Client(limits=self._limits, timeout=self._timeout(self.read_timeout_sec))
+        # retries gérés ici (avec échéance), pas par le SDK
+        self.client = OpenAI(base_url=base_url, api_key=api_key, http_client=self.http, max_retries=0)
+
+    @contextmanager
+    def _slot(self, deadline: float, background: bool = False):
+        wait = self._wait(deadline)
+        if not self.limiter.acquire(wait, background):
+            raise self._saturated(wait)
+        try:
+            yield
+        finally:
+            self.limiter.release(background)
+
+    def create(self, deadline_sec: float | None = None, background: bool = False, **kwargs):
+        """
+        chat.completions.create() borné (créneau + échéance + retries).
+        background=True : tâche de fond, budget de créneaux réduit.
+        """
+        deadline = time.monotonic() + (deadline_sec or self.deadline_sec)
+        self._bump("calls")
+
+        with self._slot(deadline, background):
+            for attempt, read_sec in self._attempts(deadline):
+                try:
+                    return self.client.chat.completions.create(timeout=self._timeout(read_sec), **kwargs)
+                except RETRYABLE as e:
+                    time.sleep(self._retry_delay(e, attempt, deadline))
+
+        self._bump("failures")
+        raise LLMUnavailable("LM Studio: échéance dépassée")
+
+    def stream(self, deadline_sec: float | None = None, background: bool = False, **kwargs) -> Iterator:
+        """
+        Version streaming : le créneau est tenu jusqu'à la fin du flux.
+        Retry uniquement avant le premier chunk (ensuite le texte est déjà parti au TTS).
+        Échéance dépassée en cours de flux : le flux est coupé proprement.
+        """
+        deadline = time.monotonic() + (deadline_sec or self.deadline_sec)
+        self._bump("calls")
+
+        with self._slot(deadline, background):
+            resp = None
+            for attempt, read_sec in self._attempts(deadline):
+                try:
+                    resp = self.client.chat.completions.create(
+                        stream=True, timeout=self._timeout(read_sec), **kwargs
+                    )
+                    break
+                except RETRYABLE as e:
+                    time.sleep(self._retry_delay(e, attempt, deadline))
+
+            if resp is None:
+                self._bump("failures")
+                raise LLMUnavailable("LM Studio: échéance dépassée")
+
+            try:
+                for chunk in resp:
+                    yield chunk
+                    if time.monotonic() > deadline:
+                        log.warning("LM Studio: échéance atteinte, génération tronquée")
+                        break
+            except RETRYABLE as e:
+                self._bump("failures")
+                raise LLMUnavailable(f"LM Studio: flux interrompu: {e}") from e
+            finally:
+                resp.close()
+
+    def close(self):
+        self.http.close()
+
+
+class AsyncLLMTransport(_BaseTransport):
+    """
+    Même politique que LLMTransport, pour le serveur web (AsyncOpenAI + httpx.AsyncClient).
+    Passer le limiter du transport sync : les deux chemins se partagent les créneaux.
+    """
+
+    def __init__(self, base_url: str, api_key: str = "lm-studio", **kwargs):
+        super().__init__(base_url, api_key, **kwargs)
+
+        self.http = httpx.AsyncClient(limits=self._limits, timeout=self._timeout(self.read_timeout_sec))
+        self.client = AsyncOpenAI(base_url=base_url, api_key=api_key, http_client=self.http, max_retries=0)
+
+    async def create(self, deadline_sec: float | None = None, background: bool = False, **kwargs):
+        deadline = time.monotonic() + (deadline_sec or self.deadline_sec)
+        self._bump("calls")
+
+        wait = self._wait(deadline)
+        if not await self.limiter.aacquire(wait, background):
+            raise self._saturated(wait)
+        try:
+            for attempt, read_sec in self._attempts(deadline):
+                try:
+                    return await self.client.chat.completions.create(timeout=self._timeout(read_sec), **kwargs)
+                except RETRYABLE as e:
+                    await asyncio.sleep(self._retry_delay(e, attempt, deadline))
+        finally:
+            self.limiter.release(background)
+
+        self._bump("failures")
+        raise LLMUnavailable("LM Studio: échéance dépassée")
+
+    async def aclose(self):
+        await self.http.aclose()
@@ -0,0 +1,54 @@
+# src/max_assistant_v2/memory/bm25.py
+import math
+import re
+import unicodedata
+from collections import Counter
+
+# Paramètres BM25 classiques
+K1 = 1.2
+B = 0.75
+
+# Constante de la reciprocal-rank fusion
+RRF_K = 60
+
+STOPWORDS = {
+    "le", "la", "les", "un", "une", "des", "du", "de", "d", "l", "et", "ou", "a",
+    "au", "aux", "en", "dans", "sur", "pour", "par", "avec", "sans", "ce", "cet",
+    "cette", "ces", "je", "tu", "il", "elle", "on", "nous", "vous", "ils", "elles",
+    "me", "te", "se", "m", "t", "s", "n", "qu", "que", "qui", "quoi", "ne", "pas",
+    "est", "sont", "mon", "ma", "mes", "ton", "ta", "tes", "son", "sa", "ses",
+    "the", "of", "to", "is", "in", "and",
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> list[str]:
+    """Minuscules, sans accents, alphanumérique, sans mots vides."""
+    text = unicodedata.normalize("NFD", (text or "").lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return [t for t in _TOKEN_RE.findall(text) if t not in STOPWORDS]
+
+
+def term_frequencies(text: str) -> tuple[Counter, int]:
+    tokens = tokenize(text)
+    return Counter(tokens), len(tokens)
+
+
+def idf(n_docs: int, df: int) -> float:
+    # variante BM25+ (toujours positive)
+    return math.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+
+
+def term_score(tf: int, doc_len: int, avgdl: float, term_idf: float) -> float:
+    norm = K1 * (1.0 - B + B * doc_len / max(avgdl, 1e-9))
+    return term_idf * tf * (K1 + 1.0) / (tf + norm)
+
+
+def rrf_fuse(rankings: list[list[int]], k: int = RRF_K) -> dict[int, float]:
+    """Reciprocal-rank fusion : somme des 1/(k + rang) sur chaque classement."""
+    fused: dict[int, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    return fused
@@ -0,0 +1,151 @@
+# src/max_assistant_v2/memory/embedding_cache.py
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+
+
+def normalize_text(text: str) -> str:
+    """
+    Clé de cache : NFC + minuscules + espaces compactés.
+    Sans impact sur le vecteur (all-MiniLM-L6-v2 est uncased).
+    """
+    text = unicodedata.normalize("NFC", text or "")
+    return " ".join(text.lower().split())
+
+
+class EmbeddingCache:
+    """
+    Cache LRU des embeddings, borné en nombre d'entrées.
+    Optionnel : un second niveau SQLite sur disque qui survit aux redémarrages,
+    borné à disk_max_items lignes (les moins récemment utilisées sont supprimées).
+    """
+
+    def __init__(self, max_items: int = 4096, disk_path: str | None = None, namespace: str = "",
+                 disk_max_items: int = 100_000):
+        self.max_items = max(1, int(max_items))
+        self.disk_max_items = max(1, int(disk_max_items))
+        self.namespace = namespace or ""
+        self._mem: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.disk_evicted = 0
+
+        self._db = None
+        if disk_path:
+            os.makedirs(os.path.dirname(disk_path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(disk_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "ns TEXT NOT NULL, key TEXT NOT NULL, vec BLOB NOT NULL, "
+                "PRIMARY KEY (ns, key))"
+            )
+            # ancienne base sans horodatage : ses lignes partent en premier
+            columns = {row[1] for row in self._db.execute("PRAGMA table_info(embeddings)")}
+            if "last_used" not in columns:
+                self._db.execute("ALTER TABLE embeddings ADD COLUMN last_used REAL NOT NULL DEFAULT 0")
+            self._db.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+            self._db.commit()
+
+    def _remember(self, key: str, vec: np.ndarray):
+        self._mem[key] = vec
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_items:
+            self._mem.popitem(last=False)
+
+    def get_many(self, keys: list[str]) -> dict[str, np.ndarray]:
+        found: dict[str, np.ndarray] = {}
+        with self._lock:
+            missing = []
+            for key in keys:
+                vec = self._mem.get(key)
+                if vec is None:
+                    missing.append(key)
+                    continue
+                self._mem.move_to_end(key)
+                found[key] = vec
+                self.hits += 1
+
+            if missing and self._db is not None:
+                uniq = list(dict.fromkeys(missing))
+                for i in range(0, len(uniq), 500):
+                    chunk = uniq[i:i + 500]
+                    rows = self._db.execute(
+                        f"SELECT key, vec FROM embeddings WHERE ns = ? AND key IN ({','.join('?' * len(chunk))})",
+                        [self.namespace, *chunk],
+                    ).fetchall()
+                    for key, blob in rows:
+                        vec = np.frombuffer(blob, dtype="float32")
+                        self._remember(key, vec)
+                        found[key] = vec
+                    if rows:
+                        # LRU disque : les hits mémoire ne rafraîchissent pas la date, seuls les hits disque
+                        self._db.executemany(
+                            "UPDATE embeddings SET last_used = ? WHERE ns = ? AND key = ?",
+                            [(time.time(), self.namespace, key) for key, _ in rows],
+                        )
+                        self._db.commit()
+                self.disk_hits += sum(1 for k in missing if k in found)
+
+            self.misses += sum(1 for k in missing if k not in found)
+
+        return found
+
+    def put_many(self, items: dict[str, np.ndarray]):
+        if not items:
+            return
+        with self._lock:
+            for key, vec in items.items():
+                self._remember(key, np.asarray(vec, dtype="float32"))
+
+            if self._db is not None:
+                now = time.time()
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (ns, key, vec, last_used) VALUES (?, ?, ?, ?)",
+                    [
+                        (self.namespace, key, np.asarray(vec, dtype="float32").tobytes(), now)
+                        for key, vec in items.items()
+                    ],
+                )
+                self._evict_disk()
+                self._db.commit()
+
+    def _evict_disk(self):
+        """Au-delà de disk_max_items lignes (tous namespaces) : supprime les moins récemment utilisées."""
+        (rows,) = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        excess = rows - self.disk_max_items
+        if excess <= 0:
+            return
+        self._db.execute(
+            "DELETE FROM embeddings WHERE rowid IN "
+            "(SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)",
+            (excess,),
+        )
+        self.disk_evicted += excess
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.disk_hits + self.misses
+            return {
+                "size": len(self._mem),
+                "max_items": self.max_items,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "disk_evicted": self.disk_evicted,
+                "hit_rate": (self.hits + self.disk_hits) / total if total else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._mem.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM embeddings WHERE ns = ?", (self.namespace,))
+                self._db.commit()
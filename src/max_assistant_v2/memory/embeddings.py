@@ -1,6 +1,9 @@
 # src/max_assistant_v2/memory/embeddings.py
 import os
 import logging
+import time
+
+import numpy as np
 
 # Silence transformers
 os.environ["TRANSFORMERS_NO_ADVISORY_WARNINGS"] = "1"
@@ -10,11 +13,198 @@ logging.getLogger("transformers").setLevel(logging.ERROR)
 logging.getLogger("sentence_transformers").setLevel(logging.ERROR)
 logging.getLogger("torch").setLevel(logging.ERROR)
 
-from sentence_transformers import SentenceTransformer
+from max_assistant_v2.memory.embedding_cache import EmbeddingCache, normalize_text
+
+DEFAULT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+# Variantes ONNX publiées dans le repo HF du modèle
+ONNX_FILES = {
+    "onnx": "onnx/model.onnx",
+    "onnx-int8": "onnx/model_quint8_avx2.onnx",
+}
+
+
+class TorchBackend:
+    """Backend historique : SentenceTransformer (PyTorch)."""
+
+    def __init__(self, model_name: str):
+        # import local : le backend ONNX ne doit pas charger torch
+        from sentence_transformers import SentenceTransformer
 
-class Embeddings:
-    def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2"):
         self.model = SentenceTransformer(model_name)
 
-    def encode(self, texts: list[str]):
+    def encode(self, texts: list[str]) -> np.ndarray:
         return self.model.encode(texts, normalize_embeddings=True)
+
+
+class OnnxBackend:
+    """
+    Backend CPU léger : ONNX Runtime + tokenizers, sans torch.
+    Reproduit le pipeline sentence-transformers (mean pooling + normalisation L2),
+    donc les vecteurs restent compatibles avec l'index existant.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        variant: str = "onnx",
+        onnx_path: str | None = None,
+        max_length: int = 256,
+        batch_size: int = 32,
+    ):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        if onnx_path:
+            model_path = onnx_path
+            tokenizer_path = os.path.join(os.path.dirname(onnx_path), "tokenizer.json")
+            if not os.path.exists(tokenizer_path):
+                tokenizer_path = os.path.join(os.path.dirname(os.path.dirname(onnx_path)), "tokenizer.json")
+        else:
+            from huggingface_hub import hf_hub_download
+
+            model_path = hf_hub_download(model_name, ONNX_FILES[variant])
+            tokenizer_path = hf_hub_download(model_name, "tokenizer.json")
+
+        self.tokenizer = Tokenizer.from_file(tokenizer_path)
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding()
+        self.batch_size = max(1, int(batch_size))
+
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(model_path, opts, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def _encode_batch(self, texts: list[str]) -> np.ndarray:
+        enc = self.tokenizer.encode_batch(texts)
+        ids = np.array([e.ids for e in enc], dtype="int64")
+        mask = np.array([e.attention_mask for e in enc], dtype="int64")
+
+        feeds = {"input_ids": ids, "attention_mask": mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.array([e.type_ids for e in enc], dtype="int64")
+
+        tokens = self.session.run(None, feeds)[0]  # (batch, seq, dim)
+
+        # mean pooling sur les tokens réels
+        m = mask[..., None].astype("float32")
+        pooled = (tokens * m).sum(axis=1) / np.clip(m.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return (pooled / np.clip(norms, 1e-12, None)).astype("float32")
+
+    def encode(self, texts: list[str]) -> np.ndarray:
+        if not texts:
+            return np.empty((0, 0), dtype="float32")
+        parts = [
+            self._encode_batch(texts[i:i + self.batch_size])
+            for i in range(0, len(texts), self.batch_size)
+        ]
+        return np.concatenate(parts, axis=0)
+
+
+def make_backend(backend: str, model_name: str, onnx_path: str | None = None):
+    backend = (backend or "torch").lower()
+    if backend == "torch":
+        return TorchBackend(model_name)
+    if backend in ONNX_FILES:
+        return OnnxBackend(model_name, variant=backend, onnx_path=onnx_path)
+    raise ValueError(f"Backend d'embeddings inconnu: {backend}")
+
+
+class Embeddings:
+    def __init__(
+        self,
+        model_name: str = DEFAULT_MODEL,
+        cache: EmbeddingCache | None = None,
+        backend: str = "torch",
+        onnx_path: str | None = None,
+    ):
+        self.backend_name = (backend or "torch").lower()
+        self.backend = make_backend(self.backend_name, model_name, onnx_path=onnx_path)
+        self.cache = cache
+        if self.cache is not None and not self.cache.namespace:
+            # l'int8 s'écarte légèrement du fp32 : un namespace par backend
+            self.cache.namespace = f"{model_name}:{self.backend_name}"
+
+    def encode(self, texts: list[str], cache: bool = True):
+        if self.cache is None or not cache or not texts:
+            return self.backend.encode(texts)
+
+        keys = [normalize_text(t) for t in texts]
+        found = self.cache.get_many(keys)
+
+        todo = [k for k in dict.fromkeys(keys) if k not in found]
+        if todo:
+            vecs = self.backend.encode(todo)
+            fresh = {k: np.asarray(v, dtype="float32") for k, v in zip(todo, vecs)}
+            self.cache.put_many(fresh)
+            found.update(fresh)
+
+        return np.stack([found[k] for k in keys])
+
+
+def benchmark_backends(
+    texts: list[str],
+    backends: tuple[str, ...] = ("torch", "onnx", "onnx-int8"),
+    model_name: str = DEFAULT_MODEL,
+    repeat: int = 3,
+) -> dict:
+    """
+    Compare les backends sur les mêmes textes :
+    temps de chargement, latence d'une requête seule, débit en lot,
+    et accord cosinus avec le premier backend (référence).
+    """
+    results = {}
+    reference = None
+
+    for name in backends:
+        t0 = time.perf_counter()
+        backend = make_backend(name, model_name)
+        load_s = time.perf_counter() - t0
+
+        backend.encode(texts[:1])  # warm-up
+
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            for t in texts:
+                backend.encode([t])
+        single_ms = (time.perf_counter() - t0) * 1000.0 / (repeat * len(texts))
+
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            vecs = np.asarray(backend.encode(texts), dtype="float32")
+        batch_s = (time.perf_counter() - t0) / repeat
+
+        row = {
+            "load_s": load_s,
+            "single_ms": single_ms,
+            "throughput_per_s": len(texts) / batch_s if batch_s > 0 else 0.0,
+        }
+
+        if reference is None:
+            reference = vecs
+        else:
+            cos = np.sum(reference * vecs, axis=1)
+            row["cosine_mean"] = float(cos.mean())
+            row["cosine_min"] = float(cos.min())
+
+        results[name] = row
+
+    return results
+
+
+if __name__ == "__main__":
+    sample = [
+        "liste mes projets",
+        "météo à Lyon",
+        "Bruno aime les réponses courtes",
+        "ouvre spotify",
+        "comment je m'appelle",
+        "quel est mon projet principal en ce moment ?",
+        "rappelle-moi le rendez-vous chez le dentiste vendredi à 14h",
+        "surveillance extérieure",
+    ] * 8
+
+    for name, row in benchmark_backends(sample).items():
+        print(name, {k: round(v, 4) for k, v in row.items()})
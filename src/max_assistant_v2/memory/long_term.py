@@ -19,18 +19,26 @@ class LongTermMemory:
         with open(self.path, "a", encoding="utf-8") as f:
             f.write(json.dumps(item, ensure_ascii=False) + "\n")
 
-    def render_last(self, n: int = 10) -> str:
+    def last(self, n: int = 10) -> list[tuple[str, str]]:
+        """Les n derniers échanges (user, assistant), du plus ancien au plus récent."""
         try:
             with open(self.path, "r", encoding="utf-8") as f:
                 lines = f.readlines()[-n:]
-            if not lines:
-                return ""
-            out = ["--- Mémoire long terme récente ---"]
+            out = []
             for line in lines:
                 j = json.loads(line)
-                out.append(f"User: {j.get('user','')}")
-                out.append(f"Assistant: {j.get('assistant','')}")
-            out.append("--- Fin ---")
-            return "\n".join(out) + "\n"
+                out.append((j.get("user", ""), j.get("assistant", "")))
+            return out
         except Exception:
+            return []
+
+    def render_last(self, n: int = 10) -> str:
+        turns = self.last(n)
+        if not turns:
             return ""
+        out = ["--- Mémoire long terme récente ---"]
+        for u, a in turns:
+            out.append(f"User: {u}")
+            out.append(f"Assistant: {a}")
+        out.append("--- Fin ---")
+        return "\n".join(out) + "\n"
@@ -0,0 +1,114 @@
+# src/max_assistant_v2/memory/memory_worker.py
+import atexit
+import queue
+import threading
+from datetime import datetime, timezone
+
+from max_assistant_v2.utils.logger import get_logger
+
+log = get_logger(__name__)
+
+
+class MemoryWriterWorker:
+    """
+    Exécute MemoryWriter.decide() + VectorStore.add() hors du chemin de réponse.
+    - file bornée : submit() attend au plus submit_timeout_sec (backpressure),
+      puis abandonne l'échange plutôt que de bloquer la réponse
+    - close() vide la file avant de rendre la main (appelé aussi à l'arrêt du process),
+      dans la limite de son timeout : jamais de put() bloquant sur une file pleine
+    """
+
+    def __init__(self, memory_writer, vstore, max_queue: int = 32, submit_timeout_sec: float = 0.5):
+        self.memory_writer = memory_writer
+        self.vstore = vstore
+        self.submit_timeout_sec = float(submit_timeout_sec)
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, int(max_queue)))
+        self._closed = False
+        self._stop = threading.Event()  # le worker s'arrête dès que la file est vide
+
+        self.submitted = 0
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def submit(self, user_text: str, assistant_text: str, ts: str | None = None) -> bool:
+        if self._closed:
+            return False
+
+        job = {
+            "user_text": user_text,
+            "assistant_text": assistant_text,
+            "ts": ts or datetime.now(timezone.utc).isoformat(),
+        }
+        try:
+            self._queue.put(job, timeout=self.submit_timeout_sec)
+        except queue.Full:
+            self.dropped += 1
+            log.warning(f"File MemoryWriter pleine ({self._queue.maxsize}), échange ignoré.")
+            return False
+
+        self.submitted += 1
+        return True
+
+    def _process(self, job: dict):
+        decision = self.memory_writer.decide(
+            user_text=job["user_text"],
+            assistant_text=job["assistant_text"],
+            user_profile=None
+        )
+
+        if decision.should_write:
+            self.vstore.add(
+                decision.memory_text,
+                metadata={
+                    "role": "memory",
+                    "ts": job["ts"],
+                    "confidence": decision.confidence,
+                    "tags": decision.tags,
+                    "kind": "fact"
+                }
+            )
+            self.written += 1
+
+    def _run(self):
+        while True:
+            try:
+                job = self._queue.get(timeout=0.2)
+            except queue.Empty:
+                if self._stop.is_set():
+                    return
+                continue
+            try:
+                self._process(job)
+            except Exception as e:
+                self.errors += 1
+                log.error(f"MemoryWriter en tâche de fond: {e}")
+            finally:
+                self._queue.task_done()
+
+    def close(self, timeout: float = 60.0):
+        """Refuse les nouveaux échanges puis traite ceux déjà en file."""
+        if self._closed:
+            return
+        self._closed = True
+        self._stop.set()
+        self._thread.join(timeout=timeout)
+        if self._thread.is_alive():
+            log.warning(f"MemoryWriter : arrêt avant la fin ({self.pending} échanges non traités).")
+
+    def stats(self) -> dict:
+        return {
+            "pending": self.pending,
+            "submitted": self.submitted,
+            "written": self.written,
+            "dropped": self.dropped,
+            "errors": self.errors,
+        }
@@ -2,6 +2,68 @@ import json
 from dataclasses import dataclass
 from typing import Any, Dict, Optional
 
+from max_assistant_v2.utils.logger import get_logger
+
+log = get_logger(__name__)
+
+# Prompt statique : identique à chaque appel (préfixe réutilisé par le cache KV du serveur)
+WRITER_SYSTEM = (
+    "Tu es un filtre de mémoire (memory writer) pour un assistant.\n"
+    "Décide si l'on doit enregistrer une information DURABLE sur l'utilisateur.\n"
+    "IMPORTANT:\n"
+    "- NE JAMAIS créer/ajouter un 'projet' ou un fait nouveau si l'utilisateur pose une QUESTION.\n"
+    "- NE PAS stocker de contenu éphémère (salutations, petites confirmations, demandes de rappel).\n"
+    "- Stocker uniquement: préférences stables, identité, contraintes, projets explicitement annoncés, décisions durables.\n"
+    "- Si tu n'es pas sûr, réponds should_write=false.\n"
+    "Réponds UNIQUEMENT en JSON, un objet avec exactement ces 5 champs :\n"
+    "- should_write (booléen) : true seulement pour une information durable.\n"
+    "- confidence (nombre entre 0 et 1) : certitude que l'information est durable et correcte.\n"
+    "- memory_text (chaîne) : texte court du souvenir (1-2 lignes, pas de dialogue), \"\" si should_write=false.\n"
+    '- tags (liste de chaînes parmi "preference", "project", "identity", "constraint", "other"), [] si rien.\n'
+    '- profile_patch (objet) : {"name": "<prénom, \"\" si inconnu>", "projects": [{"name": "...", "note": "..."}]}, '
+    'ex. {"name": "Bruno", "projects": []}.\n'
+)
+
+# Schéma imposé au décodage (response_format json_schema)
+DECISION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "should_write": {"type": "boolean"},
+        "confidence": {"type": "number", "minimum": 0.0, "maximum": 1.0},
+        "memory_text": {"type": "string", "maxLength": 300},
+        "tags": {
+            "type": "array",
+            "items": {"type": "string", "enum": ["preference", "project", "identity", "constraint", "other"]},
+            "maxItems": 5,
+        },
+        # forme explicite : "strict" exige properties / required / additionalProperties à chaque niveau
+        "profile_patch": {
+            "type": "object",
+            "properties": {
+                "name": {"type": "string"},
+                "projects": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {"name": {"type": "string"}, "note": {"type": "string"}},
+                        "required": ["name", "note"],
+                        "additionalProperties": False,
+                    },
+                    "maxItems": 3,
+                },
+            },
+            "required": ["name", "projects"],
+            "additionalProperties": False,
+        },
+    },
+    "required": ["should_write", "confidence", "memory_text", "tags", "profile_patch"],
+    "additionalProperties": False,
+}
+
+# une décision tient en ~80 tokens ; au-delà le modèle divague
+MAX_DECISION_TOKENS = 160
+
+
 @dataclass
 class MemoryDecision:
     should_write: bool
@@ -13,7 +75,7 @@ class MemoryDecision:
 class MemoryWriter:
     """
     Demande au LLM s'il faut stocker un souvenir durable.
-    Retourne une décision structurée (JSON).
+    Retourne une décision structurée (JSON contraint par DECISION_SCHEMA).
     """
 
     def __init__(self, llm_client):
@@ -29,44 +91,30 @@ class MemoryWriter:
                 "preferences": user_profile.get("preferences", {}) if isinstance(user_profile.get("preferences", {}), dict) else {},
             }, ensure_ascii=False)
 
-        system = (
-            "Tu es un filtre de mémoire (memory writer) pour un assistant.\n"
-            "Décide si l'on doit enregistrer une information DURABLE sur l'utilisateur.\n"
-            "IMPORTANT:\n"
-            "- NE JAMAIS créer/ajouter un 'projet' ou un fait nouveau si l'utilisateur pose une QUESTION.\n"
-            "- NE PAS stocker de contenu éphémère (salutations, petites confirmations, demandes de rappel).\n"
-            "- Stocker uniquement: préférences stables, identité, contraintes, projets explicitement annoncés, décisions durables.\n"
-            "- Si tu n'es pas sûr, réponds should_write=false.\n"
-            "Tu dois répondre UNIQUEMENT en JSON valide, sans texte autour.\n"
-        )
-
         user = (
             f"Profil résumé: {profile_hint}\n\n"
             f"USER: {user_text}\n"
-            f"ASSISTANT: {assistant_text}\n\n"
-            "Réponds au format:\n"
-            "{\n"
-            '  "should_write": true|false,\n'
-            '  "confidence": 0.0-1.0,\n'
-            '  "memory_text": "texte court du souvenir à stocker (1-2 lignes, pas de dialogue)",\n'
-            '  "tags": ["preference"|"project"|"identity"|"constraint"|"other"],\n'
-            '  "profile_patch": { ... }  // ex: {"name":"Bruno"} ou {"projects":[{"name":"FRANK","note":"assistant IA local"}]}\n'
-            "}\n"
+            f"ASSISTANT: {assistant_text}\n"
         )
 
         # Appel LLM “froid” (important)
         raw = self.llm.chat_json(
-            system_prompt=system,
+            system_prompt=WRITER_SYSTEM,
             user_prompt=user,
             temperature=0.0,
-            max_tokens=220,
+            max_tokens=MAX_DECISION_TOKENS,
+            schema=DECISION_SCHEMA,
+            name="memory_decision",
+            background=True,
         )
 
-        # Parsing robuste
         try:
             data = json.loads(raw)
-        except Exception:
+            if not isinstance(data, dict):
+                raise ValueError("objet JSON attendu")
+        except Exception as e:
             # Si le modèle dévie -> on stocke rien
+            log.warning(f"MemoryWriter: décision illisible ({e})")
             return MemoryDecision(False, 0.0, "", [], {})
 
         should = bool(data.get("should_write", False))
@@ -75,23 +123,14 @@ class MemoryWriter:
         tags = data.get("tags", []) or []
         patch = data.get("profile_patch", {}) or {}
 
-        
-
-
         # garde-fous
         if not should or conf < 0.55 or not mem:
             return MemoryDecision(False, conf, "", [], {})
 
         # anti-boulette: si c'est manifestement une question, on bloque même si le LLM se trompe
-        t = user_text.strip()
-        if t.endswith("?"):
+        if user_text.strip().endswith("?"):
             return MemoryDecision(False, conf, "", [], {})
 
-        
-        user_clean = user_text.strip()
-
-        if user_clean.endswith("?"):
-            return MemoryDecision(False, conf, "", [], {})
-    
-            
-        return MemoryDecision(True, conf, mem, list(tags), dict(patch))
+        # champs vides du schéma ("name": "", "projects": []) = rien à patcher
+        patch = {k: v for k, v in patch.items() if v} if isinstance(patch, dict) else {}
+        return MemoryDecision(True, conf, mem, list(tags), patch)
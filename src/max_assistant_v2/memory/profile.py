@@ -1,3 +1,4 @@
+import hashlib
 import json
 import time
 from pathlib import Path
@@ -6,6 +7,9 @@ from typing import Any, Dict, Optional, List
 
 PROFILE_PATH = Path("data/profile.json")
 
+# Parties du profil qui changent le contenu des réponses (empreinte pour les caches)
+FINGERPRINT_KEYS = ("name", "location", "relations", "projects", "preferences")
+
 
 def _now() -> float:
     return time.time()
@@ -43,6 +47,9 @@ class ProfileMemory:
     """
 
     def __init__(self):
+        self._listeners = []
+        self._fingerprint = None
+
         PROFILE_PATH.parent.mkdir(exist_ok=True)
 
         default_structure = {
@@ -73,6 +80,36 @@ class ProfileMemory:
     def save(self):
         PROFILE_PATH.write_text(json.dumps(self.data, indent=2, ensure_ascii=False), encoding="utf-8")
 
+        fp = self.fingerprint()
+        if fp != self._fingerprint:
+            self._fingerprint = fp
+            for cb in list(self._listeners):
+                cb(fp)
+
+    # ---------------- EMPREINTE ----------------
+
+    def fingerprint(self) -> str:
+        """
+        Hash des valeurs de FINGERPRINT_KEYS (sans timestamps ni importance) :
+        change seulement quand une info qui influence les réponses change.
+        """
+        def values(x):
+            if _is_item_dict(x):
+                return x["value"]
+            if isinstance(x, dict):
+                return {k: values(v) for k, v in x.items()}
+            if isinstance(x, list):
+                return [values(v) for v in x]
+            return x
+
+        payload = {k: values(self.data.get(k)) for k in FINGERPRINT_KEYS}
+        raw = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+    def add_listener(self, callback):
+        """callback(fingerprint) appelé à chaque sauvegarde qui change l'empreinte."""
+        self._listeners.append(callback)
+
     # ---------------- MIGRATION ----------------
 
     def _migrate(self):
@@ -386,8 +423,15 @@ class ProfileMemory:
         ts = float(item.get("timestamp", _now()))
         return imp * _decay_factor(ts, half_life_days)
 
-    def build_context(self, hint_text: str = "") -> str:
+    def build_context(self, hint_text: str = "", part: str = "all") -> str:
+        """
+        part="stable" : nom, projet principal, préférences (change rarement → prompt système)
+        part="turn"   : ce qui dépend du message ou de l'heure (ville, émotion, relations...)
+        part="all"    : les deux
+        """
         hint = (hint_text or "").lower()
+        stable = part in ("all", "stable")
+        turn = part in ("all", "turn")
 
         need_location = any(w in hint for w in ["météo", "meteo", "où", "ou ", "adresse", "ville", "localisation"])
         need_projects = any(w in hint for w in ["projet", "code", "assistant", "python"])
@@ -397,7 +441,7 @@ class ProfileMemory:
 
         # ---------------- Nom (toujours)
         name_item = self.data.get("name")
-        if _is_item_dict(name_item):
+        if stable and _is_item_dict(name_item):
             lines.append(f"- Nom: {name_item['value']}")
 
         # ---------------- Top Projet (toujours si existe)
@@ -409,11 +453,11 @@ class ProfileMemory:
 
         sorted_projects = sorted(scored_projects, reverse=True)
 
-        if sorted_projects:
+        if stable and sorted_projects:
             lines.append(f"- Projet principal: {sorted_projects[0][1]['value']}")
 
         # Injecter projets supplémentaires seulement si hint lié
-        if need_projects:
+        if turn and need_projects:
             for _, p in sorted_projects[1:3]:
                 lines.append(f"- Projet: {p['value']}")
 
@@ -428,25 +472,25 @@ class ProfileMemory:
 
         sorted_prefs = sorted(scored_prefs, reverse=True)
 
-        for _, k, v in sorted_prefs[:2]:
+        for _, k, v in (sorted_prefs[:2] if stable else []):
             lines.append(f"- Préférence ({k}): {v['value']}")
 
         # ---------------- Location (conditionnel)
-        if need_location:
+        if turn and need_location:
             loc_item = self.data.get("location")
             if _is_item_dict(loc_item):
                 lines.append(f"- Ville: {loc_item['value']}")
                 
          # ---------------- Emotion (conditionnel)
         emotion = self.data.get("emotional_state")
-        if isinstance(emotion, dict):
+        if turn and isinstance(emotion, dict):
             score = self._score(emotion, half_life_days=7)
             if score > 0.2:
                 lines.append(f"- État émotionnel récent: {emotion['value']}")
 
 
         # ---------------- Relations (conditionnel)
-        if need_rel:
+        if turn and need_rel:
             rels = self.data.get("relations", {})
             if isinstance(rels, dict):
                 scored = []
@@ -456,7 +500,7 @@ class ProfileMemory:
                 for _, k, v in sorted(scored, reverse=True)[:3]:
                     lines.append(f"- Relation ({k}): {v['value']}")
 
-        patterns = self.data.get("emotion_patterns", {})
+        patterns = self.data.get("emotion_patterns", {}) if turn else {}
 
         for domain, emos in patterns.items():
             if domain in hint:
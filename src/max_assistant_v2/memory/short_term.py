@@ -2,12 +2,24 @@
 from collections import deque
 
 class ShortTermMemory:
-    def __init__(self, max_turns: int = 10):
+    def __init__(self, max_turns: int = 10, on_evict=None):
         self.buffer = deque(maxlen=max_turns)
+        # on_evict(user, assistant) : tour qui sort de la fenêtre (ex: résumé glissant)
+        self.on_evict = on_evict
 
     def add(self, user: str, assistant: str):
+        if self.on_evict and len(self.buffer) == self.buffer.maxlen:
+            self.on_evict(*self.buffer[0])
         self.buffer.append((user, assistant))
 
+    def preload(self, turns: list[tuple[str, str]]):
+        """Remplit la fenêtre au démarrage, sans déclencher on_evict."""
+        for u, a in turns[-self.buffer.maxlen:]:
+            self.buffer.append((u, a))
+
+    def turns(self) -> list[tuple[str, str]]:
+        return list(self.buffer)
+
     def render(self) -> str:
         if not self.buffer:
             return ""
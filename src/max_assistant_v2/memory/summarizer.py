@@ -0,0 +1,165 @@
+# src/max_assistant_v2/memory/summarizer.py
+import atexit
+import json
+import os
+import queue
+import threading
+from datetime import datetime, timezone
+
+from max_assistant_v2.utils.logger import get_logger
+
+log = get_logger(__name__)
+
+_STOP = object()
+
+SUMMARY_SYSTEM = """Tu maintiens le résumé courant d'une conversation entre l'utilisateur et FRANK.
+On te donne le résumé actuel et des échanges plus anciens qui sortent de la fenêtre de conversation.
+Intègre ces échanges au résumé :
+- garde les faits, décisions, demandes en cours, sujets techniques et leurs conclusions
+- supprime salutations, politesses et détails devenus inutiles
+- style télégraphique, en français, 150 mots maximum
+Réponds UNIQUEMENT avec le nouveau résumé, sans titre ni commentaire.
+"""
+
+# une réponse très longue n'a pas besoin d'être relue en entier pour être résumée
+MAX_CHARS_PER_ANSWER = 1200
+# échanges gardés pour un nouvel essai si le LLM échoue
+MAX_BACKLOG = 48
+
+
+class ConversationSummarizer:
+    """
+    Résumé glissant des tours sortis de ShortTermMemory :
+    - submit() est non bloquant ; le repli LLM se fait dans un thread, par lots
+    - le résumé est persisté (survit au redémarrage) et relu sans appel LLM
+    Le prompt reste ainsi de taille à peu près constante sur une longue session.
+    """
+
+    def __init__(self, llm, path: str, max_tokens: int = 250):
+        self.llm = llm
+        self.path = path
+        self.max_tokens = int(max_tokens)
+
+        self._lock = threading.Lock()
+        self._summary = ""
+        self._folded = 0
+        self._load()
+
+        self._queue: queue.Queue = queue.Queue()
+        self._backlog: list[tuple[str, str]] = []
+        self._closed = False
+
+        self.folds = 0
+        self.errors = 0
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    @property
+    def summary(self) -> str:
+        with self._lock:
+            return self._summary
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._summary = data.get("summary", "")
+            self._folded = int(data.get("turns", 0))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            log.warning(f"Résumé de conversation illisible ({e}), on repart de zéro.")
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "summary": self._summary,
+                "turns": self._folded,
+                "ts": datetime.now(timezone.utc).isoformat(),
+            }, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.path)
+
+    def submit(self, user: str, assistant: str):
+        """Tour sorti de la fenêtre : à intégrer au résumé."""
+        if not self._closed:
+            self._queue.put((user, assistant))
+
+    def _fold(self, turns: list[tuple[str, str]]):
+        lines = []
+        for u, a in turns:
+            a = a if len(a) <= MAX_CHARS_PER_ANSWER else a[:MAX_CHARS_PER_ANSWER] + "…"
+            lines.append(f"User: {u}\nAssistant: {a}")
+
+        user = f"""RÉSUMÉ ACTUEL:
+{self.summary or "(vide)"}
+
+ÉCHANGES À INTÉGRER:
+{chr(10).join(lines)}
+"""
+        new = self.llm.raw_chat(
+            system=SUMMARY_SYSTEM,
+            user=user,
+            temperature=0.1,
+            max_tokens=self.max_tokens,
+            background=True,
+        )
+        new = (new or "").strip()
+        if not new:
+            raise ValueError("résumé vide")
+
+        with self._lock:
+            self._summary = new
+            self._folded += len(turns)
+            self._save()
+        self.folds += 1
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            stop = job is _STOP
+            batch = [] if stop else [job]
+
+            # regroupe tout ce qui attend : un seul appel LLM par lot
+            while True:
+                try:
+                    nxt = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is _STOP:
+                    stop = True
+                else:
+                    batch.append(nxt)
+
+            batch = self._backlog + batch
+            self._backlog = []
+            if batch:
+                try:
+                    self._fold(batch)
+                except Exception as e:
+                    self.errors += 1
+                    self._backlog = batch[-MAX_BACKLOG:]
+                    log.error(f"Résumé de conversation: {e}")
+
+            if stop:
+                return
+
+    def close(self, timeout: float = 60.0):
+        """Intègre les tours en attente puis arrête le thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout=timeout)
+
+    def stats(self) -> dict:
+        return {
+            "pending": self._queue.qsize() + len(self._backlog),
+            "folded_turns": self._folded,
+            "folds": self.folds,
+            "errors": self.errors,
+            "summary_chars": len(self.summary),
+        }
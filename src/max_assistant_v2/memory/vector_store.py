@@ -1,83 +1,896 @@
 # src/max_assistant_v2/memory/vector_store.py
 import os, json
+import atexit
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
 import faiss
 import numpy as np
 
+from max_assistant_v2.memory import bm25
+from max_assistant_v2.utils.logger import get_logger
+
+log = get_logger(__name__)
+
+# lignes lues par bloc pour la recherche exacte sur le memmap
+SCAN_CHUNK_ROWS = 65536
+
+
+def _to_epoch(value) -> float | None:
+    """ISO string / datetime / epoch -> epoch (UTC si pas de fuseau)."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+    return None
+
+
+def _filter_columns(metadata: dict) -> tuple:
+    md = metadata or {}
+    conf = md.get("confidence")
+    try:
+        conf = float(conf) if conf is not None else None
+    except (TypeError, ValueError):
+        conf = None
+    return (md.get("kind"), md.get("role"), _to_epoch(md.get("ts")), conf)
+
+
+def _tags_of(metadata: dict) -> list[str]:
+    tags = (metadata or {}).get("tags") or []
+    if isinstance(tags, str):
+        tags = [tags]
+    return sorted({str(t).strip().lower() for t in tags if str(t).strip()})
+
+
+# Bonus de confiance quand un souvenir est ré-affirmé (quasi-doublon fusionné)
+DEDUP_CONFIDENCE_BUMP = 0.05
+
+
+def _merge_metadata(base: dict, new: dict) -> dict:
+    """
+    Fusion d'un quasi-doublon dans le souvenir existant :
+    tags unis, confiance max + bonus, compteur de répétitions, ts = dernière mention.
+    """
+    out = dict(base or {})
+    new = new or {}
+
+    for key, value in new.items():
+        out.setdefault(key, value)
+
+    tags = list(base.get("tags") or []) if base else []
+    for t in new.get("tags") or []:
+        if t not in tags:
+            tags.append(t)
+    if tags:
+        out["tags"] = tags
+
+    confs = [c for c in ((base or {}).get("confidence"), new.get("confidence")) if c is not None]
+    if confs:
+        try:
+            out["confidence"] = round(min(1.0, max(float(c) for c in confs) + DEDUP_CONFIDENCE_BUMP), 4)
+        except (TypeError, ValueError):
+            pass
+
+    out["hits"] = int((base or {}).get("hits", 1)) + int(new.get("hits", 1))
+
+    if new.get("ts"):
+        if (base or {}).get("ts"):
+            out.setdefault("first_ts", base["ts"])
+        out["ts"] = new["ts"]
+
+    return out
+
+
 class VectorStore:
-    def __init__(self, dir_path: str, embeddings):
+    """
+    Stockage :
+    - vectors.f32  : vecteurs float32 append-only, lus via np.memmap (id = numéro de ligne)
+    - meta.sqlite  : texte + metadata par id, lus seulement pour les hits top-k,
+                     + colonnes indexées (kind, role, ts, confidence, tags) pour le pré-filtrage
+                     + index inversé BM25 (postings) pour la recherche lexicale / hybride
+    - index.faiss  : index ANN (IVF/HNSW), présent uniquement une fois promu
+
+    Démarrage en O(1) : rien n'est parsé ni chargé en RAM hors index ANN.
+    """
+
+    def __init__(
+        self,
+        dir_path: str,
+        embeddings,
+        write_behind: bool = False,
+        flush_interval_sec: float = 30.0,
+        flush_max_pending: int = 64,
+        ann_kind: str = "none",
+        ann_threshold: int = 20000,
+        hnsw_m: int = 32,
+        hnsw_ef_search: int = 64,
+        ivf_nprobe: int = 16,
+        dedup_threshold: float | None = None,
+    ):
         self.dir = dir_path
         self.embeddings = embeddings
         os.makedirs(self.dir, exist_ok=True)
 
+        self.vectors_path = os.path.join(self.dir, "vectors.f32")
+        self.db_path = os.path.join(self.dir, "meta.sqlite")
         self.index_path = os.path.join(self.dir, "index.faiss")
-        self.meta_path = os.path.join(self.dir, "meta.jsonl")
 
-        self._items = []  # [{"text":..., "metadata": {...}}]
+        # Ancien format (index.faiss flat + meta.jsonl), migré au premier démarrage
+        self.legacy_meta_path = os.path.join(self.dir, "meta.jsonl")
+
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+
+        # Write-behind : l'index ANN en RAM est à jour, sa réécriture disque est différée
+        self.write_behind = bool(write_behind)
+        self.flush_interval_sec = float(flush_interval_sec)
+        self.flush_max_pending = max(1, int(flush_max_pending))
+        self._pending = 0
+        self._flush_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._flusher = None
+
+        # Tier ANN : flat tant que le store est petit, puis IVF/HNSW au-delà du seuil
+        self.ann_kind = (ann_kind or "none").lower()
+        self.ann_threshold = max(1, int(ann_threshold))
+        self.hnsw_m = int(hnsw_m)
+        self.hnsw_ef_search = int(hnsw_ef_search)
+        self.ivf_nprobe = int(ivf_nprobe)
+        self._promoting = False
+
+        # Dédup à l'insertion : cosine >= seuil -> fusion dans le souvenir existant
+        self.dedup_threshold = float(dedup_threshold) if dedup_threshold else None
+
+        self.index = None  # None = recherche exacte sur le memmap
+        self.dim = 0
+        self._count = 0
+        self._vecs = None
+
+        self._open_db()
+        self._migrate_legacy()
+        self._open_vectors()
+        self._load_ann()
+        self._maybe_promote()
+
+        if self.write_behind:
+            self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+            self._flusher.start()
+            atexit.register(self.close)
+
+    @property
+    def ntotal(self) -> int:
+        return self._count
+
+    # ---------------- STOCKAGE ----------------
+
+    def _open_db(self):
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS items ("
+            "id INTEGER PRIMARY KEY, text TEXT NOT NULL, metadata TEXT NOT NULL, "
+            "kind TEXT, role TEXT, ts REAL, confidence REAL, length INTEGER)"
+        )
+        self._db.execute("CREATE TABLE IF NOT EXISTS info (key TEXT PRIMARY KEY, value TEXT)")
+
+        # Index secondaire pour les recherches filtrées
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS item_tags ("
+            "tag TEXT NOT NULL, id INTEGER NOT NULL, PRIMARY KEY (tag, id)) WITHOUT ROWID"
+        )
+        # Index inversé BM25, maintenu à chaque ajout
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS postings ("
+            "term TEXT NOT NULL, id INTEGER NOT NULL, tf INTEGER NOT NULL, "
+            "PRIMARY KEY (term, id)) WITHOUT ROWID"
+        )
+        self._upgrade_schema()
+        for col in ("kind", "ts", "confidence"):
+            self._db.execute(f"CREATE INDEX IF NOT EXISTS idx_items_{col} ON items ({col})")
+        self._db.commit()
+
+    def _upgrade_schema(self):
+        """
+        Ancien schéma (texte + metadata JSON) -> colonnes filtrables,
+        table des tags et index inversé BM25, reconstruits depuis les données.
+        """
+        cols = {r[1] for r in self._db.execute("PRAGMA table_info(items)")}
+        missing = [
+            (col, typ)
+            for col, typ in (
+                ("kind", "TEXT"), ("role", "TEXT"), ("ts", "REAL"),
+                ("confidence", "REAL"), ("length", "INTEGER"),
+            )
+            if col not in cols
+        ]
+        if not missing:
+            return
+
+        for col, typ in missing:
+            self._db.execute(f"ALTER TABLE items ADD COLUMN {col} {typ}")
 
-        self._load_meta()
-        self._load_or_create_index()
+        rows = self._db.execute("SELECT id, text, metadata FROM items").fetchall()
+        self._db.execute("DELETE FROM item_tags")
+        self._db.execute("DELETE FROM postings")
+        self._set_info("bm25_total_len", 0)
+        for rid, text, md in rows:
+            md = json.loads(md) if md else {}
+            self._db.execute("DELETE FROM items WHERE id = ?", (rid,))
+            self._insert_items(rid, [text], [md])
+        log.info(f"Vector store : metadata filtrables + BM25 indexés ({len(rows)} souvenirs).")
 
-    def _load_meta(self):
-        if not os.path.exists(self.meta_path):
-            open(self.meta_path, "a", encoding="utf-8").close()
-        with open(self.meta_path, "r", encoding="utf-8") as f:
+    def _insert_items(self, first_id: int, texts: list[str], metadatas: list[dict]):
+        rows, tags, postings = [], [], []
+        total_len = 0
+        for i, (t, md) in enumerate(zip(texts, metadatas)):
+            md = md or {}
+            tf, length = bm25.term_frequencies(t)
+            rows.append((first_id + i, t, json.dumps(md, ensure_ascii=False), *_filter_columns(md), length))
+            tags.extend((tag, first_id + i) for tag in _tags_of(md))
+            postings.extend((term, first_id + i, n) for term, n in tf.items())
+            total_len += length
+
+        self._db.executemany(
+            "INSERT INTO items (id, text, metadata, kind, role, ts, confidence, length) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        self._db.executemany("INSERT OR IGNORE INTO item_tags (tag, id) VALUES (?, ?)", tags)
+        self._db.executemany("INSERT INTO postings (term, id, tf) VALUES (?, ?, ?)", postings)
+        self._set_info("bm25_total_len", int(self._get_info("bm25_total_len", 0)) + total_len)
+
+    def _get_info(self, key: str, default=None):
+        row = self._db.execute("SELECT value FROM info WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_info(self, key: str, value):
+        self._db.execute("INSERT OR REPLACE INTO info (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def _db_count(self) -> int:
+        row = self._db.execute("SELECT MAX(id) FROM items").fetchone()
+        return 0 if row[0] is None else int(row[0]) + 1
+
+    def _migrate_legacy(self):
+        """Import one-shot de meta.jsonl (+ vecteurs de l'ancien index.faiss flat)."""
+        if not os.path.exists(self.legacy_meta_path) or self._db_count() > 0:
+            return
+
+        items = []
+        with open(self.legacy_meta_path, "r", encoding="utf-8") as f:
             for line in f:
                 if line.strip():
                     j = json.loads(line)
-                    self._items.append({
-                        "text": j.get("text", ""),
-                        "metadata": j.get("metadata", {}) or {},
-                    })
+                    items.append((j.get("text", ""), j.get("metadata", {}) or {}))
 
-
-    def _load_or_create_index(self):
+        vecs = np.empty((0, 0), dtype="float32")
         if os.path.exists(self.index_path):
-            self.index = faiss.read_index(self.index_path)
+            try:
+                old = faiss.read_index(self.index_path)
+                n = min(old.ntotal, len(items))
+                if isinstance(old, faiss.IndexIVF):
+                    old.make_direct_map()
+                vecs = old.reconstruct_n(0, n) if n else vecs
+            except Exception as e:
+                log.warning(f"Ancien index illisible, ré-encodage complet: {e}")
+
+        if items and len(vecs) < len(items):
+            rest = self.embeddings.encode([t for t, _ in items[len(vecs):]], cache=False)
+            rest = np.asarray(rest, dtype="float32")
+            vecs = rest if len(vecs) == 0 else np.concatenate([vecs, rest], axis=0)
+
+        if items:
+            with open(self.vectors_path, "wb") as f:
+                f.write(np.ascontiguousarray(vecs, dtype="float32").tobytes())
+            self._insert_items(0, [t for t, _ in items], [md for _, md in items])
+            self._set_info("dim", int(vecs.shape[1]))
+            self._db.commit()
+
+        # l'ancien index est flat : il sera reconstruit en ANN si besoin
+        for path in (self.index_path, self.index_path + ".tmp", os.path.join(self.dir, "vectors.log"),
+                     os.path.join(self.dir, "vectors.log.flushing")):
+            if os.path.exists(path):
+                os.remove(path)
+        os.replace(self.legacy_meta_path, self.legacy_meta_path + ".migrated")
+        log.info(f"Vector store migré au format memmap + SQLite ({len(items)} souvenirs).")
+
+    def _open_vectors(self):
+        dim = self._get_info("dim")
+        if dim is None:
+            probe = self.embeddings.encode(["test"], cache=False)
+            dim = int(np.asarray(probe).shape[1])
+            self._set_info("dim", dim)
+            self._db.commit()
+        self.dim = int(dim)
+
+        if not os.path.exists(self.vectors_path):
+            open(self.vectors_path, "wb").close()
+
+        row_bytes = self.dim * 4
+        file_rows = os.path.getsize(self.vectors_path) // row_bytes
+        meta_rows = self._db_count()
+
+        # Les vecteurs sont écrits avant le commit SQLite : des lignes en trop
+        # (ou un enregistrement partiel) = ajout interrompu par un crash.
+        if os.path.getsize(self.vectors_path) != min(file_rows, meta_rows) * row_bytes:
+            with open(self.vectors_path, "r+b") as f:
+                f.truncate(min(file_rows, meta_rows) * row_bytes)
+
+        if meta_rows > file_rows:
+            rows = self._db.execute(
+                "SELECT text FROM items WHERE id >= ? ORDER BY id", (file_rows,)
+            ).fetchall()
+            log.info(f"Vector store : {len(rows)} vecteurs manquants ré-encodés.")
+            vecs = np.asarray(self.embeddings.encode([r[0] for r in rows], cache=False), dtype="float32")
+            with open(self.vectors_path, "ab") as f:
+                f.write(vecs.tobytes())
+
+        self._remap(meta_rows)
+
+    def _remap(self, count: int):
+        self._count = int(count)
+        if self._count == 0:
+            self._vecs = np.empty((0, self.dim), dtype="float32")
             return
+        self._vecs = np.memmap(self.vectors_path, dtype="float32", mode="r", shape=(self._count, self.dim))
+
+    def _fetch(self, ids: list[int]) -> dict[int, dict]:
+        if not ids:
+            return {}
+        out = {}
+        for i in range(0, len(ids), 500):
+            chunk = [int(x) for x in ids[i:i + 500]]
+            rows = self._db.execute(
+                f"SELECT id, text, metadata FROM items WHERE id IN ({','.join('?' * len(chunk))})",
+                chunk,
+            ).fetchall()
+            for rid, text, md in rows:
+                out[int(rid)] = {"text": text, "metadata": json.loads(md) if md else {}}
+        return out
+
+    # ---------------- WRITE-BEHIND ----------------
+
+    def _write_index_atomic(self, data: np.ndarray):
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data.tobytes())
+        os.replace(tmp_path, self.index_path)
+
+    def flush(self):
+        """
+        Réécrit index.faiss si l'index ANN a changé depuis le dernier flush.
+        Les vecteurs et les metadata, eux, sont déjà durables (append + commit).
+        """
+        if self._promotion_due():
+            self._maybe_promote()
+
+        with self._flush_lock:
+            with self._lock:
+                if self._pending == 0 or self.index is None:
+                    self._pending = 0
+                    return
+                data = faiss.serialize_index(self.index)
+                self._pending = 0
+
+            self._write_index_atomic(data)
+
+    def _flush_loop(self):
+        while not self._stop_event.is_set():
+            self._flush_event.wait(timeout=self.flush_interval_sec)
+            self._flush_event.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                log.error(f"Flush vector store échoué: {e}")
+
+    def close(self):
+        if self._flusher is not None:
+            self._stop_event.set()
+            self._flush_event.set()
+            self._flusher.join(timeout=10)
+            self._flusher = None
+        self.flush()
+
+    # ---------------- TIER ANN (IVF / HNSW) ----------------
+
+    def _load_ann(self):
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            # HNSW : stockage mappé en mémoire ; IVF mappé serait en lecture seule
+            flags = faiss.IO_FLAG_MMAP if self.ann_kind == "hnsw" else 0
+            self.index = faiss.read_index(self.index_path, flags)
+        except Exception as e:
+            log.warning(f"index.faiss illisible, retour au scan exact: {e}")
+            self.index = None
+            return
+
+        self._apply_search_params()
+
+        # Rattrapage après crash : vecteurs présents dans vectors.f32 mais pas dans l'index
+        if self.index.ntotal > self._count:
+            log.warning("index.faiss plus grand que le store, reconstruction.")
+            self.index = None
+            return
+        if self.index.ntotal < self._count:
+            missing = self._count - self.index.ntotal
+            self.index.add(np.ascontiguousarray(self._vecs[self.index.ntotal:self._count]))
+            log.info(f"Récupération vector store : {missing} vecteurs rejoués dans l'index ANN.")
+            self._write_index_atomic(faiss.serialize_index(self.index))
+
+    def _apply_search_params(self, index=None):
+        index = self.index if index is None else index
+        if isinstance(index, faiss.IndexHNSW):
+            index.hnsw.efSearch = self.hnsw_ef_search
+        elif isinstance(index, faiss.IndexIVF):
+            index.nprobe = self.ivf_nprobe
 
-        # dimension du modèle
-        probe = self.embeddings.encode(["test"])
-        dim = int(probe.shape[1])
-        self.index = faiss.IndexFlatIP(dim)  # cosine via normalize_embeddings=True
-        faiss.write_index(self.index, self.index_path)
+    def _build_ann(self, vecs: np.ndarray, kind: str):
+        dim = int(vecs.shape[1])
 
-        # si on a du meta sans index (rare), on reconstruit
-        if self._items:
-            texts = [it["text"] for it in self._items]
-            vecs = self.embeddings.encode(texts).astype("float32")
+        if kind == "hnsw":
+            index = faiss.IndexHNSWFlat(dim, self.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+            index.hnsw.efConstruction = max(40, 2 * self.hnsw_m)
+            index.add(vecs)
 
-            self.index.add(vecs)
-            faiss.write_index(self.index, self.index_path)
+        elif kind == "ivf":
+            n = len(vecs)
+            nlist = int(max(16, min(65536, 4 * np.sqrt(n))))
+            nlist = min(nlist, max(1, n // 39))  # faiss veut ~39 points par centroïde
+            quantizer = faiss.IndexFlatIP(dim)
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+            sample = vecs
+            if n > 256 * nlist:
+                pick = np.sort(np.random.default_rng(0).choice(n, 256 * nlist, replace=False))
+                sample = vecs[pick]
+            index.train(np.ascontiguousarray(sample))
+            index.add(vecs)
+
+        else:
+            raise ValueError(f"Type d'index ANN inconnu: {kind}")
+
+        self._apply_search_params(index)
+        return index
+
+    def _promotion_due(self) -> bool:
+        return (
+            self.ann_kind in {"ivf", "hnsw"}
+            and not self._promoting
+            and self.index is None
+            and self._count >= self.ann_threshold
+        )
+
+    def _maybe_promote(self):
+        """
+        Construit l'index ANN une fois le seuil dépassé.
+        La construction se fait hors verrou ; les vecteurs ajoutés entre-temps
+        sont rattrapés avant la bascule (les ids restent identiques).
+        """
+        with self._lock:
+            if not self._promotion_due():
+                return
+            self._promoting = True
+            n0, vecs = self._count, self._vecs
+
+        try:
+            t0 = time.perf_counter()
+            ann = self._build_ann(np.ascontiguousarray(vecs[:n0]), self.ann_kind)
+
+            with self._lock:
+                if self._count > n0:
+                    ann.add(np.ascontiguousarray(self._vecs[n0:self._count]))
+                self.index = ann
+                if self.write_behind:
+                    self._pending += 1  # force l'écriture de index.faiss
+                else:
+                    self._write_index_atomic(faiss.serialize_index(self.index))
+
+            log.info(
+                f"Vector store promu en {self.ann_kind.upper()} "
+                f"({ann.ntotal} vecteurs, {time.perf_counter() - t0:.1f}s)."
+            )
+        finally:
+            self._promoting = False
+
+    def benchmark_ann(self, n_queries: int = 200, k: int = 10, kind: str | None = None) -> dict:
+        """
+        Compare l'index ANN (actuel, ou construit à la volée si on est encore en flat)
+        à une recherche exacte : recall@k et latence moyenne par requête.
+        Les requêtes sont des vecteurs du store légèrement bruités.
+        """
+        with self._lock:
+            vecs = np.ascontiguousarray(self._vecs[:self._count])
+            ann = self.index
+
+        if len(vecs) == 0:
+            return {}
+
+        if ann is None:
+            ann = self._build_ann(vecs, kind or (self.ann_kind if self.ann_kind != "none" else "hnsw"))
+
+        exact = faiss.IndexFlatIP(int(vecs.shape[1]))
+        exact.add(vecs)
+
+        rng = np.random.default_rng(0)
+        pick = rng.choice(len(vecs), min(n_queries, len(vecs)), replace=False)
+        queries = vecs[pick] + rng.normal(0.0, 0.05, size=(len(pick), vecs.shape[1])).astype("float32")
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+        k = min(k, len(vecs))
+
+        def timed(index):
+            t0 = time.perf_counter()
+            ids = [index.search(q.reshape(1, -1), k)[1][0] for q in queries]
+            return ids, (time.perf_counter() - t0) * 1000.0 / len(queries)
+
+        exact_ids, exact_ms = timed(exact)
+        with self._lock:
+            ann_ids, ann_ms = timed(ann)
+
+        hits = sum(len(set(a) & set(e)) for a, e in zip(ann_ids, exact_ids))
+
+        return {
+            "index": type(ann).__name__,
+            "ntotal": int(len(vecs)),
+            "queries": int(len(queries)),
+            "k": int(k),
+            f"recall@{k}": hits / float(k * len(queries)),
+            "exact_ms": exact_ms,
+            "ann_ms": ann_ms,
+        }
+
+    # ---------------- AJOUT / RECHERCHE ----------------
 
     def add(self, text: str, metadata: dict | None = None):
-        vec = self.embeddings.encode([text]).astype("float32")
-        self.index.add(vec)
-        faiss.write_index(self.index, self.index_path)
+        self.add_many([text], [metadata or {}])
+
+    def _nearest_existing(self, vecs: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Plus proche voisin dans le store pour chaque vecteur (à appeler sous verrou)."""
+        best_s = np.full(len(vecs), -np.inf, dtype="float32")
+        best_i = np.full(len(vecs), -1, dtype="int64")
+        if self._count == 0:
+            return best_s, best_i
+
+        if self.index is not None:
+            scores, ids = self.index.search(vecs, 1)
+            return scores[:, 0], ids[:, 0]
+
+        for s in range(0, self._count, SCAN_CHUNK_ROWS):
+            block = np.asarray(self._vecs[s:min(self._count, s + SCAN_CHUNK_ROWS)])
+            sims = vecs @ block.T
+            j = sims.argmax(axis=1)
+            sj = sims[np.arange(len(vecs)), j]
+            better = sj > best_s
+            best_s[better] = sj[better]
+            best_i[better] = j[better] + s
+        return best_s, best_i
+
+    def _update_item(self, rid: int, metadata: dict):
+        self._db.execute(
+            "UPDATE items SET metadata = ?, kind = ?, role = ?, ts = ?, confidence = ? WHERE id = ?",
+            (json.dumps(metadata, ensure_ascii=False), *_filter_columns(metadata), rid),
+        )
+        self._db.executemany(
+            "INSERT OR IGNORE INTO item_tags (tag, id) VALUES (?, ?)",
+            [(t, rid) for t in _tags_of(metadata)],
+        )
+
+    def add_many(
+        self,
+        texts: list[str],
+        metadatas: list[dict] | None = None,
+        batch_size: int = 256,
+    ) -> int:
+        """
+        Ingestion en masse : encode par lots, un seul append vectors.f32
+        et un seul commit SQLite par lot.
+        Si dedup_threshold est défini, un quasi-doublon (du store ou du lot)
+        est fusionné dans le souvenir existant au lieu d'être ajouté.
+        En mode write-behind, index.faiss (tier ANN) est réécrit par le flusher.
+        Retourne le nombre de souvenirs réellement ajoutés.
+        """
+        if metadatas is None:
+            metadatas = [{}] * len(texts)
+        if len(metadatas) != len(texts):
+            raise ValueError("texts et metadatas doivent avoir la même longueur")
+
+        batch_size = max(1, int(batch_size))
+        added = 0
+
+        for start in range(0, len(texts), batch_size):
+            batch_texts = texts[start:start + batch_size]
+            batch_meta = metadatas[start:start + batch_size]
+
+            vecs = np.asarray(self.embeddings.encode(batch_texts, cache=False), dtype="float32")
+
+            with self._lock:
+                first_id = self._count
+
+                kept = list(range(len(vecs)))
+                kept_meta = [dict(md or {}) for md in batch_meta]
+                merges: dict[int, list[dict]] = {}
+
+                if self.dedup_threshold is not None:
+                    near_s, near_i = self._nearest_existing(vecs)
+                    kept, kept_meta = [], []
+                    for i, md in enumerate(batch_meta):
+                        # quasi-doublon d'un élément déjà retenu dans ce lot ?
+                        in_batch_s, in_batch_j = -np.inf, -1
+                        if kept:
+                            sims = vecs[kept] @ vecs[i]
+                            in_batch_j = int(sims.argmax())
+                            in_batch_s = float(sims[in_batch_j])
+
+                        if max(in_batch_s, float(near_s[i])) >= self.dedup_threshold:
+                            if in_batch_s >= float(near_s[i]):
+                                kept_meta[in_batch_j] = _merge_metadata(kept_meta[in_batch_j], md or {})
+                            else:
+                                merges.setdefault(int(near_i[i]), []).append(md or {})
+                            continue
+
+                        kept.append(i)
+                        kept_meta.append(dict(md or {}))
+
+                new_vecs = np.ascontiguousarray(vecs[kept])
+
+                if len(new_vecs):
+                    # vecteurs d'abord : au redémarrage, les lignes sans meta sont tronquées
+                    with open(self.vectors_path, "ab") as f:
+                        f.write(new_vecs.tobytes())
+
+                    self._insert_items(first_id, [batch_texts[i] for i in kept], kept_meta)
+
+                if merges:
+                    current = self._fetch(list(merges))
+                    for rid, mds in merges.items():
+                        md = (current.get(rid) or {}).get("metadata", {})
+                        for other in mds:
+                            md = _merge_metadata(md, other)
+                        self._update_item(rid, md)
+                    log.info(f"Vector store : {sum(len(m) for m in merges.values())} quasi-doublon(s) fusionné(s).")
+
+                self._db.commit()
+
+                if not len(new_vecs):
+                    continue
 
-        rec = {"text": text, "metadata": metadata or {}}
-        with open(self.meta_path, "a", encoding="utf-8") as f:
-            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
-        self._items.append(rec)
+                self._remap(first_id + len(new_vecs))
 
-    def search(self, query: str, k: int = 4, min_score: float = 0.0) -> list[dict]:
-        if self.index.ntotal == 0:
+                if self.index is not None:
+                    self.index.add(new_vecs)
+                    if self.write_behind:
+                        self._pending += len(new_vecs)
+                        if self._pending >= self.flush_max_pending:
+                            self._flush_event.set()
+                    else:
+                        self._write_index_atomic(faiss.serialize_index(self.index))
+                elif self.write_behind and self._promotion_due():
+                    self._flush_event.set()
+
+            added += len(new_vecs)
+
+            # en write-behind, la promotion est faite par le flusher
+            if not self.write_behind:
+                self._maybe_promote()
+
+        return added
+
+    def _flat_search(self, vecs: np.ndarray, count: int, qv: np.ndarray, k: int):
+        """Recherche exacte par blocs sur le memmap (top-k partiel par bloc)."""
+        best_s = np.empty(0, dtype="float32")
+        best_i = np.empty(0, dtype="int64")
+
+        for s in range(0, count, SCAN_CHUNK_ROWS):
+            scores = np.asarray(vecs[s:min(count, s + SCAN_CHUNK_ROWS)]) @ qv
+            if len(scores) > k:
+                part = np.argpartition(-scores, k - 1)[:k]
+            else:
+                part = np.arange(len(scores))
+            best_s = np.concatenate([best_s, scores[part]])
+            best_i = np.concatenate([best_i, part.astype("int64") + s])
+
+            if len(best_s) > k:
+                keep = np.argpartition(-best_s, k - 1)[:k]
+                best_s, best_i = best_s[keep], best_i[keep]
+
+        order = np.argsort(-best_s)
+        return best_s[order], best_i[order]
+
+    def _filter_ids(
+        self,
+        tags: list[str] | None = None,
+        kind: str | list[str] | None = None,
+        since=None,
+        until=None,
+        min_confidence: float | None = None,
+    ) -> np.ndarray:
+        """Pré-filtrage SQL sur l'index secondaire -> ids candidats triés."""
+        where, params = [], []
+
+        if kind:
+            kinds = [kind] if isinstance(kind, str) else list(kind)
+            where.append(f"i.kind IN ({','.join('?' * len(kinds))})")
+            params.extend(kinds)
+
+        ts_from, ts_to = _to_epoch(since), _to_epoch(until)
+        if ts_from is not None:
+            where.append("i.ts >= ?")
+            params.append(ts_from)
+        if ts_to is not None:
+            where.append("i.ts <= ?")
+            params.append(ts_to)
+
+        if min_confidence is not None:
+            where.append("i.confidence >= ?")
+            params.append(float(min_confidence))
+
+        if tags:
+            tag_list = _tags_of({"tags": tags})
+            where.append(
+                f"i.id IN (SELECT id FROM item_tags WHERE tag IN ({','.join('?' * len(tag_list))}))"
+            )
+            params.extend(tag_list)
+
+        sql = "SELECT i.id FROM items i"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY i.id"
+
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        return np.fromiter((r[0] for r in rows), dtype="int64", count=len(rows))
+
+    def _subset_search(self, vecs: np.ndarray, ids: np.ndarray, qv: np.ndarray, k: int):
+        """Recherche exacte restreinte aux ids candidats (lecture memmap ciblée)."""
+        best_s = np.empty(0, dtype="float32")
+        best_i = np.empty(0, dtype="int64")
+
+        for s in range(0, len(ids), SCAN_CHUNK_ROWS):
+            chunk = ids[s:s + SCAN_CHUNK_ROWS]
+            scores = np.asarray(vecs[chunk]) @ qv
+            best_s = np.concatenate([best_s, scores])
+            best_i = np.concatenate([best_i, chunk])
+            if len(best_s) > k:
+                keep = np.argpartition(-best_s, k - 1)[:k]
+                best_s, best_i = best_s[keep], best_i[keep]
+
+        order = np.argsort(-best_s)
+        return best_s[order], best_i[order]
+
+    def _lexical_search(self, query: str, k: int, candidates: np.ndarray | None, count: int):
+        """BM25 via l'index inversé SQLite : seules les postings des termes de la requête sont lues."""
+        terms = list(dict.fromkeys(bm25.tokenize(query)))
+        if not terms or count == 0:
             return []
 
-        qv = self.embeddings.encode([query]).astype("float32")
-        scores, ids = self.index.search(qv, k)
+        allowed = set(candidates.tolist()) if candidates is not None else None
+
+        scores: dict[int, float] = {}
+        with self._lock:
+            avgdl = int(self._get_info("bm25_total_len", 0)) / float(count)
+            for term in terms:
+                rows = self._db.execute(
+                    "SELECT p.id, p.tf, i.length FROM postings p JOIN items i ON i.id = p.id "
+                    "WHERE p.term = ? AND p.id < ?",
+                    (term, count),
+                ).fetchall()
+                if not rows:
+                    continue
+                term_idf = bm25.idf(count, len(rows))
+                for rid, tf, length in rows:
+                    if allowed is not None and rid not in allowed:
+                        continue
+                    scores[rid] = scores.get(rid, 0.0) + bm25.term_score(tf, length or 0, avgdl, term_idf)
+
+        return sorted(scores.items(), key=lambda x: -x[1])[:k]
+
+    def search(
+        self,
+        query: str,
+        k: int = 4,
+        min_score: float = 0.0,
+        tags: list[str] | None = None,
+        kind: str | list[str] | None = None,
+        since=None,
+        until=None,
+        min_confidence: float | None = None,
+        mode: str = "vector",
+    ) -> list[dict]:
+        """
+        mode :
+        - "vector"  : top-k cosine (min_score s'applique au cosine)
+        - "lexical" : top-k BM25 (score = BM25, min_score ignoré)
+        - "hybrid"  : fusion RRF des deux classements ; un hit lexical est gardé
+                      même sous min_score (noms propres, titres, termes exacts)
+        Filtres optionnels (combinés en ET) :
+        tags (au moins un), kind, since/until (ISO, datetime ou epoch), min_confidence.
+        Avec filtres, les ids candidats sont pré-sélectionnés en SQL puis seuls
+        leurs vecteurs sont scorés.
+        """
+        if self._count == 0:
+            return []
+
+        mode = (mode or "vector").lower()
+
+        filtered = any(
+            v is not None and v != [] and v != ""
+            for v in (tags, kind, since, until, min_confidence)
+        )
+        candidates = None
+        if filtered:
+            candidates = self._filter_ids(tags, kind, since, until, min_confidence)
+            if len(candidates) == 0:
+                return []
+
+        with self._lock:
+            vecs, count, index = self._vecs, self._count, self.index
+        if candidates is not None:
+            candidates = candidates[candidates < count]
+
+        # la fusion a besoin de plus de profondeur que k
+        depth = k if mode == "vector" else max(3 * k, 20)
+
+        lexical = []
+        if mode in {"lexical", "hybrid"}:
+            lexical = self._lexical_search(query, depth, candidates, count)
+
+        if mode == "lexical":
+            hits = [(rid, s, {"bm25": s}) for rid, s in lexical]
+
+        else:
+            qv = np.asarray(self.embeddings.encode([query]), dtype="float32")
+
+            if candidates is not None:
+                scores, ids = self._subset_search(vecs, candidates, qv[0], depth)
+            elif index is not None:
+                with self._lock:
+                    scores, ids = index.search(qv, depth)
+                scores, ids = scores[0], ids[0]
+            else:
+                scores, ids = self._flat_search(vecs, count, qv[0], depth)
+
+            vector = [(int(i), float(s)) for s, i in zip(scores, ids) if 0 <= i < count]
+
+            if mode == "vector":
+                hits = [(rid, s, {}) for rid, s in vector if s >= float(min_score)]
+            else:
+                cosine = dict(vector)
+                lex = dict(lexical)
+                fused = bm25.rrf_fuse([[rid for rid, _ in vector], [rid for rid, _ in lexical]])
+
+                hits = []
+                for rid, rrf in sorted(fused.items(), key=lambda x: -x[1]):
+                    if rid not in cosine:
+                        cosine[rid] = float(np.asarray(vecs[rid]) @ qv[0])
+                    if cosine[rid] < float(min_score) and rid not in lex:
+                        continue
+                    extra = {"rrf": rrf}
+                    if rid in lex:
+                        extra["bm25"] = lex[rid]
+                    hits.append((rid, cosine[rid], extra))
+
+        hits = hits[:k]
+        with self._lock:
+            items = self._fetch([rid for rid, _, _ in hits])
 
         out = []
-        for score, idx in zip(scores[0], ids[0]):
-            if idx < 0:
+        for rid, s, extra in hits:
+            it = items.get(rid)
+            if it is None:
                 continue
-            if 0 <= idx < len(self._items):
-                s = float(score)
-                if s >= float(min_score):
-                    it = self._items[idx]
-                    out.append({
-                        "text": it.get("text", ""),
-                        "metadata": it.get("metadata", {}) or {},
-                        "score": s,
-                    })
+            out.append({
+                "text": it.get("text", ""),
+                "metadata": it.get("metadata", {}) or {},
+                "score": s,
+                **extra,
+            })
         return out
-
@@ -0,0 +1,101 @@
+# src/max_assistant_v2/stt/audio_buffer.py
+from math import ceil, gcd
+
+import numpy as np
+from scipy.signal import resample_poly
+
+
+class RingBuffer:
+    """
+    Tampon circulaire audio préalloué (mono), un écrivain / un lecteur, sans verrou :
+    - write() ne fait que des copies dans le tableau existant (aucune allocation),
+      donc utilisable dans le callback PortAudio
+    - stockage en miroir (2 × capacité) : toute fenêtre ≤ capacité est une vue
+      contiguë, sans copie ni np.concatenate
+    - written : nombre total d'échantillons écrits, sert de repère au lecteur
+    Une vue reste valable tant que l'écrivain n'a pas fait un tour complet :
+    la copier si on la garde longtemps.
+    """
+
+    def __init__(self, capacity: int, dtype=np.float32):
+        self.capacity = int(capacity)
+        self._buf = np.zeros(2 * self.capacity, dtype=dtype)
+        self.written = 0
+
+    def write(self, block: np.ndarray):
+        n = len(block)
+        if n == 0:
+            return
+        cap = self.capacity
+        if n > cap:
+            block = block[-cap:]
+
+        m = len(block)
+        pos = (self.written + n - m) % cap
+        first = min(m, cap - pos)
+        self._buf[pos:pos + first] = block[:first]
+        self._buf[pos + cap:pos + cap + first] = block[:first]
+        rest = m - first
+        if rest:
+            self._buf[:rest] = block[first:]
+            self._buf[cap:cap + rest] = block[first:]
+
+        # publié en dernier : le lecteur ne voit que des échantillons déjà copiés
+        self.written += n
+
+    def latest(self, n: int) -> np.ndarray:
+        """Vue sur les n derniers échantillons (n ≤ capacité)."""
+        n = min(int(n), self.capacity, self.written)
+        end = self.written % self.capacity + self.capacity
+        return self._buf[end - n:end]
+
+    def since(self, mark: int) -> tuple[np.ndarray, int]:
+        """(échantillons écrits depuis le repère mark, nouveau repère)."""
+        written = self.written
+        return self.latest(min(written - mark, self.capacity)), written
+
+
+class StreamingResampler:
+    """
+    Rééchantillonnage incrémental : seuls les nouveaux échantillons sont traités.
+    Chaque appel filtre [contexte gauche | nouveaux | contexte droit] avec resample_poly
+    et ne garde que la partie centrale : pas de transitoire aux jointures, résultat
+    identique (aux arrondis près) au rééchantillonnage du signal entier.
+    Latence : le contexte droit (≈ 10 trames de filtre) est retenu jusqu'à l'appel suivant.
+    """
+
+    def __init__(self, input_rate: int, output_rate: int):
+        g = gcd(int(input_rate), int(output_rate))
+        self.up = int(output_rate) // g
+        self.down = int(input_rate) // g
+
+        # demi-longueur du filtre de resample_poly, en échantillons d'entrée,
+        # arrondie à un multiple de down (blocs alignés sur la grille de sortie)
+        half = ceil(10 * max(self.up, self.down) / self.up)
+        self.ctx = ceil(half / self.down) * self.down
+        self.reset()
+
+    def reset(self):
+        """Nouveau flux : contexte gauche initial = silence."""
+        self._pending = np.zeros(self.ctx, dtype=np.float32)
+
+    @property
+    def passthrough(self) -> bool:
+        return self.up == self.down
+
+    def process(self, audio: np.ndarray) -> np.ndarray:
+        audio = np.asarray(audio, dtype=np.float32)
+        if self.passthrough:
+            return audio
+
+        buf = np.concatenate([self._pending, audio])
+        # entrée exploitable : tout sauf le contexte droit, alignée sur down
+        usable = (len(buf) - 2 * self.ctx) // self.down * self.down
+        if usable <= 0:
+            self._pending = buf
+            return np.zeros(0, dtype=np.float32)
+
+        out = resample_poly(buf[:usable + 2 * self.ctx], self.up, self.down).astype(np.float32)
+        skip = self.ctx * self.up // self.down
+        self._pending = buf[usable:]
+        return out[skip:skip + usable * self.up // self.down]
@@ -0,0 +1,89 @@
+# src/max_assistant_v2/stt/audio_frontend.py
+from contextlib import contextmanager
+
+import numpy as np
+import sounddevice as sd
+
+from max_assistant_v2.stt.audio_buffer import RingBuffer, StreamingResampler
+
+
+class AudioFrontend:
+    """
+    Capture micro → trames 16 kHz float32 mono prêtes pour VAD, réveil et Whisper.
+    - capture directe à 16 kHz si le périphérique l'accepte (aucun rééchantillonnage)
+    - sinon fréquence native + StreamingResampler bloc par bloc (jamais de recalcul
+      sur un tampon entier)
+    - le callback PortAudio ne fait qu'une copie dans un tampon circulaire préalloué
+    """
+
+    def __init__(self, device_hint: str = "TONOR", target_rate: int = 16000,
+                 block_ms: int = 40, max_sec: int = 60):
+        self.target_rate = int(target_rate)
+        self.block_ms = int(block_ms)
+
+        self.device_index = self._find_device(device_hint)
+        self.input_rate = self._negotiate_rate()
+
+        self.raw = RingBuffer(self.input_rate * 2, dtype=np.int16)
+        self.audio = RingBuffer(self.target_rate * int(max_sec), dtype=np.float32)
+        self.resampler = StreamingResampler(self.input_rate, self.target_rate)
+        self._mark = 0
+
+        if self.resampler.passthrough:
+            print(f"🎤 Capture native {self.input_rate} Hz")
+        else:
+            print(f"🎤 Capture {self.input_rate} Hz → {self.target_rate} Hz (rééchantillonnage en flux)")
+
+    @staticmethod
+    def _find_device(hint: str):
+        # Auto-détection micro TONOR
+        for i, dev in enumerate(sd.query_devices()):
+            if hint and hint in dev["name"] and dev["max_input_channels"] > 0:
+                print(f"🎤 Micro détecté: {dev['name']} (index {i})")
+                return i
+
+        print(f"⚠️ {hint} non trouvé, micro par défaut utilisé.")
+        return sd.default.device[0]
+
+    def _negotiate_rate(self) -> int:
+        """16 kHz si possible, sinon la fréquence par défaut du périphérique, puis 48k / 44.1k."""
+        candidates = [self.target_rate]
+        try:
+            candidates.append(int(sd.query_devices(self.device_index)["default_samplerate"]))
+        except Exception:
+            pass
+        candidates += [48000, 44100]
+
+        for rate in dict.fromkeys(candidates):
+            try:
+                sd.check_input_settings(device=self.device_index, channels=1, dtype="int16", samplerate=rate)
+                return rate
+            except Exception:
+                continue
+        raise RuntimeError(f"Aucune fréquence de capture acceptée par le micro {self.device_index}")
+
+    def _callback(self, indata, frames, time_info, status):
+        # aucune allocation ici : copie dans le tampon circulaire
+        self.raw.write(indata[:, 0])
+
+    @contextmanager
+    def stream(self):
+        """Ouvre la capture ; pull() renvoie ensuite les nouvelles trames 16 kHz."""
+        self.resampler.reset()
+        with sd.InputStream(
+            device=self.device_index,
+            samplerate=self.input_rate,
+            channels=1,
+            dtype="int16",
+            callback=self._callback,
+            blocksize=self.input_rate * self.block_ms // 1000,
+        ):
+            self._mark = self.raw.written
+            yield self
+
+    def pull(self) -> np.ndarray:
+        """Échantillons arrivés depuis le dernier appel, en 16 kHz float32 (aussi ajoutés à self.audio)."""
+        raw, self._mark = self.raw.since(self._mark)
+        pcm = self.resampler.process(raw.astype(np.float32) / 32768.0)
+        self.audio.write(pcm)
+        return pcm
@@ -0,0 +1,165 @@
+# src/max_assistant_v2/stt/streaming_transcriber.py
+import re
+import threading
+import time
+
+import numpy as np
+
+from max_assistant_v2.utils.logger import get_logger
+
+log = get_logger(__name__)
+
+_NON_WORD_RE = re.compile(r"[^\w']+")
+
+
+def _norm_word(word: str) -> str:
+    return _NON_WORD_RE.sub("", word.lower())
+
+
+class StreamingTranscriber:
+    """
+    Transcription pendant que l'utilisateur parle (politique LocalAgreement-2) :
+    - toutes les step_sec, décodage glouton de l'audio non confirmé, dans un thread
+    - les mots identiques dans deux hypothèses successives sont confirmés : leur audio
+      n'est plus redécodé (le texte confirmé sert d'initial_prompt)
+    - on_partial(texte) reçoit confirmé + provisoire au fil de l'eau
+    - finish() : passe de fin courte sur la seule queue non confirmée
+    - gain de normalisation calculé au premier décodage puis figé : partiels et passe
+      de fin voient le même signal (texte final cohérent avec les partiels, préchargement RAG)
+    Le texte final est donc prêt peu après la fin de parole, au lieu d'un décodage
+    complet de la commande.
+    """
+
+    MARGIN_SEC = 0.2  # recouvrement avant la fin du dernier mot confirmé
+    TARGET_RMS = 0.1
+
+    def __init__(self, model, sample_rate: int = 16000, step_sec: float = 0.6,
+                 min_audio_sec: float = 0.8, language: str = "fr", final_beam_size: int = 3):
+        self.model = model
+        self.sample_rate = int(sample_rate)
+        self.step_sec = float(step_sec)
+        self.min_audio_sec = float(min_audio_sec)
+        self.language = language
+        self.final_beam_size = int(final_beam_size)
+
+        self._lock = threading.Lock()  # un seul décodage à la fois (partiel ou final)
+        self._gen = 0  # un décodage partiel en retard ne touche pas à la commande suivante
+        self.steps = 0
+        self.reset()
+
+    def reset(self, on_partial=None):
+        self._gen += 1
+        self.on_partial = on_partial
+        self._committed: list[tuple[str, float, float]] = []
+        self._committed_end = 0.0
+        self._hypothesis: list[tuple[str, float, float]] = []
+        self._busy = False
+        self._last_step = 0.0
+        self._gain = None
+
+    @property
+    def committed_text(self) -> str:
+        return " ".join(w for w, _, _ in self._committed)
+
+    def _fix_gain(self, audio: np.ndarray):
+        """Gain de normalisation RMS, calculé une seule fois par commande."""
+        if self._gain is None:
+            rms = float(np.sqrt(np.mean(np.square(audio, dtype=np.float32)))) if len(audio) else 0.0
+            self._gain = self.TARGET_RMS / rms if rms > 0 else 1.0
+
+    def _scaled(self, audio: np.ndarray) -> np.ndarray:
+        """Copie float32 de audio × gain (le tampon circulaire n'est pas modifié)."""
+        return np.multiply(audio, self._gain, dtype=np.float32)
+
+    def _offset(self) -> float:
+        return max(0.0, self._committed_end - self.MARGIN_SEC)
+
+    def _decode(self, audio: np.ndarray, offset: float, beam_size: int) -> list[tuple[str, float, float]]:
+        """Mots (texte, début, fin) en secondes absolues depuis le début de la commande."""
+        segments, _ = self.model.transcribe(
+            audio,
+            language=self.language,
+            beam_size=beam_size,
+            temperature=0.0,
+            condition_on_previous_text=False,
+            initial_prompt=" ".join(w for w, _, _ in self._committed[-30:]) or None,
+            word_timestamps=True,
+            vad_filter=False,
+        )
+        words = []
+        for seg in segments:
+            for w in seg.words or []:
+                text = w.word.strip()
+                if text:
+                    words.append((text, offset + w.start, offset + w.end))
+
+        # début de fenêtre recouvrant l'audio déjà confirmé : mots déjà émis
+        while words and words[0][2] <= self._committed_end + 0.05:
+            words.pop(0)
+        if words and self._committed and _norm_word(words[0][0]) == _norm_word(self._committed[-1][0]):
+            words.pop(0)
+        return words
+
+    def due(self, n_samples: int) -> bool:
+        if self._busy or time.monotonic() - self._last_step < self.step_sec:
+            return False
+        return n_samples / self.sample_rate - self._offset() >= self.min_audio_sec
+
+    def update(self, audio: np.ndarray):
+        """audio : commande depuis son début (16 kHz). Non bloquant ; ignoré si un décodage tourne."""
+        if self._busy:
+            return
+        self._busy = True
+        self._last_step = time.monotonic()
+
+        offset = self._offset()
+        self._fix_gain(audio)
+        tail = self._scaled(audio[int(offset * self.sample_rate):])
+        threading.Thread(target=self._step, args=(tail, offset, self._gen), daemon=True).start()
+
+    def _step(self, tail: np.ndarray, offset: float, gen: int):
+        try:
+            with self._lock:
+                if gen != self._gen:
+                    return
+                words = self._decode(tail, offset, beam_size=1)
+                self.steps += 1
+                if gen != self._gen:
+                    return
+
+                # préfixe commun avec l'hypothèse précédente → confirmé
+                agreed = 0
+                for new, old in zip(words, self._hypothesis):
+                    if _norm_word(new[0]) != _norm_word(old[0]):
+                        break
+                    agreed += 1
+                if agreed:
+                    self._committed.extend(words[:agreed])
+                    self._committed_end = words[agreed - 1][2]
+                self._hypothesis = words[agreed:]
+
+                partial = " ".join([self.committed_text] + [w for w, _, _ in self._hypothesis]).strip()
+
+            if partial and self.on_partial is not None:
+                self.on_partial(partial)
+        except Exception as e:
+            log.error(f"Transcription partielle: {e}")
+        finally:
+            if gen == self._gen:
+                self._busy = False
+
+    def finish(self, audio: np.ndarray) -> str:
+        """
+        Texte final : confirmé + passe de fin sur la queue (attend le décodage en cours).
+        audio : commande brute (non normalisée), le gain des partiels est appliqué ici aussi.
+        """
+        with self._lock:
+            self._gen += 1
+            self._fix_gain(audio)
+            offset = self._offset()
+            tail = self._scaled(audio[int(offset * self.sample_rate):])
+            words = self._decode(tail, offset, beam_size=self.final_beam_size) if len(tail) else []
+            text = " ".join([self.committed_text] + [w for w, _, _ in words]).strip()
+
+        log.debug(f"STT en flux : {self.steps} passes partielles, {len(self._committed)} mots confirmés avant la fin")
+        return text
@@ -0,0 +1,149 @@
+# src/max_assistant_v2/stt/vad.py
+from collections import deque
+
+import numpy as np
+
+from max_assistant_v2.utils.logger import get_logger
+
+log = get_logger(__name__)
+
+# fréquences / tailles de trame acceptées par webrtcvad
+_WEBRTC_RATES = (8000, 16000, 32000, 48000)
+_WEBRTC_FRAME_MS = (10, 20, 30)
+
+
+class VoiceActivityDetector:
+    """
+    Classifieur parole / non-parole par trame de 20-30 ms :
+    - énergie au-dessus d'un plancher de bruit adaptatif (descend vite, remonte lentement)
+    - + webrtcvad si installé (les deux doivent être d'accord : le bruit stationnaire
+      fort ne déclenche pas, un souffle au-dessus du plancher non plus)
+    Les échantillons sont accumulés : on peut fournir des blocs de n'importe quelle taille.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        frame_ms: int = 30,
+        margin_db: float = 9.0,
+        min_rms: float = 0.004,
+        aggressiveness: int = 2,
+        use_webrtc: bool = True,
+        history_ms: int = 3000,
+    ):
+        self.sample_rate = int(sample_rate)
+        self.frame_ms = int(frame_ms)
+        self.frame_len = self.sample_rate * self.frame_ms // 1000
+        self.margin_db = float(margin_db)
+        self.min_rms = float(min_rms)
+
+        self.floor_db = -60.0
+        self._floor_down = 0.3    # suit vite un bruit qui baisse
+        self._floor_up = 0.01     # remonte lentement (hors parole)
+        self._floor_up_speech = 0.001  # la parole ne doit presque pas le gonfler
+        self._warmup = 10         # premières trames : calage rapide sur le bruit ambiant
+        self.frames = 0
+
+        self._webrtc = None
+        if use_webrtc and self.sample_rate in _WEBRTC_RATES and self.frame_ms in _WEBRTC_FRAME_MS:
+            try:
+                import webrtcvad
+
+                self._webrtc = webrtcvad.Vad(int(aggressiveness))
+            except ImportError:
+                log.info("webrtcvad absent : VAD par énergie seule.")
+
+        self._pending = np.zeros(0, dtype=np.float32)
+        self.history: deque = deque(maxlen=max(1, history_ms // self.frame_ms))
+
+    def reset_history(self):
+        self.history.clear()
+        self._pending = np.zeros(0, dtype=np.float32)
+
+    def is_speech(self, frame: np.ndarray) -> bool:
+        """frame : float32 [-1, 1] de frame_len échantillons."""
+        rms = float(np.sqrt(np.mean(frame ** 2)))
+        level_db = 20.0 * np.log10(rms + 1e-9)
+
+        speech = rms >= self.min_rms and level_db >= self.floor_db + self.margin_db
+        if speech and self._webrtc is not None:
+            pcm = (np.clip(frame, -1.0, 1.0) * 32767).astype(np.int16).tobytes()
+            speech = self._webrtc.is_speech(pcm, self.sample_rate)
+
+        # plancher de bruit : suivi de minimum (descente rapide, montée lente)
+        self.frames += 1
+        if self.frames <= self._warmup:
+            rate = self._floor_down
+            speech = False
+        elif level_db < self.floor_db:
+            rate = self._floor_down
+        else:
+            rate = self._floor_up_speech if speech else self._floor_up
+        self.floor_db += rate * (level_db - self.floor_db)
+        return speech
+
+    def process(self, audio: np.ndarray) -> list[bool]:
+        """Décisions pour chaque trame complète ; le reste attend le bloc suivant."""
+        if len(self._pending):
+            audio = np.concatenate([self._pending, audio])
+        n = len(audio) // self.frame_len
+        out = []
+        for i in range(n):
+            speech = self.is_speech(audio[i * self.frame_len:(i + 1) * self.frame_len])
+            self.history.append(speech)
+            out.append(speech)
+        self._pending = audio[n * self.frame_len:].copy()
+        return out
+
+    def recent_speech_ms(self, window_ms: int) -> int:
+        """Durée de parole détectée dans les window_ms dernières ms."""
+        n = max(1, window_ms // self.frame_ms)
+        recent = list(self.history)[-n:]
+        return sum(recent) * self.frame_ms
+
+
+class Endpointer:
+    """
+    Fin d'énoncé pilotée par le VAD : silence_ms de non-parole après au moins
+    min_speech_ms de parole. no_speech_timeout_ms : abandon si rien n'est dit après le réveil.
+    """
+
+    def __init__(self, vad: VoiceActivityDetector, silence_ms: int = 700,
+                 min_speech_ms: int = 150, no_speech_timeout_ms: int = 5000):
+        self.vad = vad
+        self.silence_ms = int(silence_ms)
+        self.min_speech_ms = int(min_speech_ms)
+        self.no_speech_timeout_ms = int(no_speech_timeout_ms)
+        self.reset()
+
+    def reset(self):
+        self.speech_ms = 0
+        self.trailing_silence_ms = 0
+        self.elapsed_ms = 0
+        self.done = False
+
+    def feed(self, audio: np.ndarray) -> bool:
+        """True dès que l'énoncé est terminé (ou abandonné faute de parole)."""
+        if self.done:
+            return True
+
+        step = self.vad.frame_ms
+        for speech in self.vad.process(audio):
+            self.elapsed_ms += step
+            if speech:
+                self.speech_ms += step
+                self.trailing_silence_ms = 0
+            else:
+                self.trailing_silence_ms += step
+
+            if self.speech_ms >= self.min_speech_ms and self.trailing_silence_ms >= self.silence_ms:
+                self.done = True
+            elif self.speech_ms < self.min_speech_ms and self.elapsed_ms >= self.no_speech_timeout_ms:
+                self.done = True
+            if self.done:
+                break
+        return self.done
+
+    @property
+    def heard_speech(self) -> bool:
+        return self.speech_ms >= self.min_speech_ms
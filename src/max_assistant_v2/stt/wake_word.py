@@ -0,0 +1,195 @@
+# src/max_assistant_v2/stt/wake_word.py
+import time
+
+import numpy as np
+
+from max_assistant_v2.utils.logger import get_logger
+
+log = get_logger(__name__)
+
+# Transcriptions fréquentes du mot de réveil
+WAKE_VARIANTS = {
+    "frank": ["frank", "franck", "franc", "fran", "franq"],
+}
+
+
+def wake_variants(wake_word: str) -> list[str]:
+    word = (wake_word or "").strip().lower()
+    return WAKE_VARIANTS.get(word, [word])
+
+
+def log_mel(audio: np.ndarray, sample_rate: int = 16000, n_mels: int = 40,
+            win_ms: float = 25.0, hop_ms: float = 10.0) -> np.ndarray:
+    """Log-mel (trames, n_mels) en numpy pur : features standard de keyword spotting."""
+    n_fft = int(sample_rate * win_ms / 1000)
+    hop = int(sample_rate * hop_ms / 1000)
+    audio = np.asarray(audio, dtype=np.float32)
+    if len(audio) < n_fft:
+        audio = np.pad(audio, (0, n_fft - len(audio)))
+
+    n_frames = 1 + (len(audio) - n_fft) // hop
+    frames = np.lib.stride_tricks.as_strided(
+        audio,
+        shape=(n_frames, n_fft),
+        strides=(audio.strides[0] * hop, audio.strides[0]),
+    )
+    spec = np.abs(np.fft.rfft(frames * np.hanning(n_fft).astype(np.float32), axis=1)) ** 2
+    return np.log(spec @ _mel_filterbank(sample_rate, n_fft, n_mels).T + 1e-6).astype(np.float32)
+
+
+_FILTERBANKS: dict = {}
+
+
+def _mel_filterbank(sample_rate: int, n_fft: int, n_mels: int) -> np.ndarray:
+    key = (sample_rate, n_fft, n_mels)
+    if key not in _FILTERBANKS:
+        def hz_to_mel(f):
+            return 2595.0 * np.log10(1.0 + f / 700.0)
+
+        def mel_to_hz(m):
+            return 700.0 * (10 ** (m / 2595.0) - 1.0)
+
+        mels = np.linspace(hz_to_mel(20.0), hz_to_mel(sample_rate / 2), n_mels + 2)
+        bins = np.floor((n_fft + 1) * mel_to_hz(mels) / sample_rate).astype(int)
+
+        fb = np.zeros((n_mels, n_fft // 2 + 1), dtype=np.float32)
+        for i in range(n_mels):
+            lo, mid, hi = bins[i], bins[i + 1], bins[i + 2]
+            if mid > lo:
+                fb[i, lo:mid] = (np.arange(lo, mid) - lo) / (mid - lo)
+            if hi > mid:
+                fb[i, mid:hi] = (hi - np.arange(mid, hi)) / (hi - mid)
+        _FILTERBANKS[key] = fb
+    return _FILTERBANKS[key]
+
+
+class WhisperWakeWord:
+    """
+    Moteur de réveil Whisper minimal : modèle tiny sur CPU, décodage glouton
+    de quelques tokens seulement, sans timestamps. Aucun fichier à entraîner.
+    """
+
+    def __init__(self, wake_word: str = "frank", model_size: str = "tiny",
+                 device: str = "cpu", compute_type: str = "int8", cpu_threads: int = 2):
+        from faster_whisper import WhisperModel
+
+        self.model = WhisperModel(model_size, device=device, compute_type=compute_type, cpu_threads=cpu_threads)
+        self.variants = wake_variants(wake_word)
+
+    def score(self, audio: np.ndarray) -> float:
+        segments, _ = self.model.transcribe(
+            audio,
+            language="fr",
+            beam_size=1,
+            best_of=1,
+            temperature=0.0,
+            without_timestamps=True,
+            max_new_tokens=8,
+            condition_on_previous_text=False,
+            vad_filter=False,
+        )
+        text = " ".join(s.text.strip() for s in segments).lower()
+
+        # phrase longue = conversation, pas un appel
+        if not text or len(text.split()) > 5:
+            return 0.0
+        return 1.0 if any(v in text for v in self.variants) else 0.0
+
+
+class OnnxKeywordSpotter:
+    """
+    Petit modèle de keyword spotting exporté en ONNX, sur log-mel 16 kHz.
+    Entrée (1, trames, n_mels) ou (1, 1, trames, n_mels) ; sortie : probabilité
+    du mot de réveil (dernière valeur). Quelques ms par fenêtre sur un thread CPU.
+    """
+
+    def __init__(self, model_path: str, n_mels: int = 40, sample_rate: int = 16000):
+        import onnxruntime as ort
+
+        opts = ort.SessionOptions()
+        opts.intra_op_num_threads = 1
+        opts.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(model_path, sess_options=opts, providers=["CPUExecutionProvider"])
+
+        inp = self.session.get_inputs()[0]
+        self.input_name = inp.name
+        self.input_rank = len(inp.shape)
+        self.n_mels = n_mels
+        self.sample_rate = sample_rate
+
+    def score(self, audio: np.ndarray) -> float:
+        feats = log_mel(audio, self.sample_rate, self.n_mels)
+        feats = feats[None, None] if self.input_rank == 4 else feats[None]
+        out = self.session.run(None, {self.input_name: feats})[0]
+        return float(np.ravel(out)[-1])
+
+
+class WakeWordDetector:
+    """
+    Étape de réveil : seul un réveil positif passe la main au modèle de transcription complet.
+    - fenêtre glissante de window_sec (16 kHz float32), testée au plus toutes les interval_sec
+    - fenêtres sans parole (VAD, ou seuil RMS) ignorées sans appeler le moteur
+    - compteurs (tests, réveils, temps moteur) pour suivre le coût au repos
+    """
+
+    def __init__(self, engine, threshold: float = 0.5, window_sec: float = 1.5,
+                 interval_sec: float = 0.5, min_rms: float = 0.03):
+        self.engine = engine
+        self.threshold = float(threshold)
+        self.window_sec = float(window_sec)
+        self.interval_sec = float(interval_sec)
+        self.min_rms = float(min_rms)
+
+        self._last_check = 0.0
+        self.checks = 0
+        self.skipped_silence = 0
+        self.triggers = 0
+        self.engine_sec = 0.0
+
+    def due(self) -> bool:
+        return time.monotonic() - self._last_check >= self.interval_sec
+
+    def check(self, audio: np.ndarray, has_speech: bool | None = None) -> bool:
+        """
+        audio : fenêtre 16 kHz float32. True si le mot de réveil est détecté.
+        has_speech : verdict du VAD sur la fenêtre (sinon simple seuil RMS).
+        """
+        self._last_check = time.monotonic()
+
+        if has_speech is None:
+            has_speech = np.sqrt(np.mean(audio ** 2)) >= self.min_rms
+        if not has_speech:
+            self.skipped_silence += 1
+            return False
+
+        t0 = time.perf_counter()
+        score = self.engine.score(audio)
+        self.engine_sec += time.perf_counter() - t0
+        self.checks += 1
+
+        if score >= self.threshold:
+            self.triggers += 1
+            return True
+        return False
+
+    def stats(self) -> dict:
+        return {
+            "engine": type(self.engine).__name__,
+            "checks": self.checks,
+            "skipped_silence": self.skipped_silence,
+            "triggers": self.triggers,
+            "avg_engine_ms": 1000 * self.engine_sec / self.checks if self.checks else 0.0,
+        }
+
+
+def build_wake_detector(kind: str = "whisper", wake_word: str = "frank", model: str = "tiny",
+                        threshold: float = 0.5, interval_sec: float = 0.5) -> WakeWordDetector:
+    """kind : "whisper" (tiny Whisper CPU) | "onnx" (model = chemin du keyword spotter)."""
+    if kind == "onnx":
+        engine = OnnxKeywordSpotter(model)
+        # un KWS coûte quelques ms : on peut tester bien plus souvent
+        interval_sec = min(interval_sec, 0.1)
+    else:
+        engine = WhisperWakeWord(wake_word, model_size=model or "tiny")
+    log.info(f"Réveil : moteur {type(engine).__name__}")
+    return WakeWordDetector(engine, threshold=threshold, interval_sec=interval_sec)
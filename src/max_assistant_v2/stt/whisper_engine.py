@@ -1,32 +1,42 @@
 import sounddevice as sd
 import numpy as np
 from faster_whisper import WhisperModel
-from scipy.signal import resample_poly
-import time
+
+from max_assistant_v2.stt.audio_frontend import AudioFrontend
+from max_assistant_v2.stt.streaming_transcriber import StreamingTranscriber
+from max_assistant_v2.stt.vad import Endpointer, VoiceActivityDetector
+from max_assistant_v2.stt.wake_word import WakeWordDetector, build_wake_detector
 
 
 class WhisperSTT:
-    def __init__(self):
+    MAX_COMMAND_SEC = 60
+
+    def __init__(self, wake: WakeWordDetector | None = None, silence_ms: int = 700, frame_ms: int = 30,
+                 sample_rate: int = 16000, streaming: bool = True, partial_step_sec: float = 0.6):
+        # réveil : moteur léger dédié, le modèle complet ne sert qu'à la commande
+        self.wake = wake or build_wake_detector("whisper", "frank")
+
         self.model = WhisperModel(
             "small",
             device="cuda",
             compute_type="int8"
         )
 
-        self.input_rate = 48000
-        self.target_rate = 16000
+        # Capture 16 kHz float32 (native si possible, sinon rééchantillonnage en flux) ;
+        # marge au-delà de MAX_COMMAND_SEC : la commande coupée tient toujours dans le tampon
+        self.frontend = AudioFrontend(device_hint="TONOR", target_rate=sample_rate, max_sec=self.MAX_COMMAND_SEC + 2)
+        self.audio = self.frontend.audio
+        self.target_rate = self.frontend.target_rate
 
-        # Auto-détection micro TONOR
-        self.device_index = None
-        for i, dev in enumerate(sd.query_devices()):
-            if "TONOR" in dev["name"] and dev["max_input_channels"] > 0:
-                self.device_index = i
-                print(f"🎤 Micro détecté: {dev['name']} (index {i})")
-                break
+        # VAD par trame : garde du réveil + fin d'énoncé (plancher de bruit adaptatif)
+        self.vad = VoiceActivityDetector(sample_rate=self.target_rate, frame_ms=frame_ms)
+        self.endpointer = Endpointer(self.vad, silence_ms=silence_ms)
+        self.min_wake_speech_ms = 200
 
-        if self.device_index is None:
-            self.device_index = sd.default.device[0]
-            print("⚠️ TONOR non trouvé, micro par défaut utilisé.")
+        # Transcription pendant la commande (hypothèses partielles + passe de fin sur la queue)
+        self.streaming = None
+        if streaming:
+            self.streaming = StreamingTranscriber(self.model, sample_rate=self.target_rate, step_sec=partial_step_sec)
 
     def transcribe(self, audio):
         segments, _ = self.model.transcribe(
@@ -39,122 +49,86 @@ class WhisperSTT:
         )
         return " ".join([s.text.strip() for s in segments]).strip()
 
-    def listen_one_utterance(self, wake_word="max"):
+    def listen_one_utterance(self, wake_word="max", on_partial=None):
+        """on_partial(texte) : hypothèses partielles pendant la commande (mode streaming)."""
 
         wake_word = wake_word.lower()
         print("👂 En écoute...")
 
         state = "IDLE"
 
-        wake_buffer = []
-        command_buffer = []
-
-        silence_start = None
-        last_wake_test = 0
-
-        # Réglages stables
-        block_duration = 0.04          # 40ms
-        wake_window_sec = 1.5          # 1.5s contexte wake
-        silence_threshold_sec = 0.9    # 0.9s silence commande
-
-        wake_chunks_needed = int(wake_window_sec / block_duration)
-
-        def callback(indata, frames, time_info, status):
-            nonlocal state, wake_buffer, command_buffer, silence_start
+        wake_window = int(self.wake.window_sec * self.target_rate)
+        wake_window_ms = int(self.wake.window_sec * 1000)
 
-            audio = indata.flatten().astype(np.float32) / 32768.0
-            rms = np.sqrt(np.mean(audio ** 2))
+        self.vad.reset_history()
+        self.endpointer.reset()
+        if self.streaming is not None:
+            self.streaming.reset(on_partial=on_partial)
 
-            if state == "IDLE":
-                wake_buffer.append(audio.copy())
+        max_command = self.MAX_COMMAND_SEC * self.target_rate
 
-                if len(wake_buffer) > wake_chunks_needed:
-                    wake_buffer = wake_buffer[-wake_chunks_needed:]
-
-            elif state == "LISTENING":
-                command_buffer.append(audio.copy())
-
-                if rms > 0.025:
-                    silence_start = None
-                else:
-                    if silence_start is None:
-                        silence_start = time.time()
-                    elif time.time() - silence_start > silence_threshold_sec:
-                        raise sd.CallbackStop()
-
-        with sd.InputStream(
-            device=self.device_index,
-            samplerate=self.input_rate,
-            channels=1,
-            dtype="int16",
-            callback=callback,
-            blocksize=int(self.input_rate * block_duration),
-        ):
+        with self.frontend.stream():
+            start = self.audio.written
+            command_start = None
 
             while True:
 
-                sd.sleep(100)
+                sd.sleep(30 if state == "LISTENING" else 100)
 
-                # -------- WAKE DETECTION (hors callback) --------
-                if state == "IDLE" and len(wake_buffer) >= wake_chunks_needed:
-
-                    # Cooldown pour éviter spam Whisper
-                    if time.time() - last_wake_test < 0.6:
-                        continue
+                pcm = self.frontend.pull()
 
-                    last_wake_test = time.time()
-
-                    short_audio = np.concatenate(wake_buffer)
-                    short_resampled = resample_poly(
-                        short_audio,
-                        self.target_rate,
-                        self.input_rate
-                    )
-
-                    rms = np.sqrt(np.mean(short_resampled ** 2))
-
-                    # Ignore quasi-silence
-                    if rms < 0.03:
-                        continue
-
-
-                    text = self.transcribe(short_resampled)
+                # -------- WAKE DETECTION (hors callback) --------
+                if state == "IDLE":
+                    # suit le bruit ambiant et la parole récente (garde du réveil)
+                    self.vad.process(pcm)
 
-                    if len(text.split()) > 5:
+                    if self.audio.written - start < wake_window or not self.wake.due():
                         continue
 
-                    wake_variants = ["frank", "franck", "franc", "fran", "franq"]
-
-                    transcript = text.lower()
+                    # pas de parole dans la fenêtre : on n'appelle pas le moteur de réveil
+                    has_speech = self.vad.recent_speech_ms(wake_window_ms) >= self.min_wake_speech_ms
 
-                    if any(w in transcript for w in wake_variants):
+                    # vue sur les dernières secondes, sans copie
+                    if self.wake.check(self.audio.latest(wake_window), has_speech=has_speech):
                         print("🟢 Wake détecté")
                         state = "LISTENING"
-                        wake_buffer = []
-                        command_buffer = []
-                        silence_start = None
+                        command_start = self.audio.written
+                        self.endpointer.reset()
 
                 # -------- STOP COMMANDE --------
-                if state == "LISTENING" and silence_start is not None:
-                    if time.time() - silence_start > silence_threshold_sec:
-                        break
+                elif self.endpointer.feed(pcm):
+                    break
 
-        if not command_buffer:
-            return None
+                # commande trop longue : coupée avant de déborder du tampon circulaire
+                elif self.audio.written - command_start >= max_command:
+                    print(f"⏱️ Commande coupée après {self.MAX_COMMAND_SEC} s")
+                    break
 
-        full_audio = np.concatenate(command_buffer)
-        audio_resampled = resample_poly(
-            full_audio,
-            self.target_rate,
-            self.input_rate
-        )
+                # -------- TRANSCRIPTION PARTIELLE --------
+                elif self.streaming is not None and self.endpointer.heard_speech:
+                    n = self.audio.written - command_start
+                    if self.streaming.due(n):
+                        self.streaming.update(self.audio.latest(n))
 
-        # Normalisation
-        rms = np.sqrt(np.mean(audio_resampled ** 2))
-        if rms > 0:
-            audio_resampled = audio_resampled / rms * 0.1
+        if command_start is None or not self.endpointer.heard_speech:
+            return None
 
-        command = self.transcribe(audio_resampled)
+        # retire le silence final (on garde un peu de marge)
+        trailing = max(0, self.endpointer.trailing_silence_ms - 200) * self.target_rate // 1000
+        n = self.audio.written - command_start - trailing
+        if n <= 0:
+            return None
+        audio_resampled = self.audio.latest(self.audio.written - command_start)[:n]
+
+        if self.streaming is not None:
+            # seule la queue non confirmée reste à décoder, avec le gain déjà utilisé par les partiels
+            command = self.streaming.finish(audio_resampled)
+        else:
+            # Normalisation (nouveau tableau : le tampon n'est pas modifié)
+            rms = np.sqrt(np.mean(audio_resampled ** 2))
+            if rms > 0:
+                audio_resampled = audio_resampled / rms * 0.1
+            command = self.transcribe(audio_resampled)
 
         # print("🧠 COMMANDE:", command)
 
@@ -16,7 +16,7 @@ class SystemResetTools:
     - agenda.json (rdv)
     - projects.json (projets + projet actif)
     - long_term.jsonl (mémoire long terme)
-    - vector_store/ (faiss + meta)
+    - vector_store/ (vecteurs memmap + meta SQLite + index ANN)
     """
 
     def __init__(self, registry, profile=None, projects_manager=None):
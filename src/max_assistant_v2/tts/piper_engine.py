@@ -6,6 +6,12 @@ import sounddevice as sd
 import numpy as np
 import wave
 import random
+import queue
+import threading
+
+from max_assistant_v2.utils.logger import get_logger
+
+log = get_logger(__name__)
 
 class PiperTTS:
     def __init__(self, piper_exe: str, piper_model: str):
@@ -79,16 +85,8 @@ class PiperTTS:
         return text
 
 
-    def say(self, text: str, hud=None, user_emotion=None, user_intensity=0.0):
-
-        # --- Micro naturalisation texte ---
-        text = self._naturalize_text(text, user_emotion)
-
-        print(f"\n🟢 {text}\n")
-
-        if not text.strip():
-            return
-
+    def _synthesize(self, text: str) -> tuple[np.ndarray, int]:
+        """Piper → (échantillons int16, fréquence)."""
         with tempfile.TemporaryDirectory() as td:
             out_wav = os.path.join(td, "out.wav")
             cmd = [self.piper_exe, "-m", self.piper_model, "-f", out_wav]
@@ -103,45 +101,133 @@ class PiperTTS:
 
             with wave.open(out_wav, "rb") as wf:
                 sr = wf.getframerate()
-                speed_factor, gain = self._voice_from_user_state(user_emotion, user_intensity)
-                # --- Micro variations naturelles ---
-                speed_factor, gain = self._apply_micro_variation(speed_factor, gain)
-                out_sr = int(sr * speed_factor)
-                total_frames = wf.getnframes()
+                audio = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
 
-                chunk = 1024
+        return audio, sr
 
-                stream = sd.OutputStream(
-                    samplerate=out_sr,
-                    channels=1,
-                    dtype="int16"
-                )
+    def _play(self, audio: np.ndarray, out_sr: int, gain: float, hud=None):
+        chunk = 1024
 
-                stream.start()
+        stream = sd.OutputStream(
+            samplerate=out_sr,
+            channels=1,
+            dtype="int16"
+        )
 
-                while True:
-                    data = wf.readframes(chunk)
-                    if not data:
-                        break
+        stream.start()
 
-                    audio_chunk = np.frombuffer(data, dtype=np.int16)
+        for i in range(0, len(audio), chunk):
+            audio_chunk = audio[i:i + chunk]
 
-                    if gain != 1.0:
-                        x = audio_chunk.astype(np.float32) * gain
-                        x = np.clip(x, -32768, 32767)
-                        audio_chunk = x.astype(np.int16)
+            if gain != 1.0:
+                x = audio_chunk.astype(np.float32) * gain
+                x = np.clip(x, -32768, 32767)
+                audio_chunk = x.astype(np.int16)
 
+            # 🔥 RMS pour pulse
+            if hud:
+                rms = np.sqrt(np.mean(audio_chunk.astype(np.float32) ** 2)) / 32768.0
+                hud.set_volume(rms)
 
-                    # 🔥 RMS pour pulse
-                    if hud:
-                        rms = np.sqrt(np.mean(audio_chunk.astype(np.float32) ** 2)) / 32768.0
-                        hud.set_volume(rms)
+            stream.write(audio_chunk)
 
-                    stream.write(audio_chunk)
+        stream.stop()
+        stream.close()
 
-                stream.stop()
-                stream.close()
+    def say(self, text: str, hud=None, user_emotion=None, user_intensity=0.0):
 
-            if hud:
-                hud.set_volume(0.0)
+        # --- Micro naturalisation texte ---
+        text = self._naturalize_text(text, user_emotion)
+
+        print(f"\n🟢 {text}\n")
+
+        if not text.strip():
+            return
+
+        audio, sr = self._synthesize(text)
+
+        speed_factor, gain = self._voice_from_user_state(user_emotion, user_intensity)
+        # --- Micro variations naturelles ---
+        speed_factor, gain = self._apply_micro_variation(speed_factor, gain)
+
+        self._play(audio, int(sr * speed_factor), gain, hud=hud)
+
+        if hud:
+            hud.set_volume(0.0)
+
+    def open_stream(self, hud=None, user_emotion=None, user_intensity=0.0) -> "SpeechStream":
+        """Parole phrase par phrase : voir SpeechStream."""
+        return SpeechStream(self, hud=hud, user_emotion=user_emotion, user_intensity=user_intensity)
+
+
+_END = object()
+
+
+class SpeechStream:
+    """
+    Pipeline TTS pour une réponse streamée :
+    - feed(phrase) : non bloquant, appelé au fil de la génération LLM
+    - un thread synthétise la phrase suivante pendant qu'un autre joue la courante
+    - close() attend la fin de la lecture
+    La voix (vitesse, gain) est tirée une seule fois pour toute la réponse.
+    """
+
+    def __init__(self, tts: PiperTTS, hud=None, user_emotion=None, user_intensity=0.0):
+        self.tts = tts
+        self.hud = hud
+        self.user_emotion = user_emotion
+
+        speed_factor, gain = tts._voice_from_user_state(user_emotion, user_intensity)
+        self.speed_factor, self.gain = tts._apply_micro_variation(speed_factor, gain)
+
+        self._texts: queue.Queue = queue.Queue()
+        # borne : au plus une phrase synthétisée d'avance
+        self._audio: queue.Queue = queue.Queue(maxsize=2)
+        self._closed = False
+
+        self._synth_thread = threading.Thread(target=self._synth_loop, daemon=True)
+        self._play_thread = threading.Thread(target=self._play_loop, daemon=True)
+        self._synth_thread.start()
+        self._play_thread.start()
+
+    def feed(self, text: str):
+        if self._closed:
+            return
+        text = self.tts._naturalize_text(text, self.user_emotion)
+        if text.strip():
+            print(f"🟢 {text}")
+            self._texts.put(text)
+
+    def _synth_loop(self):
+        while True:
+            text = self._texts.get()
+            if text is _END:
+                self._audio.put(_END)
+                return
+            try:
+                self._audio.put(self.tts._synthesize(text))
+            except Exception as e:
+                log.error(f"Piper (stream): {e}")
+
+    def _play_loop(self):
+        while True:
+            item = self._audio.get()
+            if item is _END:
+                return
+            audio, sr = item
+            try:
+                self.tts._play(audio, int(sr * self.speed_factor), self.gain, hud=self.hud)
+            except Exception as e:
+                log.error(f"Lecture audio (stream): {e}")
+
+    def close(self, timeout: float | None = None):
+        """Plus de phrases à venir : attend que tout soit dit."""
+        if self._closed:
+            return
+        self._closed = True
+        self._texts.put(_END)
+        self._synth_thread.join(timeout=timeout)
+        self._play_thread.join(timeout=timeout)
 
+        if self.hud:
+            self.hud.set_volume(0.0)
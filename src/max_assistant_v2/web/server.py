@@ -13,6 +13,7 @@ import numpy as np
 from scipy.signal import resample_poly
 from fastapi import UploadFile, File, Form
 import subprocess
+import asyncio
 
 
 API_TOKEN = os.getenv("FRANK_WEB_TOKEN", "frank-local-token")
@@ -46,12 +47,13 @@ class Message(BaseModel):
     token: str
 
 @app.post("/ask")
-def ask_frank(message: Message):
+async def ask_frank(message: Message):
 
     if message.token != API_TOKEN:
         raise HTTPException(status_code=403, detail="Token invalide")
 
-    result = assistant.process_text(message.text)
+    # async de bout en bout : pas de worker du threadpool bloqué pendant la génération
+    result = await assistant.aprocess_text(message.text)
     return result
 
 @app.post("/voice")
@@ -72,28 +74,34 @@ async def voice_input(
     # Convertir en wav 16k mono
     output_path = input_path.replace(".webm", ".wav")
 
-    subprocess.run([
-        "ffmpeg",
-        "-y",
-        "-i", input_path,
-        "-ar", "16000",
-        "-ac", "1",
-        output_path
-    ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    # ffmpeg / lecture / Whisper sont bloquants : hors de la boucle d'événements
+    await asyncio.to_thread(
+        subprocess.run,
+        [
+            "ffmpeg",
+            "-y",
+            "-i", input_path,
+            "-ar", "16000",
+            "-ac", "1",
+            output_path
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
 
     # Lire wav converti
-    audio, rate = sf.read(output_path)
+    audio, rate = await asyncio.to_thread(sf.read, output_path)
 
     audio = audio.astype(np.float32)
 
-    text = assistant.orchestrator.stt.transcribe(audio)
+    text = await asyncio.to_thread(assistant.orchestrator.stt.transcribe, audio)
 
     print("🧠 TRANSCRIPTION:", text)
 
     if not text:
         return {"status": "empty"}
 
-    result = assistant.process_text(text)
+    result = await assistant.aprocess_text(text)
 
     # Récupération émotion utilisateur détectée
     user_emotion, user_intensity = assistant.orchestrator.router.profile.get_emotion()
@@ -106,6 +114,13 @@ async def voice_input(
         "user_intensity": user_intensity or 0.0
     }
 
+@app.on_event("shutdown")
+async def shutdown():
+    # arrêt du serveur : file du memory writer vidée, vector store persisté
+    if assistant is not None:
+        await asyncio.to_thread(assistant.close)
+
+
 @app.get("/health")
 def health():
     return {"status": "FRANK ONLINE"}
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+from scipy.signal import resample_poly
+
+from max_assistant_v2.stt.audio_buffer import RingBuffer, StreamingResampler
+
+
+def test_ring_buffer_latest_across_wrap():
+    rb = RingBuffer(8)
+    rb.write(np.arange(6, dtype=np.float32))
+    rb.write(np.arange(6, 11, dtype=np.float32))
+    assert rb.written == 11
+    np.testing.assert_array_equal(rb.latest(8), np.arange(3, 11))
+    np.testing.assert_array_equal(rb.latest(3), [8, 9, 10])
+    # vue contiguë, sans copie
+    assert rb.latest(8).base is rb._buf
+
+
+def test_ring_buffer_keeps_tail_of_oversized_block():
+    rb = RingBuffer(4)
+    rb.write(np.arange(10, dtype=np.float32))
+    assert rb.written == 10
+    np.testing.assert_array_equal(rb.latest(4), [6, 7, 8, 9])
+
+
+def test_ring_buffer_since_mark():
+    rb = RingBuffer(16, dtype=np.int16)
+    rb.write(np.arange(5, dtype=np.int16))
+    mark = rb.written
+    rb.write(np.arange(5, 9, dtype=np.int16))
+    block, mark = rb.since(mark)
+    np.testing.assert_array_equal(block, [5, 6, 7, 8])
+    assert mark == 9
+    assert len(rb.since(mark)[0]) == 0
+
+
+@pytest.mark.parametrize("rate_in", [48000, 44100])
+def test_streaming_resampler_matches_whole_signal(rate_in):
+    rng = np.random.default_rng(0)
+    signal = rng.standard_normal(rate_in).astype(np.float32) * 0.1
+    rs = StreamingResampler(rate_in, 16000)
+
+    # blocs de tailles irrégulières, comme les callbacks PortAudio
+    cuts = np.sort(rng.integers(0, len(signal), 40))
+    out = np.concatenate([rs.process(b) for b in np.split(signal, cuts)])
+
+    # flux précédé de silence (contexte initial) : même chose que le signal entier
+    ref = resample_poly(np.concatenate([np.zeros(rs.ctx, np.float32), signal]), rs.up, rs.down)
+    ref = ref[rs.ctx * rs.up // rs.down:]
+    assert len(out) > 0.9 * 16000
+    np.testing.assert_allclose(out, ref[:len(out)], atol=1e-5)
+
+
+def test_streaming_resampler_passthrough():
+    rs = StreamingResampler(16000, 16000)
+    block = np.ones(10, dtype=np.float32)
+    assert rs.passthrough
+    np.testing.assert_array_equal(rs.process(block), block)
@@ -0,0 +1,34 @@
+from max_assistant_v2.memory import bm25
+
+
+def test_tokenize_strips_accents_case_and_stopwords():
+    assert bm25.tokenize("Le Café de la Gare à Lyon") == ["cafe", "gare", "lyon"]
+
+
+def test_idf_is_positive_and_favours_rare_terms():
+    rare = bm25.idf(n_docs=100, df=1)
+    common = bm25.idf(n_docs=100, df=90)
+    assert rare > common > 0.0
+
+
+def test_term_score_saturates_with_tf():
+    idf = bm25.idf(10, 2)
+    s1 = bm25.term_score(1, 10, 10.0, idf)
+    s2 = bm25.term_score(2, 10, 10.0, idf)
+    s20 = bm25.term_score(20, 10, 10.0, idf)
+    assert s1 < s2 < s20 < idf * (bm25.K1 + 1.0)
+
+
+def test_term_score_penalises_long_documents():
+    idf = bm25.idf(10, 2)
+    assert bm25.term_score(1, 5, 10.0, idf) > bm25.term_score(1, 40, 10.0, idf)
+
+
+def test_rrf_fuse_sums_reciprocal_ranks():
+    fused = bm25.rrf_fuse([[1, 2, 3], [3, 1]], k=60)
+    assert fused[1] == 1 / 61 + 1 / 62
+    assert fused[3] == 1 / 63 + 1 / 61
+    assert fused[2] == 1 / 62
+    # présent dans les deux classements : devant un doc présent dans un seul
+    assert max(fused, key=fused.get) == 1
+    assert fused[3] > fused[2]
@@ -0,0 +1,66 @@
+import pytest
+
+from max_assistant_v2.agents.intent_classifier import (
+    CITY_CASES,
+    HELDOUT,
+    NONE_INTENT,
+    IntentClassifier,
+    extract_city,
+)
+
+
+@pytest.fixture
+def clf():
+    # sans embeddings : seules les règles ancrées sont testées (déterministe)
+    return IntentClassifier(apps={"spotify": {}, "chrome": {}})
+
+
+@pytest.mark.parametrize("text,expected", HELDOUT)
+def test_heldout(clf, text, expected):
+    match = clf.classify(text)
+    assert (match.tool if match else NONE_INTENT) == expected
+
+
+@pytest.mark.parametrize("text", [
+    "comment ouvrir chrome en mode privé",
+    "pourquoi la météo se trompe souvent ?",
+    "météorologie",
+    "c'est quoi un snapshot git ?",
+])
+def test_questions_go_to_planner(clf, text):
+    assert clf.classify(text) is None
+
+
+def test_weather_city_argument(clf):
+    match = clf.classify("quelle est la météo de la semaine à Lyon")
+    assert match.tool == "weather"
+    assert match.args == {"city": "Lyon"}
+
+
+def test_open_app_after_courtesy_prefix(clf):
+    match = clf.classify("frank, tu peux lancer chrome ?")
+    assert match.tool == "open_app"
+    assert match.args == {"app_name": "chrome"}
+
+
+def test_image_prompt_keeps_determiner(clf):
+    match = clf.classify("dessine-moi un mouton")
+    assert match.tool == "image_generate"
+    assert match.args["prompt"] == "un mouton"
+
+
+def test_web_search_without_query_falls_through(clf):
+    assert clf.classify("cherche sur internet") is None
+
+
+@pytest.mark.parametrize("text,expected", CITY_CASES)
+def test_extract_city(text, expected):
+    assert (extract_city(text) or "Paris") == expected
+
+
+def test_metrics_count_fallthrough(clf):
+    clf.classify("météo à Lyon")
+    clf.classify("raconte-moi une blague")
+    metrics = clf.metrics()
+    assert metrics["weather"]["hits"] == 1
+    assert metrics[NONE_INTENT]["fallthrough"] == 1
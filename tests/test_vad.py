@@ -0,0 +1,58 @@
+import numpy as np
+
+from max_assistant_v2.stt.vad import Endpointer, VoiceActivityDetector
+
+SR = 16000
+FRAME = SR * 30 // 1000
+
+
+def noise(sec, level=0.002, seed=0):
+    return (np.random.default_rng(seed).standard_normal(int(SR * sec)) * level).astype(np.float32)
+
+
+def tone(sec, amp=0.3):
+    t = np.arange(int(SR * sec)) / SR
+    return (amp * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def make_vad():
+    # énergie seule : indépendant de la présence de webrtcvad
+    return VoiceActivityDetector(sample_rate=SR, frame_ms=30, use_webrtc=False)
+
+
+def test_speech_over_noise_floor():
+    vad = make_vad()
+    # durées multiples de la trame : aucune trame à cheval entre bruit et parole
+    assert not any(vad.process(noise(0.99)))
+    assert all(vad.process(tone(0.3)))
+    assert not any(vad.process(noise(0.3, seed=1)))
+
+
+def test_accepts_blocks_of_any_size():
+    vad = make_vad()
+    out = []
+    for block in np.array_split(noise(1.0), 37):
+        out += vad.process(block)
+    assert len(out) == SR // FRAME
+
+
+def test_endpointer_hangover():
+    vad = make_vad()
+    ep = Endpointer(vad, silence_ms=300, min_speech_ms=150)
+    assert not ep.feed(noise(0.6))
+    assert not ep.feed(tone(0.6))
+    assert ep.heard_speech
+
+    # fin d'énoncé après exactement silence_ms de non-parole
+    frames = 0
+    while not ep.feed(noise(0.03, seed=frames + 2)):
+        frames += 1
+    assert (frames + 1) * 30 == 300
+    assert ep.trailing_silence_ms == 300
+
+
+def test_endpointer_gives_up_without_speech():
+    ep = Endpointer(make_vad(), silence_ms=300, no_speech_timeout_ms=900)
+    assert not ep.feed(noise(0.6))
+    assert ep.feed(noise(0.6, seed=1))
+    assert not ep.heard_speech
@@ -0,0 +1,54 @@
+import numpy as np
+
+from max_assistant_v2.stt.wake_word import WakeWordDetector, log_mel, wake_variants
+
+
+class FakeEngine:
+    def __init__(self, score):
+        self.score_value = score
+        self.calls = 0
+
+    def score(self, audio):
+        self.calls += 1
+        return self.score_value
+
+
+def test_log_mel_shape():
+    feats = log_mel(np.zeros(16000, dtype=np.float32))
+    # fenêtre 25 ms, pas 10 ms
+    assert feats.shape == (1 + (16000 - 400) // 160, 40)
+    assert feats.dtype == np.float32
+
+
+def test_log_mel_pads_short_audio():
+    assert log_mel(np.zeros(100, dtype=np.float32)).shape == (1, 40)
+
+
+def test_wake_variants():
+    assert "franck" in wake_variants("FRANK")
+    assert wake_variants("jarvis") == ["jarvis"]
+
+
+def test_silence_skips_engine():
+    engine = FakeEngine(1.0)
+    det = WakeWordDetector(engine)
+    assert not det.check(np.zeros(16000, dtype=np.float32))
+    assert not det.check(np.ones(16000, dtype=np.float32), has_speech=False)
+    assert engine.calls == 0
+    assert det.skipped_silence == 2
+
+
+def test_trigger_on_threshold():
+    loud = np.full(16000, 0.1, dtype=np.float32)
+    assert WakeWordDetector(FakeEngine(0.6), threshold=0.5).check(loud)
+    det = WakeWordDetector(FakeEngine(0.4), threshold=0.5)
+    assert not det.check(loud, has_speech=True)
+    assert det.stats()["checks"] == 1
+    assert det.triggers == 0
+
+
+def test_due_respects_interval():
+    det = WakeWordDetector(FakeEngine(0.0), interval_sec=60.0)
+    assert det.due()
+    det.check(np.zeros(10, dtype=np.float32))
+    assert not det.due()